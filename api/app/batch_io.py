@@ -0,0 +1,114 @@
+import io
+import json
+import numpy as np
+import pandas as pd
+
+ARROW_STREAM = 'application/vnd.apache.arrow.stream'
+ARROW_FILE = 'application/vnd.apache.arrow.file'
+PARQUET = 'application/vnd.apache.parquet'
+NDJSON = 'application/x-ndjson'
+
+# Accepted Content-Type values for /predict/batch and the reader used for each
+CONTENT_TYPES = {
+    ARROW_STREAM: 'arrow_stream',
+    ARROW_FILE: 'arrow_file',
+    PARQUET: 'parquet',
+    'application/x-parquet': 'parquet',
+    NDJSON: 'ndjson',
+    'application/jsonlines': 'ndjson',
+}
+
+
+def get_result_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ('prediction', pa.int8()),
+        ('probability', pa.float64()),
+    ])
+
+
+class UnsupportedMediaType(ValueError):
+    pass
+
+
+def get_body_format(content_type):
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    if media_type not in CONTENT_TYPES:
+        raise UnsupportedMediaType(
+            f"Unsupported content type '{media_type}'. Supported types are: {', '.join(CONTENT_TYPES)}"
+        )
+    return CONTENT_TYPES[media_type]
+
+
+def read_table(body, content_type):
+    """
+    Parse a request body into an Arrow table without going through per-row Python objects.
+    """
+    # pyarrow is only imported by the batch endpoint, so it does not slow down startup
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.json as pa_json
+    import pyarrow.parquet as pq
+
+    body_format = get_body_format(content_type)
+    buffer = pa.BufferReader(body)
+    if body_format == 'arrow_stream':
+        return ipc.open_stream(buffer).read_all()
+    if body_format == 'arrow_file':
+        return ipc.open_file(buffer).read_all()
+    if body_format == 'parquet':
+        return pq.read_table(buffer)
+    return pa_json.read_json(buffer)
+
+
+def score_batches(table, model_service, chunk_rows):
+    """
+    Score an Arrow table chunk by chunk and yield a result frame per chunk.
+    """
+    for batch in table.to_batches(max_chunksize=chunk_rows):
+        probability = model_service.predict_proba_frame(batch.to_pandas())
+        yield pd.DataFrame({
+            'prediction': (probability >= 0.5).astype(np.int8),
+            'probability': probability,
+        })
+
+
+def stream_ndjson(results):
+    """
+    Serialize result frames as NDJSON. The status line is already sent when
+    a later chunk fails, so the error is written as a last record and the
+    connection is aborted rather than closed, and partial output is never
+    taken for a complete response.
+    """
+    try:
+        for result in results:
+            yield result.to_json(orient='records', lines=True)
+    except Exception as e:
+        yield json.dumps({'error': f"Scoring failed: {e}"}) + '\n'
+        raise
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def stream_arrow(results):
+    """
+    Serialize result frames as an Arrow IPC stream. When a later chunk
+    fails, the connection is aborted before the end-of-stream marker.
+    """
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+
+    schema = get_result_schema()
+    sink = io.BytesIO()
+    writer = ipc.new_stream(sink, schema)
+    for result in results:
+        writer.write_batch(pa.RecordBatch.from_pandas(result, schema=schema, preserve_index=False))
+        # Hand each scored chunk to the client as soon as it is ready
+        yield _drain(sink)
+    writer.close()
+    yield _drain(sink)
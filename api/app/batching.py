@@ -0,0 +1,131 @@
+import asyncio
+import bisect
+import time
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values, reported by /metrics."""
+
+    def __init__(self, buckets):
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        labels = [f"le_{bucket}" for bucket in self.buckets] + ["le_inf"]
+        return {
+            "buckets": dict(zip(labels, self.counts)),
+            "count": self.count,
+            "sum": self.sum,
+        }
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent prediction requests into a single batched call.
+
+    Requests are collected until either max_batch_size records are queued or
+    max_wait_ms has elapsed since the first one arrived. The batch is then
+    scored with one call to predict_fn in a worker thread so the event loop
+    keeps accepting requests meanwhile. When that call fails, the records are
+    scored again one by one, so a bad record only fails its own request.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5.0):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.batch_size_histogram = Histogram([1, 2, 4, 8, 16, 32, 64, 128, 256, 512])
+        self.queue_wait_histogram = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100, 250])
+        self.failed_batches = 0
+        self._queue = None
+        self._task = None
+
+    async def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, record):
+        """
+        Queue one record and wait for its score.
+        """
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        batch = [await self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                # Drain whatever is already queued without waiting any longer
+                if self._queue.empty():
+                    break
+                batch.append(self._queue.get_nowait())
+                continue
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            dispatched_at = time.perf_counter()
+            self.batch_size_histogram.observe(len(batch))
+            for _, _, queued_at in batch:
+                self.queue_wait_histogram.observe((dispatched_at - queued_at) * 1000)
+
+            records = [record for record, _, _ in batch]
+            try:
+                outcomes = [(result, None) for result in await loop.run_in_executor(None, self.predict_fn, records)]
+            except Exception as e:
+                if len(batch) == 1:
+                    outcomes = [(None, e)]
+                else:
+                    self.failed_batches += 1
+                    outcomes = await loop.run_in_executor(None, self._predict_each, records)
+
+            for (_, future, _), (result, error) in zip(batch, outcomes):
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+    def _predict_each(self, records):
+        """Score records one at a time, returning a (result, exception) pair for each."""
+        outcomes = []
+        for record in records:
+            try:
+                outcomes.append((self.predict_fn([record])[0], None))
+            except Exception as e:
+                outcomes.append((None, e))
+        return outcomes
+
+    def metrics(self):
+        return {
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "queue_wait_ms": self.queue_wait_histogram.snapshot(),
+            # Batches scored again record by record after one of their records failed
+            "failed_batches": self.failed_batches,
+        }
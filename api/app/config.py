@@ -0,0 +1,31 @@
+import os
+
+base_dir = os.path.dirname(__file__)
+
+
+class Config:
+    # Model artifacts written by data_science/src/utils/models.save_model
+    MODEL_DIR = os.getenv(
+        'MODEL_DIR',
+        os.path.abspath(os.path.join(base_dir, '../../data_science/src/model_output'))
+    )
+    MODEL_NAME = os.getenv('MODEL_NAME', 'RandomForestClassifier')
+    # Saved version or registry alias (e.g. "latest" or "champion") served by default
+    MODEL_VERSION = os.getenv('MODEL_VERSION', 'v1')
+    # "sklearn" or "packed" (random forests scored from flat node arrays, see model_artifacts/packed_forest.py)
+    MODEL_BACKEND = os.getenv('MODEL_BACKEND', 'sklearn')
+    # Artifact size of the model versions kept loaded for A/B and shadow scoring
+    MODEL_CACHE_MAX_MB = float(os.getenv('MODEL_CACHE_MAX_MB', '1024'))
+    # Candidate version or alias scored alongside MODEL_VERSION on every request (empty to disable);
+    # responses only carry MODEL_VERSION's predictions, the candidate's are logged to SHADOW_LOG_FILE
+    SHADOW_MODEL_VERSION = os.getenv('SHADOW_MODEL_VERSION', '')
+    SHADOW_LOG_FILE = os.getenv('SHADOW_LOG_FILE', 'shadow_predictions.ndjson')
+    # Batches waiting for the shadow model, which scores them off the request path; further ones are dropped
+    SHADOW_MAX_PENDING = int(os.getenv('SHADOW_MAX_PENDING', '100'))
+
+    # Micro-batching of concurrent /predict requests
+    BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', '64'))
+    BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', '5'))
+
+    # Rows scored per chunk by /predict/batch
+    BATCH_CHUNK_ROWS = int(os.getenv('BATCH_CHUNK_ROWS', '10000'))
@@ -1,6 +1,92 @@
-from fastapi import FastAPI
+import itertools
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+from .batch_io import ARROW_STREAM, NDJSON, UnsupportedMediaType, read_table, score_batches, stream_arrow, stream_ndjson
+from .batching import MicroBatcher
+from .config import Config
+from .registry import ModelCache
+from .shadow import ShadowModelService
 
 app = FastAPI()
+app.state.model_cache = None
+app.state.model_service = None
+app.state.batcher = None
+
+
+class BookingRequest(BaseModel):
+    features: Dict[str, Any]
+
+
+class PredictionResponse(BaseModel):
+    prediction: int
+    probability: float
+
+
+@app.on_event("startup")
+async def load_model():
+    # Load the model once and keep it resident for every request; other versions are loaded on demand
+    app.state.model_cache = ModelCache(
+        Config.MODEL_DIR, Config.MODEL_CACHE_MAX_MB * 1024 * 1024, backend=Config.MODEL_BACKEND
+    )
+    try:
+        app.state.model_service = await run_in_threadpool(
+            app.state.model_cache.get, Config.MODEL_NAME, Config.MODEL_VERSION
+        )
+    except (FileNotFoundError, LookupError) as e:
+        print(f"Prediction endpoint disabled: {e}")
+        app.state.model_service = None
+        return
+
+    if Config.SHADOW_MODEL_VERSION:
+        # The shadow model scores the same batches as the live one; its predictions are only logged
+        try:
+            shadow = await run_in_threadpool(
+                app.state.model_cache.get, Config.MODEL_NAME, Config.SHADOW_MODEL_VERSION
+            )
+            app.state.model_service = ShadowModelService(
+                app.state.model_service, shadow, Config.SHADOW_LOG_FILE, max_pending=Config.SHADOW_MAX_PENDING
+            )
+        except (FileNotFoundError, LookupError) as e:
+            print(f"Shadow scoring disabled: {e}")
+
+    app.state.batcher = MicroBatcher(
+        app.state.model_service.predict_proba,
+        max_batch_size=Config.BATCH_MAX_SIZE,
+        max_wait_ms=Config.BATCH_MAX_WAIT_MS,
+    )
+    await app.state.batcher.start()
+
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    if app.state.batcher is not None:
+        await app.state.batcher.stop()
+        app.state.batcher = None
+    if isinstance(app.state.model_service, ShadowModelService):
+        await run_in_threadpool(app.state.model_service.close)
+
+
+async def get_model_service(version=None):
+    """
+    Return the default model, or the cached model of another version or
+    alias of it (for A/B scoring). Versions are resolved and loaded in the
+    thread pool, so a version being loaded does not stall other requests.
+    """
+    model_service = app.state.model_service
+    if model_service is None:
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    if version is None:
+        return model_service
+    try:
+        return await run_in_threadpool(app.state.model_cache.get, Config.MODEL_NAME, version)
+    except (FileNotFoundError, LookupError) as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
 
 @app.get("/")
 def read_root():
@@ -9,3 +95,51 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics")
+def metrics():
+    if app.state.batcher is None:
+        return {}
+    metrics = app.state.batcher.metrics()
+    if isinstance(app.state.model_service, ShadowModelService):
+        metrics["shadow"] = app.state.model_service.metrics()
+    return metrics
+
+@app.post("/predict", response_model=PredictionResponse)
+async def predict(booking: BookingRequest, version: Optional[str] = None):
+    model_service = await get_model_service(version)
+    try:
+        if model_service is app.state.model_service:
+            # Concurrent requests are scored together in one predict_proba call
+            probability = float(await app.state.batcher.submit(booking.features))
+        else:
+            probability = float((await run_in_threadpool(model_service.predict_proba, [booking.features]))[0])
+    except (ValueError, TypeError) as e:
+        # Feature values the model cannot convert, e.g. text for a numeric column
+        raise HTTPException(status_code=422, detail=f"Could not score booking: {e}")
+    return {"prediction": int(probability >= 0.5), "probability": probability}
+
+@app.post("/predict/batch")
+async def predict_batch(request: Request, version: Optional[str] = None):
+    model_service = await get_model_service(version)
+    body = await request.body()
+    try:
+        table = read_table(body, request.headers.get("content-type"))
+    except UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse request body: {e}")
+
+    # Rows are scored chunk by chunk and streamed back in the order they were received. The first
+    # chunk is scored before the response starts, so a body that does not fit the features gets an
+    # error status rather than an empty 200
+    results = score_batches(table, model_service, Config.BATCH_CHUNK_ROWS)
+    try:
+        first = await run_in_threadpool(next, results, None)
+    except (ValueError, TypeError, KeyError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not score request body: {e}")
+    if first is not None:
+        results = itertools.chain([first], results)
+    if ARROW_STREAM in request.headers.get("accept", ""):
+        return StreamingResponse(stream_arrow(results), media_type=ARROW_STREAM)
+    return StreamingResponse(stream_ndjson(results), media_type=NDJSON)
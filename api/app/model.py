@@ -0,0 +1,111 @@
+import os
+import joblib
+import numpy as np
+import pandas as pd
+
+from model_artifacts.loading import XGBOOST_EXTENSIONS, load_model_file
+from model_artifacts.packed_forest import PackedForest
+
+
+def get_model_path(model_dir, model_name, version, extension='pkl'):
+    """
+    Build the path used by data_science/src/utils/models.save_model.
+    """
+    return os.path.join(model_dir, model_name, f"{model_name}_{version}.{extension}")
+
+
+def find_model_path(model_dir, model_name, version):
+    """
+    Return the saved model file of a version, whichever format it was saved in.
+    """
+    for extension in XGBOOST_EXTENSIONS + ('pkl',):
+        model_path = get_model_path(model_dir, model_name, version, extension)
+        if os.path.exists(model_path):
+            return model_path
+    raise FileNotFoundError(f"Model file {get_model_path(model_dir, model_name, version)} does not exist.")
+
+
+def get_preprocessor_path(model_dir, model_name, version):
+    """
+    Build the path used by data_science/src/utils/models.save_preprocessor.
+    """
+    return os.path.join(model_dir, model_name, f"{model_name}_{version}_preprocessor.pkl")
+
+
+def get_forest_path(model_dir, model_name, version):
+    """
+    Build the path used by data_science/src/utils/models.save_model to export a packed forest.
+    """
+    return os.path.join(model_dir, model_name, f"{model_name}_{version}_forest")
+
+
+class ModelService:
+    """Keeps a fitted classifier resident in memory and scores bookings."""
+
+    def __init__(self, model, preprocessor=None, name=None, version=None):
+        self.model = model
+        self.preprocessor = preprocessor
+        self.name = name
+        self.version = version
+        # The fitted preprocessor (or a model fitted on a DataFrame) fixes the input column layout
+        fitted = preprocessor if preprocessor is not None else model
+        feature_names = getattr(fitted, 'feature_names_in_', None)
+        self.feature_names = list(feature_names) if feature_names is not None else None
+
+    @classmethod
+    def load(cls, model_dir, model_name, version, backend='sklearn'):
+        """
+        Load a saved model. With backend='packed', random forests are scored by
+        PackedForest, from the exported node arrays when they exist or packed
+        from the sklearn model otherwise.
+        """
+        forest_path = get_forest_path(model_dir, model_name, version)
+        if backend == 'packed' and os.path.exists(forest_path):
+            print(f"Loading packed forest from {forest_path}...")
+            model = PackedForest.load(forest_path)
+        else:
+            model_path = find_model_path(model_dir, model_name, version)
+            print(f"Loading model from {model_path}...")
+            model = load_model_file(model_path)
+            if backend == 'packed':
+                # Already imported by unpickling a forest; importing it at module level would slow down startup
+                from sklearn.ensemble import RandomForestClassifier
+                if isinstance(model, RandomForestClassifier):
+                    model = PackedForest.from_sklearn(model)
+        if isinstance(model, PackedForest):
+            # Compile the scoring loop before the first request
+            model.predict_proba(np.zeros((1, model.n_features_in_)))
+
+        preprocessor = None
+        preprocessor_path = get_preprocessor_path(model_dir, model_name, version)
+        if os.path.exists(preprocessor_path):
+            print(f"Loading preprocessor from {preprocessor_path}...")
+            preprocessor = joblib.load(preprocessor_path)
+        return cls(model, preprocessor, model_name, version)
+
+    def to_features(self, df):
+        """
+        Build the feature matrix for a frame of bookings.
+
+        With a fitted preprocessor, raw booking columns are encoded with the
+        categories and scaling learned at training time. Otherwise the frame is
+        expected to be already encoded: columns unknown to the model are dropped
+        and missing ones are filled with 0, which matches the one-hot layout.
+        """
+        if self.preprocessor is not None:
+            return self.preprocessor.transform(df.reindex(columns=self.feature_names))
+        if self.feature_names is None:
+            return df.to_numpy()
+        return df.reindex(columns=self.feature_names, fill_value=0)
+
+    def predict_proba_frame(self, df):
+        """
+        Return the cancellation probability of each row of a DataFrame.
+        """
+        return np.asarray(self.model.predict_proba(self.to_features(df)))[:, 1]
+
+    def predict_proba(self, records):
+        """
+        Return the cancellation probability of each booking record.
+        """
+        return self.predict_proba_frame(pd.DataFrame.from_records(records))
@@ -0,0 +1,105 @@
+import os
+import threading
+from collections import OrderedDict
+
+from model_artifacts.registry import REGISTRY_FILE, load_registry, resolve_version
+
+from .model import ModelService, find_model_path, get_forest_path, get_preprocessor_path
+
+
+def get_registry_path(model_dir, model_name):
+    return os.path.join(model_dir, model_name, REGISTRY_FILE)
+
+
+def get_artifact_bytes(model_dir, model_name, version):
+    """
+    Size on disk of the artifacts of a version, used as an estimate of the
+    memory it takes once loaded.
+    """
+    paths = [find_model_path(model_dir, model_name, version), get_preprocessor_path(model_dir, model_name, version)]
+    forest_path = get_forest_path(model_dir, model_name, version)
+    if os.path.isdir(forest_path):
+        paths += [os.path.join(forest_path, name) for name in os.listdir(forest_path)]
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+class ModelCache:
+    """
+    Loaded model versions, kept in memory so several versions (e.g. a
+    champion and a challenger) can be scored without reloading them from
+    disk. The least recently used versions are evicted once the artifacts
+    of the cached versions exceed max_bytes; the last loaded version is
+    always kept.
+    """
+
+    def __init__(self, model_dir, max_bytes, backend='sklearn'):
+        self.model_dir = model_dir
+        self.max_bytes = max_bytes
+        self.backend = backend
+        self._models = OrderedDict()
+        # The cache-wide lock only guards the dictionaries; a version is
+        # loaded under its own lock, so loading it neither blocks requests
+        # for other versions nor happens twice for concurrent requests
+        self._lock = threading.Lock()
+        self._loading = {}
+        self._registries = {}
+
+    def resolve(self, model_name, ref):
+        """
+        Resolve a version or alias of a model. The registry is parsed again
+        only when its file changed since it was last read.
+        """
+        registry_path = get_registry_path(self.model_dir, model_name)
+        try:
+            stat = os.stat(registry_path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        with self._lock:
+            cached = self._registries.get(model_name)
+        if cached is None or cached[0] != signature:
+            cached = (signature, load_registry(registry_path))
+            with self._lock:
+                self._registries[model_name] = cached
+        return resolve_version(cached[1], model_name, ref)
+
+    def get(self, model_name, ref):
+        """
+        Return the ModelService of a version or alias, loading it on first
+        use. Raises LookupError for an unknown alias and FileNotFoundError
+        for a version without artifacts. Loading blocks, so async callers
+        run this in a thread pool.
+        """
+        key = (model_name, self.resolve(model_name, ref))
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                return self._models[key][0]
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    # Loaded by a concurrent request while this one waited
+                    self._models.move_to_end(key)
+                    return self._models[key][0]
+            try:
+                model_service = ModelService.load(self.model_dir, model_name, key[1], backend=self.backend)
+                nbytes = get_artifact_bytes(self.model_dir, model_name, key[1])
+                with self._lock:
+                    self._models[key] = (model_service, nbytes)
+                    while len(self._models) > 1 and self.nbytes > self.max_bytes:
+                        (evicted_name, evicted_version), _ = self._models.popitem(last=False)
+                        print(f"Evicted {evicted_name} {evicted_version} from the model cache")
+            finally:
+                with self._lock:
+                    self._loading.pop(key, None)
+            return model_service
+
+    @property
+    def nbytes(self):
+        return sum(nbytes for _, nbytes in self._models.values())
+
+    def versions(self):
+        with self._lock:
+            return list(self._models)
@@ -0,0 +1,124 @@
+import json
+import queue
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from .batching import Histogram
+
+
+class ShadowModelService:
+    """
+    Scores bookings with the live model and returns its probabilities; the
+    same frames are scored by a shadow (candidate) model on a background
+    thread, so the candidate can be compared on real traffic before it is
+    promoted. The shadow probabilities and the time each model took are
+    logged per batch. Shadow scoring never delays or fails a request:
+    batches arriving while max_pending are waiting are dropped, and errors
+    of the shadow model or of the log are only counted.
+    """
+
+    def __init__(self, live, shadow, log_file=None, max_pending=100):
+        self.live = live
+        self.shadow = shadow
+        self.log_file = log_file
+        self.name = live.name
+        self.version = live.version
+        self.feature_names = live.feature_names
+        self.scoring_ms_histogram = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000])
+        self.shadow_scoring_ms_histogram = Histogram([0.5, 1, 2, 5, 10, 25, 50, 100, 250, 1000])
+        self.rows = 0
+        self.agreements = 0
+        self.errors = 0
+        self.dropped = 0
+        self._lock = threading.Lock()
+        self._pending = queue.Queue(maxsize=max_pending)
+        self._worker = threading.Thread(target=self._score_pending, name='shadow-scoring', daemon=True)
+        self._worker.start()
+
+    def predict_proba_frame(self, df):
+        """
+        Return the live cancellation probability of each row of a DataFrame.
+        """
+        started = time.perf_counter()
+        probability = self.live.predict_proba_frame(df)
+        scoring_ms = (time.perf_counter() - started) * 1000
+        try:
+            self._pending.put_nowait((df, probability, scoring_ms))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+        return probability
+
+    def predict_proba(self, records):
+        """
+        Return the live cancellation probability of each booking record.
+        """
+        return self.predict_proba_frame(pd.DataFrame.from_records(records))
+
+    def _score_pending(self):
+        while True:
+            batch = self._pending.get()
+            try:
+                if batch is None:
+                    return
+                self._score(*batch)
+            finally:
+                self._pending.task_done()
+
+    def _score(self, df, probability, scoring_ms):
+        try:
+            started = time.perf_counter()
+            shadow_probability = self.shadow.predict_proba_frame(df)
+            self.record(probability, shadow_probability, scoring_ms, (time.perf_counter() - started) * 1000)
+        except Exception as e:
+            print(f"Error scoring with shadow model {self.shadow.version}: {e}")
+            with self._lock:
+                self.errors += 1
+
+    def record(self, probability, shadow_probability, scoring_ms, shadow_scoring_ms):
+        agreements = int(np.sum((probability >= 0.5) == (shadow_probability >= 0.5)))
+        with self._lock:
+            self.scoring_ms_histogram.observe(scoring_ms)
+            self.shadow_scoring_ms_histogram.observe(shadow_scoring_ms)
+            self.rows += len(probability)
+            self.agreements += agreements
+        if self.log_file:
+            # Only the background thread writes the log, so it is written outside the lock
+            entry = {
+                'time': time.time(),
+                'model': self.live.version,
+                'shadow_model': self.shadow.version,
+                'rows': len(probability),
+                'agreements': agreements,
+                'scoring_ms': scoring_ms,
+                'shadow_scoring_ms': shadow_scoring_ms,
+                'probability': np.asarray(probability, dtype=float).tolist(),
+                'shadow_probability': np.asarray(shadow_probability, dtype=float).tolist(),
+            }
+            with open(self.log_file, 'a') as file:
+                file.write(json.dumps(entry) + '\n')
+
+    def flush(self):
+        """Wait until the batches scored so far have been scored by the shadow model."""
+        self._pending.join()
+
+    def close(self):
+        """Score the pending batches and stop the background thread."""
+        self._pending.put(None)
+        self._worker.join()
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "model": self.live.version,
+                "shadow_model": self.shadow.version,
+                "rows": self.rows,
+                "agreement": self.agreements / self.rows if self.rows else None,
+                "errors": self.errors,
+                "dropped": self.dropped,
+                "scoring_ms": self.scoring_ms_histogram.snapshot(),
+                "shadow_scoring_ms": self.shadow_scoring_ms_histogram.snapshot(),
+            }
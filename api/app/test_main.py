@@ -1,5 +1,32 @@
+import asyncio
+import io
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import joblib
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import numpy as np
+import scipy.sparse as sp
 from fastapi.testclient import TestClient
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from xgboost import XGBClassifier
+from testing.import_times import get_import_times
+from model_artifacts import packed_forest
+from model_artifacts.packed_forest import PackedForest
+from model_artifacts.registry import load_registry
+from .batch_io import ARROW_STREAM, NDJSON, PARQUET, stream_ndjson
+from .batching import MicroBatcher
+from . import registry
+from .config import Config
 from .main import app 
+from .model import ModelService, get_forest_path, get_model_path, get_preprocessor_path
+from .registry import ModelCache, get_artifact_bytes, get_registry_path
 
 client = TestClient(app)
 
@@ -7,3 +34,369 @@ def test_health_check():
     response = client.get("/health")
     assert response.status_code == 200
     assert response.json() == {"status": "healthy"}
+
+@pytest.fixture
+def model_dir(tmp_path, monkeypatch):
+    X = pd.DataFrame({
+        'lead_time': [1, 2, 300, 400, 5, 350],
+        'hotel_Resort Hotel': [1, 0, 1, 0, 1, 0],
+    })
+    y = [0, 0, 1, 1, 0, 1]
+    model = RandomForestClassifier(n_estimators=5, random_state=42).fit(X, y)
+
+    model_path = get_model_path(str(tmp_path), 'RandomForestClassifier', 'v1')
+    os.makedirs(os.path.dirname(model_path))
+    joblib.dump(model, model_path)
+
+    monkeypatch.setattr(Config, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'MODEL_NAME', 'RandomForestClassifier')
+    monkeypatch.setattr(Config, 'MODEL_VERSION', 'v1')
+    return tmp_path
+
+def test_predict(model_dir):
+    with TestClient(app) as client:
+        response = client.post("/predict", json={"features": {"lead_time": 380, "hotel_Resort Hotel": 0}})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["prediction"] == 1
+    assert 0.5 <= body["probability"] <= 1.0
+
+def test_predict_ignores_unknown_and_missing_features(model_dir):
+    with TestClient(app) as client:
+        response = client.post("/predict", json={"features": {"lead_time": 2, "unknown": "x"}})
+    assert response.status_code == 200
+    assert response.json()["prediction"] == 0
+
+def test_predict_applies_saved_preprocessor(tmp_path, monkeypatch):
+    raw = pd.DataFrame({
+        'hotel': ['Resort Hotel', 'City Hotel', 'Resort Hotel', 'City Hotel'],
+        'adr': [50.0, 120.0, 60.0, 130.0],
+    })
+    preprocessor = ColumnTransformer([
+        ('categorical', OneHotEncoder(handle_unknown='ignore', sparse_output=False), ['hotel']),
+        ('numerical', StandardScaler(), ['adr']),
+    ]).fit(raw)
+    model = RandomForestClassifier(n_estimators=5, random_state=42).fit(preprocessor.transform(raw), [0, 1, 0, 1])
+
+    model_path = get_model_path(str(tmp_path), 'RandomForestClassifier', 'v1')
+    os.makedirs(os.path.dirname(model_path))
+    joblib.dump(model, model_path)
+    joblib.dump(preprocessor, get_preprocessor_path(str(tmp_path), 'RandomForestClassifier', 'v1'))
+    monkeypatch.setattr(Config, 'MODEL_DIR', str(tmp_path))
+
+    with TestClient(app) as client:
+        response = client.post("/predict", json={"features": {"hotel": "City Hotel", "adr": 125.0, "extra": 1}})
+    assert response.status_code == 200
+    assert response.json()["prediction"] == 1
+
+def test_predict_without_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'MODEL_DIR', str(tmp_path))
+    with TestClient(app) as client:
+        response = client.post("/predict", json={"features": {"lead_time": 1}})
+    assert response.status_code == 503
+
+def test_micro_batcher_coalesces_concurrent_requests():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        return [record["value"] * 2 for record in records]
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=50)
+        await batcher.start()
+        try:
+            return await asyncio.gather(*(batcher.submit({"value": i}) for i in range(20))), batcher.metrics()
+        finally:
+            await batcher.stop()
+
+    results, metrics = asyncio.run(run())
+    assert results == [i * 2 for i in range(20)]
+    assert calls == [8, 8, 4]
+    assert metrics["batch_size"]["count"] == 3
+    assert metrics["queue_wait_ms"]["count"] == 20
+
+def test_micro_batcher_propagates_errors():
+    def predict_fn(records):
+        raise ValueError("bad batch")
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=1)
+        await batcher.start()
+        try:
+            await batcher.submit({"value": 1})
+        finally:
+            await batcher.stop()
+
+    with pytest.raises(ValueError, match="bad batch"):
+        asyncio.run(run())
+
+def test_micro_batcher_only_fails_the_request_with_a_bad_record():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        return [100 / record["value"] for record in records]
+
+    async def run():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        try:
+            results = await asyncio.gather(*(batcher.submit({"value": i}) for i in (1, 0, 4, 5)),
+                                           return_exceptions=True)
+            return results, batcher.metrics()
+        finally:
+            await batcher.stop()
+
+    results, metrics = asyncio.run(run())
+    assert results[0] == 100 and results[2:] == [25, 20]
+    assert isinstance(results[1], ZeroDivisionError)
+    assert calls == [4, 1, 1, 1, 1]
+    assert metrics["failed_batches"] == 1
+
+def test_predict_rejects_values_that_cannot_be_converted(model_dir):
+    with TestClient(app) as client:
+        response = client.post("/predict", json={"features": {"lead_time": "abc"}})
+        assert response.status_code == 422
+        assert "Could not score" in response.json()["detail"]
+        # The bad record only fails its own request
+        assert client.post("/predict", json={"features": {"lead_time": 380}}).status_code == 200
+
+def test_metrics_reports_batches(model_dir):
+    with TestClient(app) as client:
+        client.post("/predict", json={"features": {"lead_time": 380}})
+        response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.json()["batch_size"]["count"] >= 1
+
+@pytest.fixture
+def batch_df():
+    return pd.DataFrame({'lead_time': [380, 2, 390], 'hotel_Resort Hotel': [0, 1, 0]})
+
+def test_predict_batch_ndjson(model_dir, batch_df, monkeypatch):
+    monkeypatch.setattr(Config, 'BATCH_CHUNK_ROWS', 2)
+    body = batch_df.to_json(orient='records', lines=True)
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", content=body, headers={"content-type": NDJSON})
+    assert response.status_code == 200
+    result = pd.read_json(io.StringIO(response.text), lines=True)
+    assert result['prediction'].tolist() == [1, 0, 1]
+
+def test_predict_batch_parquet_to_arrow(model_dir, batch_df):
+    sink = pa.BufferOutputStream()
+    pq.write_table(pa.Table.from_pandas(batch_df), sink)
+    with TestClient(app) as client:
+        response = client.post(
+            "/predict/batch",
+            content=sink.getvalue().to_pybytes(),
+            headers={"content-type": PARQUET, "accept": ARROW_STREAM},
+        )
+    assert response.status_code == 200
+    result = pa.ipc.open_stream(response.content).read_all().to_pandas()
+    assert result['prediction'].tolist() == [1, 0, 1]
+
+def test_predict_batch_arrow_stream(model_dir, batch_df):
+    table = pa.Table.from_pandas(batch_df)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", content=sink.getvalue().to_pybytes(), headers={"content-type": ARROW_STREAM})
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 3
+
+def test_predict_batch_rejects_rows_that_cannot_be_scored(model_dir):
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", content=b'{"lead_time": "x"}\n', headers={"content-type": NDJSON})
+    assert response.status_code == 400
+    assert "Could not score" in response.json()["detail"]
+
+def test_stream_ndjson_reports_a_failed_chunk_and_aborts():
+    def results():
+        yield pd.DataFrame({'prediction': [1], 'probability': [0.9]})
+        raise ValueError("bad chunk")
+
+    stream = stream_ndjson(results())
+    assert json.loads(next(stream))["prediction"] == 1
+    assert "bad chunk" in json.loads(next(stream))["error"]
+    with pytest.raises(ValueError, match="bad chunk"):
+        next(stream)
+
+def test_predict_batch_unsupported_content_type(model_dir):
+    with TestClient(app) as client:
+        response = client.post("/predict/batch", content=b"a,b", headers={"content-type": "text/csv"})
+    assert response.status_code == 415
+
+def test_load_native_xgboost_model(tmp_path):
+    X = pd.DataFrame({'lead_time': [1, 2, 300, 400, 5, 350], 'adr': [10.0, 20.0, 30.0, 40.0, 50.0, 60.0]})
+    y = [0, 0, 1, 1, 0, 1]
+    model = XGBClassifier(n_estimators=5, max_depth=2).fit(X, y)
+    model_path = get_model_path(str(tmp_path), 'XGBoostClassifier', 'v1', 'ubj')
+    os.makedirs(os.path.dirname(model_path))
+    model.save_model(model_path)
+
+    service = ModelService.load(str(tmp_path), 'XGBoostClassifier', 'v1')
+    assert service.feature_names == ['lead_time', 'adr']
+    probability = service.predict_proba([{'lead_time': 350, 'adr': 60.0}, {'adr': 10.0, 'lead_time': 1}])
+    assert probability.tolist() == pytest.approx(model.predict_proba(X.iloc[[5, 0]])[:, 1].tolist())
+
+def test_packed_forest_matches_sklearn_predict_proba(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    X = rng.random((300, 6))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    y = (np.nan_to_num(X[:, 0]) + rng.random(300) * 0.5 > 0.7).astype(int)
+    model = RandomForestClassifier(n_estimators=20, random_state=0).fit(X, y)
+
+    PackedForest.from_sklearn(model).save(str(tmp_path / "forest"))
+    forest = PackedForest.load(str(tmp_path / "forest"))
+
+    X_new = rng.random((100, 6))
+    X_new[rng.random(X_new.shape) < 0.05] = np.nan
+    np.testing.assert_array_equal(forest.predict_proba(X_new), model.predict_proba(X_new))
+    np.testing.assert_array_equal(forest.predict(X_new), model.predict(X_new))
+
+    # Sparse rows are densified in blocks; a small block size scores several of them
+    monkeypatch.setattr(packed_forest, 'CSR_BLOCK_ROWS', 16)
+    X_sparse = sp.csr_matrix(np.nan_to_num(X_new) * (X_new > 0.5))
+    np.testing.assert_array_equal(forest.predict_proba(X_sparse), model.predict_proba(X_sparse))
+
+def test_predict_with_packed_backend(model_dir, monkeypatch):
+    model = joblib.load(get_model_path(str(model_dir), 'RandomForestClassifier', 'v1'))
+    PackedForest.from_sklearn(model).save(get_forest_path(str(model_dir), 'RandomForestClassifier', 'v1'))
+    monkeypatch.setattr(Config, 'MODEL_BACKEND', 'packed')
+
+    with TestClient(app) as client:
+        assert isinstance(app.state.model_service.model, PackedForest)
+        response = client.post("/predict", json={"features": {"lead_time": 350, "hotel_Resort Hotel": 0}})
+    assert response.status_code == 200
+    expected = model.predict_proba(pd.DataFrame({'lead_time': [350], 'hotel_Resort Hotel': [0]}))[0, 1]
+    assert response.json()["probability"] == expected
+
+@pytest.fixture
+def registry_dir(tmp_path, monkeypatch):
+    """Two versions with opposite labels; "champion" points to v1 and "latest" to v2."""
+    X = pd.DataFrame({'lead_time': [1, 2, 300, 400, 5, 350]})
+    for version, y in (('v1', [0, 0, 1, 1, 0, 1]), ('v2', [1, 1, 0, 0, 1, 0])):
+        model_path = get_model_path(str(tmp_path), 'RandomForestClassifier', version)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        joblib.dump(RandomForestClassifier(n_estimators=5, random_state=42).fit(X, y), model_path)
+    registry = {
+        'versions': {version: {'model': f'RandomForestClassifier_{version}.pkl'} for version in ('v1', 'v2')},
+        'aliases': {'champion': 'v1', 'latest': 'v2'},
+    }
+    with open(get_registry_path(str(tmp_path), 'RandomForestClassifier'), 'w') as file:
+        json.dump(registry, file)
+
+    monkeypatch.setattr(Config, 'MODEL_DIR', str(tmp_path))
+    monkeypatch.setattr(Config, 'MODEL_NAME', 'RandomForestClassifier')
+    monkeypatch.setattr(Config, 'MODEL_VERSION', 'champion')
+    return tmp_path
+
+def test_model_cache_resolves_aliases_and_evicts_least_recently_used(registry_dir):
+    max_bytes = get_artifact_bytes(str(registry_dir), 'RandomForestClassifier', 'v1') * 1.5
+    cache = ModelCache(str(registry_dir), max_bytes)
+
+    champion = cache.get('RandomForestClassifier', 'champion')
+    assert champion.version == 'v1'
+    assert cache.get('RandomForestClassifier', 'v1') is champion
+    assert cache.get('RandomForestClassifier', 'latest').version == 'v2'
+    # Both versions do not fit in the budget, so the least recently used one was evicted
+    assert cache.versions() == [('RandomForestClassifier', 'v2')]
+    with pytest.raises(LookupError):
+        cache.get('RandomForestClassifier', 'staging')
+
+def test_model_cache_loads_a_version_once_without_blocking_other_versions(registry_dir, monkeypatch):
+    cache = ModelCache(str(registry_dir), float('inf'))
+    loads = []
+    release = threading.Event()
+    load = ModelService.load.__func__
+
+    def slow_load(cls, model_dir, model_name, version, backend='sklearn'):
+        loads.append(version)
+        if version == 'v1':
+            assert release.wait(5)
+        return load(cls, model_dir, model_name, version, backend=backend)
+
+    monkeypatch.setattr(ModelService, 'load', classmethod(slow_load))
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        champion = pool.submit(cache.get, 'RandomForestClassifier', 'champion')
+        v1 = pool.submit(cache.get, 'RandomForestClassifier', 'v1')
+        # v2 loads while v1 is still loading
+        assert cache.get('RandomForestClassifier', 'latest').version == 'v2'
+        release.set()
+        assert champion.result() is v1.result()
+    assert sorted(loads) == ['v1', 'v2']
+
+def test_model_cache_reads_the_registry_only_when_it_changes(registry_dir, monkeypatch):
+    cache = ModelCache(str(registry_dir), float('inf'))
+    reads = []
+    monkeypatch.setattr(registry, 'load_registry', lambda path: reads.append(path) or load_registry(path))
+
+    assert cache.get('RandomForestClassifier', 'champion').version == 'v1'
+    assert cache.get('RandomForestClassifier', 'champion').version == 'v1'
+    assert len(reads) == 1
+
+    registry_path = get_registry_path(str(registry_dir), 'RandomForestClassifier')
+    with open(registry_path) as file:
+        moved = json.load(file)
+    moved['aliases']['champion'] = 'v2'
+    with open(registry_path, 'w') as file:
+        json.dump(moved, file)
+    assert cache.get('RandomForestClassifier', 'champion').version == 'v2'
+    assert len(reads) == 2
+
+def test_predict_with_another_version(registry_dir):
+    features = {"features": {"lead_time": 380}}
+    with TestClient(app) as client:
+        assert client.post("/predict", json=features).json()["prediction"] == 1
+        assert client.post("/predict?version=latest", json=features).json()["prediction"] == 0
+        assert client.post("/predict?version=staging", json=features).status_code == 404
+
+def test_predict_with_shadow_model(registry_dir, batch_df, monkeypatch):
+    log_file = registry_dir / 'shadow.ndjson'
+    monkeypatch.setattr(Config, 'SHADOW_MODEL_VERSION', 'latest')
+    monkeypatch.setattr(Config, 'SHADOW_LOG_FILE', str(log_file))
+    with TestClient(app) as client:
+        # Responses carry the champion's predictions; the shadow model disagrees on every booking
+        assert client.post("/predict", json={"features": {"lead_time": 380}}).json()["prediction"] == 1
+        response = client.post("/predict/batch", content=batch_df.to_json(orient='records', lines=True),
+                               headers={"content-type": NDJSON})
+        predictions = [json.loads(line)["prediction"] for line in response.text.splitlines()]
+        assert predictions == [1, 0, 1]
+        # The shadow model scores the batches in the background
+        app.state.model_service.flush()
+        shadow_metrics = client.get("/metrics").json()["shadow"]
+
+    assert shadow_metrics["model"] == "v1" and shadow_metrics["shadow_model"] == "v2"
+    assert shadow_metrics["rows"] == 4
+    assert shadow_metrics["agreement"] == 0
+    entries = [json.loads(line) for line in log_file.read_text().splitlines()]
+    assert [entry["rows"] for entry in entries] == [1, 3]
+    assert [round(p) for p in entries[1]["shadow_probability"]] == [0, 1, 0]
+    assert all(entry["shadow_scoring_ms"] > 0 for entry in entries)
+
+def test_shadow_model_never_fails_or_delays_requests(registry_dir, monkeypatch):
+    monkeypatch.setattr(Config, 'SHADOW_MODEL_VERSION', 'latest')
+    # The log cannot be written: its directory does not exist
+    monkeypatch.setattr(Config, 'SHADOW_LOG_FILE', str(registry_dir / 'missing' / 'shadow.ndjson'))
+    monkeypatch.setattr(Config, 'SHADOW_MAX_PENDING', 1)
+    features = {"features": {"lead_time": 380}}
+    with TestClient(app) as client:
+        assert client.post("/predict", json=features).json()["prediction"] == 1
+        app.state.model_service.flush()
+        assert client.get("/metrics").json()["shadow"]["errors"] == 1
+
+        # While the shadow model is busy, requests are answered and the batches it cannot keep up with are dropped
+        release = threading.Event()
+        shadow = app.state.model_service.shadow
+        monkeypatch.setattr(shadow, 'predict_proba_frame', lambda df: release.wait(5))
+        for _ in range(3):
+            assert client.post("/predict", json=features).json()["prediction"] == 1
+        release.set()
+        app.state.model_service.flush()
+        assert client.get("/metrics").json()["shadow"]["dropped"] >= 1
+
+def test_import_defers_heavy_dependencies():
+    times = get_import_times('import app.main', os.path.dirname(os.path.dirname(__file__)))
+    assert not {'sklearn', 'numba', 'pyarrow.parquet'} & set(times)
+
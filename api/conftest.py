@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The app imports the shared model_artifacts package from the repository root, as in the image,
+# and the tests the shared helpers (testing/)
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
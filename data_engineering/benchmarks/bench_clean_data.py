@@ -0,0 +1,98 @@
+"""
+Benchmark of the feature engineering steps in src/data/clean_data.py.
+
+Compares the vectorized arrival date, season and interaction features with
+the row-wise versions they replaced, on the raw dataset when it has been
+downloaded or on a synthetic frame of the same size otherwise.
+
+Run from the data_engineering directory:
+
+    python -m benchmarks.bench_clean_data [--rows N] [--repeat R]
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.data.clean_data import MONTH_NAMES, build_arrival_date, combine_categories, map_season
+
+# Number of bookings in the full hotel_bookings.csv
+FULL_DATASET_ROWS = 119390
+
+RAW_DATA_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../data/raw/hotel_bookings.csv'))
+
+BENCH_COLS = ['arrival_date_year', 'arrival_date_month', 'arrival_date_day_of_month', 'reserved_room_type', 'customer_type']
+
+
+def load_bookings(rows):
+    if os.path.exists(RAW_DATA_PATH):
+        return pd.read_csv(RAW_DATA_PATH, usecols=BENCH_COLS)
+
+    rng = np.random.default_rng(0)
+    return pd.DataFrame({
+        'arrival_date_year': rng.choice([2015, 2016, 2017], rows),
+        'arrival_date_month': rng.choice(MONTH_NAMES, rows),
+        'arrival_date_day_of_month': rng.integers(1, 29, rows),
+        'reserved_room_type': rng.choice(list('ABCDEFGHLP'), rows),
+        'customer_type': rng.choice(['Transient', 'Contract', 'Transient-Party', 'Group'], rows),
+    })
+
+
+# Previous implementation: string dates, per-row season mapping and string concatenation
+def get_season(month):
+    if month in [12, 1, 2]:
+        return 'Invierno'
+    elif month in [3, 4, 5]:
+        return 'Primavera'
+    elif month in [6, 7, 8]:
+        return 'Verano'
+    else:
+        return 'Otoño'
+
+def rowwise_features(df):
+    arrival_date = pd.to_datetime(df['arrival_date_year'].astype(str) + '-' +
+                                  df['arrival_date_month'].astype(str) + '-' +
+                                  df['arrival_date_day_of_month'].astype(str))
+    season = arrival_date.dt.month.apply(get_season)
+    room_season = (df['reserved_room_type'] + '_' + season).astype('category')
+    customer_season = (df['customer_type'].astype(str) + '_' + season.astype(str)).astype('category')
+    return arrival_date, season, room_season, customer_season
+
+def vectorized_features(df):
+    arrival_date = build_arrival_date(df)
+    season = map_season(arrival_date.dt.month)
+    room_season = combine_categories(df['reserved_room_type'], season)
+    customer_season = combine_categories(df['customer_type'], season)
+    return arrival_date, season, room_season, customer_season
+
+
+def best_time(fn, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df.copy())
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the clean_data feature engineering.')
+    parser.add_argument('--rows', type=int, default=FULL_DATASET_ROWS,
+                        help='Rows of the synthetic frame used when the raw dataset is not available.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per implementation; the best one is reported.')
+    args = parser.parse_args()
+
+    df = load_bookings(args.rows)
+
+    # Both implementations must produce the same features
+    for expected, result in zip(rowwise_features(df.copy()), vectorized_features(df.copy())):
+        pd.testing.assert_series_equal(expected.astype(str), result.astype(str), check_names=False)
+
+    rowwise = best_time(rowwise_features, df, args.repeat)
+    vectorized = best_time(vectorized_features, df, args.repeat)
+    print(f"rows: {len(df)}")
+    print(f"row-wise:   {rowwise * 1000:.1f} ms")
+    print(f"vectorized: {vectorized * 1000:.1f} ms")
+    print(f"speedup:    {rowwise / vectorized:.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,32 @@
+from airflow import DAG
+from airflow.providers.http.operators.http import SimpleHttpOperator
+from airflow.utils.dates import days_ago
+
+
+default_args = {
+    'owner': 'airflow',
+    'depends_on_past': False,
+    'start_date': days_ago(1),
+    'retries': 1,
+}
+
+# Hourly inference on the resident worker (inference-executor with INFERENCE_MODE=worker),
+# which keeps the model loaded instead of starting a container for every run
+dag = DAG(
+    'inference_worker_dag',
+    default_args=default_args,
+    description='DAG para encolar inferencia en el worker residente',
+    schedule_interval='0 * * * *',
+)
+
+queue_inference_task = SimpleHttpOperator(
+    task_id='queue_inference',
+    http_conn_id='inference_worker',
+    endpoint='jobs',
+    method='POST',
+    data='{}',
+    headers={'Content-Type': 'application/json'},
+    dag=dag,
+)
+
+queue_inference_task
@@ -1,27 +1,74 @@
+import numpy as np
 import pandas as pd
 import argparse
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
-import os
+from object_storage.data import get_data_storage
 from src.utils.file import is_csv_empty
-
-# Function to process and clean data
-def process_data():
-    dataset_filename="hotel_bookings.csv"
-    base_dir = os.path.dirname(__file__)
-    # Construye la ruta absoluta hacia el archivo de datos
-    data_path = os.path.abspath(os.path.join(base_dir, '../../../data/raw', dataset_filename))
-    df = pd.read_csv(data_path, parse_dates=['reservation_status_date'])
-
+from src.transformations.process_bookings_data_v1 import RAW_DATA_KEY
+
+MONTH_NAMES = ['January', 'February', 'March', 'April', 'May', 'June', 'July',
+               'August', 'September', 'October', 'November', 'December']
+
+# Estaciones del año, indexadas por número de mes (la posición 0 no se usa)
+SEASONS = ['Invierno', 'Otoño', 'Primavera', 'Verano']
+SEASON_CODE_BY_MONTH = np.array([-1, 0, 0, 2, 2, 2, 3, 3, 3, 1, 1, 1, 0], dtype=np.int8)
+
+HIGH_SEASON_MONTHS = [6, 7, 8, 12]
+
+def build_arrival_date(df):
+    """
+    Assemble the arrival date from its year, month name and day columns
+    without formatting and reparsing strings.
+    """
+    year = df['arrival_date_year'].to_numpy(dtype=np.int64)
+    month = pd.Categorical(df['arrival_date_month'], categories=MONTH_NAMES).codes.astype(np.int64)
+    day = df['arrival_date_day_of_month'].to_numpy(dtype=np.int64)
+    if (month < 0).any():
+        raise ValueError("arrival_date_month contains unknown month names")
+
+    months = (year - 1970) * 12 + month
+    arrival_date = months.astype('datetime64[M]').astype('datetime64[D]') + (day - 1)
+    # Days past the end of the month would silently roll over into the next one
+    if (arrival_date.astype('datetime64[M]') != months.astype('datetime64[M]')).any():
+        raise ValueError("arrival_date_day_of_month is out of range for its month")
+    return pd.Series(arrival_date.astype('datetime64[ns]'), index=df.index)
+
+def map_season(month):
+    """
+    Map month numbers (1-12) to a season categorical through a lookup array.
+    """
+    codes = SEASON_CODE_BY_MONTH[month.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, categories=SEASONS), index=month.index)
+
+def combine_categories(left, right, sep='_'):
+    """
+    Build the interaction "left_right" of two columns from their category codes.
+
+    Only the distinct pairs are turned into strings, instead of concatenating
+    one string per row. A row missing either value is missing (code -1), as
+    string concatenation would give NaN.
+    """
+    left = left.astype('category')
+    right = right.astype('category')
+    n_right = len(right.cat.categories)
+    left_codes = left.cat.codes.to_numpy(dtype=np.int64)
+    right_codes = right.cat.codes.to_numpy(dtype=np.int64)
+    codes = np.where((left_codes == -1) | (right_codes == -1), -1, left_codes * n_right + right_codes)
+    categories = [f"{left_value}{sep}{right_value}" for left_value in left.cat.categories
+                  for right_value in right.cat.categories]
+    combined = pd.Categorical.from_codes(codes, categories=categories).remove_unused_categories()
+    return pd.Series(combined, index=left.index)
+
+# Function to add the engineered features to the raw bookings
+def engineer_features(df):
     # Proceso de limpieza de datos
     df[['agent','company']] = df[['agent','company']].fillna(0)
     df['country'] = df['country'].fillna(df.country.mode()[0])
     df['children'] = df['children'].fillna(df.children.mode()[0])
 
     # Crear una columna de fecha completa
-    df['arrival_date'] = pd.to_datetime(df['arrival_date_year'].astype(str) + '-' + 
-                                        df['arrival_date_month'].astype(str) + '-' + 
-                                        df['arrival_date_day_of_month'].astype(str))
+    df['arrival_date'] = build_arrival_date(df)
 
     # Día de la semana de llegada
     df['arrival_day_of_week'] = df['arrival_date'].dt.dayofweek
@@ -29,18 +76,8 @@ def process_data():
     # Mes de llegada
     df['arrival_month'] = df['arrival_date'].dt.month
 
-    # Definir las estaciones del año
-    def get_season(month):
-        if month in [12, 1, 2]:
-            return 'Invierno'
-        elif month in [3, 4, 5]:
-            return 'Primavera'
-        elif month in [6, 7, 8]:
-            return 'Verano'
-        else:
-            return 'Otoño'
-
-    df['season'] = df['arrival_month'].apply(get_season)
+    # Estación del año
+    df['season'] = map_season(df['arrival_month'])
 
     # Indicador de fin de semana
     df['is_weekend'] = df['arrival_day_of_week'].isin([5, 6]).astype(int)
@@ -60,10 +97,10 @@ def process_data():
     df['total_guests'] = df['adults'] + df['children'] + df['babies']
 
     # Interacción entre tipo de habitación y temporada
-    df['room_season'] = df['reserved_room_type'] + '_' + df['season']
+    df['room_season'] = combine_categories(df['reserved_room_type'], df['season'])
 
     # Interacción entre tipo de cliente y temporada
-    df['customer_season'] = df['customer_type'].astype(str) + '_' + df['season'].astype(str)
+    df['customer_season'] = combine_categories(df['customer_type'], df['season'])
 
     # Ratio de ADR respecto al promedio de ADR para ese tipo de habitación
 
@@ -80,8 +117,7 @@ def process_data():
     df['total_special_requests'] = df['required_car_parking_spaces'] + df['total_of_special_requests']
 
     # Es temporada alta
-    high_season_months = [6, 7, 8, 12]
-    df['is_high_season'] = df['arrival_month'].isin(df).astype(int)
+    df['is_high_season'] = df['arrival_month'].isin(HIGH_SEASON_MONTHS).astype(int)
 
 
     df_transformado = df.astype({
@@ -137,6 +173,13 @@ def process_data():
 
     return df_transformado
 
+# Function to process and clean data
+def process_data(storage=None):
+    # Lee el dataset crudo del almacenamiento de datos (data/ por defecto)
+    storage = storage or get_data_storage()
+    df = storage.read_csv(RAW_DATA_KEY, parse_dates=['reservation_status_date'])
+    return engineer_features(df)
+
 # Function to save data to CSV
 def save_to_csv(df, file_path='data/processed/clean_hotel_bookings.csv'):
     df.to_csv(file_path, index=False)
@@ -1,40 +1,108 @@
 import argparse
-from utils.db import save_to_db
-from utils.file import is_csv_empty, save_to_csv
-from transformations.process_bookings_data_v1 import process_bookings_data_v1
+from utils.config import LOAD_METHODS
+from utils.file import is_csv_empty, save_to_csv, save_to_parquet, save_chunks_to_csv, save_chunks_to_parquet
+from transformations.process_bookings_data_v1 import process_bookings_data_v1, iter_process_bookings_data_v1, get_reservation_status_date
 import os
 
+def run_incremental_db(version, chunksize):
+    """
+    Load only the bookings whose reservation_status_date is at or after the
+    last run's watermark, upserting them on their booking_id.
+    """
+    from utils.db import DB_URL, drop_table_without_key, get_engine, get_watermark, set_watermark, upsert_to_db
+
+    table_name = f'hotel_bookings_v{version}'
+    engine = get_engine(DB_URL)
+    since = get_watermark(engine, table_name)
+    if drop_table_without_key(engine, table_name):
+        # Written by a full load, without booking_id: rebuilt from all the bookings
+        print(f"Table '{table_name}' has no booking_id key, rebuilding it")
+        since = None
+    print(f"Processing bookings changed since {since}" if since is not None else "No watermark found, processing all bookings")
+
+    rows = 0
+    watermark = since
+    for chunk in iter_process_bookings_data_v1(chunksize=chunksize, since=since, with_keys=True):
+        rows += upsert_to_db(chunk, engine, table_name)
+        chunk_watermark = get_reservation_status_date(chunk).max()
+        watermark = chunk_watermark if watermark is None else max(watermark, chunk_watermark)
+
+    if watermark is not None:
+        set_watermark(engine, table_name, watermark)
+    print(f"{rows} new or changed rows upserted into '{table_name}'")
+
 def main():
     parser = argparse.ArgumentParser(
         description="Process and clean hotel bookings data."
     )
     parser.add_argument(
         "--destination",
-        choices=["csv", "db"],
-        default="csv",
-        help='Specify the destination for the processed data. Options are "csv" or "db". Default is "csv".',
+        choices=["parquet", "csv", "db"],
+        default="parquet",
+        help='Specify the destination for the processed data. Options are "parquet", "csv" or "db". Default is "parquet".',
     )
     parser.add_argument(
         "--version",
         default="1",
         help='Specify the version of the transformation. Default is "1".',
     )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=None,
+        help="Stream the raw dataset in chunks of this many rows so memory stays bounded.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process bookings changed since the last run and upsert them. Only for the db destination.",
+    )
+    parser.add_argument(
+        "--load-method",
+        choices=LOAD_METHODS,
+        default="multi",
+        help='How rows are written to the db destination: "rows" (one INSERT per row), "multi" (batched multi-row INSERTs '
+             'in one transaction) or "load-data" (LOAD DATA LOCAL INFILE, MySQL only). Default is "multi".',
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="Type the columns with the compact schema (int8/int16 counts, float32 adr) to cut memory. "
+             "Not supported with --incremental, whose row hashes depend on the column types.",
+    )
     args = parser.parse_args()
 
-    # Process the data
-    transformed_df = process_bookings_data_v1()
+    if args.incremental and args.destination != "db":
+        parser.error("--incremental is only supported for the db destination.")
+    if args.chunksize is not None and args.destination == "db" and not args.incremental:
+        parser.error("--chunksize with the db destination requires --incremental.")
+    if args.compact and args.incremental:
+        parser.error("--compact is not supported with --incremental.")
 
     # Save the data based on the destination parameter
-    if args.destination == "csv":
-        dataset_filename="clean_hotel_bookings_v1.csv"
+    if args.destination in ("parquet", "csv"):
+        dataset_filename=f"clean_hotel_bookings_v1.{args.destination}"
         base_dir = os.path.dirname(__file__)
         data_path = os.path.abspath(os.path.join(base_dir, '../../data/processed', dataset_filename))
-        if is_csv_empty(data_path):
-            save_to_csv(transformed_df, data_path)
+        if not is_csv_empty(data_path):
+            print(f"{args.destination.upper()} file already contains data. No new data saved.")
+        elif args.chunksize is not None:
+            # Process and write the data chunk by chunk
+            chunks = iter_process_bookings_data_v1(chunksize=args.chunksize, compact=args.compact)
+            if args.destination == "parquet":
+                save_chunks_to_parquet(chunks, data_path)
+            else:
+                save_chunks_to_csv(chunks, data_path)
+        elif args.destination == "parquet":
+            save_to_parquet(process_bookings_data_v1(compact=args.compact), data_path)
         else:
-            print("CSV file already contains data. No new data saved.")
+            save_to_csv(process_bookings_data_v1(compact=args.compact), data_path)
+    elif args.incremental:
+        run_incremental_db(args.version, args.chunksize or 100000)
     elif args.destination == "db":
-        save_to_db(transformed_df, version=args.version)
+        # SQLAlchemy is only imported for the db destination
+        from utils.db import save_to_db
+        save_to_db(process_bookings_data_v1(compact=args.compact), version=args.version, load_method=args.load_method)
 
 
 if __name__ == "__main__":
@@ -1,55 +1,134 @@
 import pandas as pd
-from sklearn.preprocessing import StandardScaler
-from src.utils.file import load_schema
-import os
+from object_storage.data import get_data_storage
+from src.utils.file import cast_to_schema, load_schema
 
-# Function to process and clean data
-def process_bookings_data_v1():
-    schema_path = 'data/schemas/hotel_bookings/hotel_bookings_schema_v1.json'
-    hotel_bookings_schema_v1 = load_schema(schema_path)
-    # Load the raw dataset
-    dataset_filename="hotel_bookings.csv"
-    base_dir = os.path.dirname(__file__)
-    data_path = os.path.abspath(os.path.join(base_dir, '../../../data/raw', dataset_filename))
-    transformed_df = pd.read_csv(data_path)
-    
+SCHEMA_PATH = 'data/schemas/hotel_bookings/hotel_bookings_schema_v1.json'
+
+# Same columns with the narrowest types that hold the dataset (int8/int16 counts, float32 adr)
+COMPACT_SCHEMA_PATH = 'data/schemas/hotel_bookings/hotel_bookings_schema_v1_compact.json'
+
+# Columns filled with their dataset-wide mode
+MODE_FILL_COLS = ["country", "children"]
+
+# Columns that can contain NA; reading them as float keeps the dtypes of every chunk aligned
+RAW_DTYPES = {"agent": "float64", "company": "float64", "children": "float64"}
+
+# Key of the raw dataset in the data storage (see object_storage.data.get_data_storage)
+RAW_DATA_KEY = 'raw/hotel_bookings.csv'
+
+def get_schema(compact=False):
+    return load_schema(COMPACT_SCHEMA_PATH if compact else SCHEMA_PATH)
+
+def transform_bookings_v1(transformed_df, hotel_bookings_schema_v1, fill_values):
+    """
+    Clean and type a frame of raw bookings.
+
+    Every step is row-local except the mode fills, whose values are passed in
+    so that the same transformation can be applied to a whole file or to
+    each chunk of it.
+    """
     # Fill NA
     transformed_df[["agent", "company"]] = transformed_df[["agent", "company"]].fillna(0)
-    transformed_df["country"] = transformed_df["country"].fillna(transformed_df.country.mode()[0])
-    transformed_df["children"] = transformed_df["children"].fillna(transformed_df.children.mode()[0])
+    transformed_df["country"] = transformed_df["country"].fillna(fill_values["country"])
+    transformed_df["children"] = transformed_df["children"].fillna(fill_values["children"])
     # transformed_df['required_car_parking_spaces'] = transformed_df['required_car_parking_spaces'].fillna(0).astype('int64')
     # transformed_df['total_of_special_requests'] = transformed_df['total_of_special_requests'].fillna(0).astype('int64')
-    
-    transformed_df.isnull().sum().sort_values(ascending=False)
-    
-    # Transform the transformed_df to the proper data types
-    transformed_df = transformed_df.astype(hotel_bookings_schema_v1) 
 
     # Data cleaning process
-    transformed_df['reservation_status_date'] = pd.to_datetime(transformed_df['reservation_status_date'])
+    reservation_status_date = pd.to_datetime(transformed_df['reservation_status_date'])
 
     # Extraer características de fecha (año, mes, día)
-    transformed_df['reservation_year'] = transformed_df['reservation_status_date'].dt.year
-    transformed_df['reservation_month'] = transformed_df['reservation_status_date'].dt.month
-    transformed_df['reservation_day'] = transformed_df['reservation_status_date'].dt.day
+    transformed_df['reservation_year'] = reservation_status_date.dt.year
+    transformed_df['reservation_month'] = reservation_status_date.dt.month
+    transformed_df['reservation_day'] = reservation_status_date.dt.day
 
     # Ahora podemos eliminar la columna de fecha original si ya no es necesaria
     transformed_df.drop('reservation_status_date', axis=1, inplace=True)
-    
-    # Identificar las columnas categóricas que deben ser codificadas
-    categorical_cols = ['hotel', 'arrival_date_year', 'arrival_date_month', 'meal', 'country', 'market_segment', 'distribution_channel', 'is_repeated_guest', 'market_segment', 
-                        'customer_type', 'reserved_room_type', 'assigned_room_type','deposit_type','agent','company','reservation_status']
 
-    # Aplicar OneHotEncoding a las columnas categóricas usando get_dummies()
-    df_encoded = pd.get_dummies(transformed_df, columns=categorical_cols, drop_first=True)
+    # Transform the transformed_df to the proper data types; the compact schema also narrows the date parts
+    transformed_df = cast_to_schema(transformed_df, hotel_bookings_schema_v1)
+
+    # Encoding and scaling are fitted with the model (see data_science/src/utils/preprocessing.py)
+    # so the processed dataset keeps the cleaned, typed columns
+    return transformed_df
+
+def compute_fill_values(storage, chunksize):
+    """
+    First pass over the raw file: compute the mode of each fill column while
+    holding only one chunk and the per-value counts in memory.
+    """
+    counts = {col: pd.Series(dtype="int64") for col in MODE_FILL_COLS}
+    for chunk in storage.read_csv(RAW_DATA_KEY, usecols=MODE_FILL_COLS, dtype=RAW_DTYPES, chunksize=chunksize):
+        for col in MODE_FILL_COLS:
+            counts[col] = counts[col].add(chunk[col].value_counts(), fill_value=0)
+
+    # Ties resolve to the smallest value, as Series.mode() does
+    return {col: min(col_counts[col_counts == col_counts.max()].index) for col, col_counts in counts.items()}
+
+# Function to process and clean data
+def process_bookings_data_v1(compact=False, storage=None):
+    hotel_bookings_schema_v1 = get_schema(compact)
+    # Load the raw dataset
+    transformed_df = (storage or get_data_storage()).read_csv(RAW_DATA_KEY)
+
+    fill_values = {col: transformed_df[col].mode()[0] for col in MODE_FILL_COLS}
+    return transform_bookings_v1(transformed_df, hotel_bookings_schema_v1, fill_values)
+
+def add_row_keys(transformed_df, raw_df):
+    """
+    Add the booking_id and row_hash columns used by incremental loads.
+
+    The raw file has no booking identifier, so booking_id is the position of
+    the booking in it, which stays the same when a booking changes. row_hash
+    is taken over the raw columns, before the mode fills, so it only changes
+    when the booking itself does.
+    """
+    transformed_df['booking_id'] = raw_df.index.to_numpy(dtype='int64')
+    row_hash = pd.util.hash_pandas_object(raw_df, index=False)
+    transformed_df['row_hash'] = row_hash.to_numpy().view('int64')
+    return transformed_df
+
+def get_reservation_status_date(transformed_df):
+    """
+    Rebuild reservation_status_date from the processed year/month/day columns.
+    """
+    return pd.to_datetime(pd.DataFrame({
+        'year': transformed_df['reservation_year'],
+        'month': transformed_df['reservation_month'],
+        'day': transformed_df['reservation_day'],
+    }))
+
+def iter_process_bookings_data_v1(chunksize=100000, fill_values=None, since=None, with_keys=False, compact=False,
+                                  storage=None):
+    """
+    Streaming version of process_bookings_data_v1.
+
+    Yields the processed raw file chunk by chunk, so peak memory is bounded by
+    chunksize instead of by the dataset size. The mode fills come from
+    fill_values when given (e.g. persisted from a previous run) or from a
+    first pass over the file.
 
-    # Identificar columnas numéricas
-    numerical_cols = ['arrival_date_week_number','arrival_date_day_of_month','stays_in_weekend_nights','stays_in_week_nights',
-                    'adults','children','babies','previous_cancellations','previous_bookings_not_canceled','booking_changes',
-                    'days_in_waiting_list','adr','required_car_parking_spaces','total_of_special_requests']
+    For incremental runs, since skips bookings whose reservation_status_date
+    is older than the last loaded one, and with_keys adds the key they are
+    upserted on and the hash that tells whether they changed (see
+    add_row_keys). compact types the columns with the compact schema.
 
-    # Escalar las variables numéricas
-    scaler = StandardScaler()
-    df_encoded[numerical_cols] = scaler.fit_transform(df_encoded[numerical_cols])
+    The raw file is streamed from storage, the data storage by default (see
+    object_storage.data.get_data_storage).
+    """
+    hotel_bookings_schema_v1 = get_schema(compact)
+    storage = storage or get_data_storage()
+    if fill_values is None:
+        fill_values = compute_fill_values(storage, chunksize)
 
-    return df_encoded
+    # The index of the chunks keeps counting the rows of the whole file
+    for chunk in storage.read_csv(RAW_DATA_KEY, dtype=RAW_DTYPES, chunksize=chunksize):
+        if since is not None:
+            chunk = chunk[pd.to_datetime(chunk['reservation_status_date']) >= since].copy()
+            if chunk.empty:
+                continue
+        raw_chunk = chunk.copy() if with_keys else None
+        transformed_chunk = transform_bookings_v1(chunk, hotel_bookings_schema_v1, fill_values)
+        if with_keys:
+            transformed_chunk = add_row_keys(transformed_chunk, raw_chunk)
+        yield transformed_chunk
@@ -7,4 +7,10 @@ DATASETS = {
         'url': 'http://example.com/test.csv',
         'destination': 'data/raw/test.csv'
     }
-}
\ No newline at end of file
+}
+
+# Ways of writing a DataFrame into a table (see utils/db.save_to_db):
+#   rows       one INSERT per row (pandas default)
+#   multi      multi-row INSERTs of about MAX_VALUES_PER_INSERT values, in one transaction
+#   load-data  LOAD DATA LOCAL INFILE from a temporary CSV file (MySQL only)
+LOAD_METHODS = ['rows', 'multi', 'load-data']
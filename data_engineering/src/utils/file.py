@@ -1,6 +1,6 @@
 import os
 import json
-import requests
+import numpy as np
 from .config import DATASETS
 
 # Load Schema function
@@ -9,6 +9,25 @@ def load_schema(schema_path):
         schema = json.load(file)
     return schema
 
+# Cast the columns of a DataFrame named in a schema, checking that narrow numeric types hold every value
+def cast_to_schema(df, schema):
+    dtypes = {col: dtype for col, dtype in schema.items() if col in df.columns}
+    for col, dtype in dtypes.items():
+        if dtype in ('category', 'object') or dtype.startswith('datetime'):
+            continue
+        target = np.dtype(dtype)
+        values = df[col]
+        if values.isna().any() or values.empty:
+            continue
+        if target.kind in 'iu':
+            info = np.iinfo(target)
+            if values.min() < info.min or values.max() > info.max:
+                raise ValueError(f"Column '{col}' has values outside the range of {dtype}")
+        elif target.kind == 'f' and target.itemsize < 8:
+            if np.abs(values).max() > np.finfo(target).max:
+                raise ValueError(f"Column '{col}' has values outside the range of {dtype}")
+    return df.astype(dtypes)
+
 # Function to check if CSV file is empty
 def is_csv_empty(file_path: str) -> bool:
     return not os.path.exists(file_path) or os.path.getsize(file_path) == 0
@@ -18,6 +37,56 @@ def save_to_csv(df, file_path='../data/processed/clean_hotel_bookings.csv'):
     df.to_csv(file_path, index=False)
     print(f"Data saved to {file_path}")
 
+# Function to save data to Parquet
+def save_to_parquet(df, file_path='../data/processed/clean_hotel_bookings.parquet'):
+    # Category columns are stored dictionary-encoded and restored as categories on read;
+    # pandas imports pyarrow on this first use
+    df.to_parquet(file_path, index=False)
+    print(f"Data saved to {file_path}")
+
+def _widen_dictionaries(schema):
+    import pyarrow as pa
+
+    # Chunks can hold different numbers of categories, so store every
+    # dictionary column with int32 indices to keep one schema across chunks
+    fields = [
+        pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ]
+    return pa.schema(fields, metadata=schema.metadata)
+
+# Function to save a stream of DataFrame chunks to Parquet
+def save_chunks_to_parquet(chunks, file_path):
+    # pyarrow is only imported when writing Parquet, not for the csv and db destinations
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    rows = 0
+    try:
+        for chunk in chunks:
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                schema = _widen_dictionaries(table.schema)
+                writer = pq.ParquetWriter(file_path, schema)
+            writer.write_table(table.cast(schema))
+            rows += len(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    print(f"{rows} rows saved to {file_path}")
+    return rows
+
+# Function to save a stream of DataFrame chunks to CSV
+def save_chunks_to_csv(chunks, file_path):
+    rows = 0
+    for i, chunk in enumerate(chunks):
+        chunk.to_csv(file_path, index=False, mode='w' if i == 0 else 'a', header=i == 0)
+        rows += len(chunk)
+    print(f"{rows} rows saved to {file_path}")
+    return rows
+
 def download_dataset(dataset_key: str) -> None:
     """
     Download a dataset based on the key provided in the configuration.
@@ -32,6 +101,8 @@ def download_dataset(dataset_key: str) -> None:
     url = dataset['url']
     output_path = dataset['destination']
     
+    # Only needed to download datasets, so it is not imported by the ETL entry point
+    import requests
     try:
         response = requests.get(url)
         if response.status_code == 200:
@@ -0,0 +1,7 @@
+import os
+import sys
+
+# The shared test helpers (testing/) live at the repository root
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if REPO_DIR not in sys.path:
+    sys.path.append(REPO_DIR)
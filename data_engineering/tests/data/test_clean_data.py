@@ -1,6 +1,6 @@
 import pytest
 import pandas as pd
-from src.data.clean_data import process_data
+from src.data.clean_data import build_arrival_date, combine_categories, map_season, process_data
 
 # Test para verificar si el procesamiento de los datos es correcto
 def test_process_data():
@@ -41,3 +41,40 @@ def test_process_data():
     # Test para asegurarse de que los valores de 'is_last_minute' están en el rango esperado
     assert df['is_last_minute'].isin([0, 1]).all(), "La columna 'is_last_minute' tiene valores fuera de 0 o 1"
 
+
+# Test de las transformaciones vectorizadas contra sus equivalentes fila a fila
+def test_build_arrival_date():
+    df = pd.DataFrame({
+        'arrival_date_year': [2015, 2016, 2017],
+        'arrival_date_month': ['July', 'February', 'December'],
+        'arrival_date_day_of_month': [1, 29, 31],
+    }, index=[10, 11, 12])
+
+    expected = pd.to_datetime(df['arrival_date_year'].astype(str) + '-' +
+                              df['arrival_date_month'] + '-' +
+                              df['arrival_date_day_of_month'].astype(str))
+    pd.testing.assert_series_equal(build_arrival_date(df), expected)
+
+def test_build_arrival_date_rejects_invalid_days():
+    df = pd.DataFrame({'arrival_date_year': [2015], 'arrival_date_month': ['February'], 'arrival_date_day_of_month': [30]})
+
+    with pytest.raises(ValueError):
+        build_arrival_date(df)
+
+def test_season_interaction_features():
+    months = pd.Series(range(1, 13))
+    season = map_season(months)
+    assert season.astype(str).tolist() == ['Invierno', 'Invierno', 'Primavera', 'Primavera', 'Primavera', 'Verano',
+                                           'Verano', 'Verano', 'Otoño', 'Otoño', 'Otoño', 'Invierno']
+
+    room_type = pd.Series(list('ABCABCABCABC'))
+    room_season = combine_categories(room_type, season)
+    assert room_season.astype(str).tolist() == (room_type + '_' + season.astype(str)).tolist()
+    assert set(room_season.cat.categories) == set(room_season.astype(str))
+
+def test_combine_categories_keeps_missing_values_missing():
+    left = pd.Series(['A', 'B', None, 'B'])
+    right = pd.Series(['x', None, 'y', 'y'])
+    combined = combine_categories(left, right)
+    assert combined.isna().tolist() == [False, True, True, False]
+    assert combined.dropna().astype(str).tolist() == ['A_x', 'B_y']
@@ -0,0 +1,11 @@
+import os
+from testing.import_times import get_import_times
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_main_defers_heavy_dependencies():
+    # SQLAlchemy, requests and the Parquet writer are imported on first use.
+    # pandas itself imports the pyarrow core when it is installed, so only
+    # pyarrow.parquet is checked.
+    times = get_import_times('import main', os.path.join(ROOT_DIR, 'src'), [ROOT_DIR])
+    assert not {'sqlalchemy', 'requests', 'pyarrow.parquet'} & set(times)
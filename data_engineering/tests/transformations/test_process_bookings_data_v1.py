@@ -6,7 +6,9 @@ from sklearn.preprocessing import StandardScaler
 from io import StringIO
 
 # Asumiendo que process_bookings_data_v1 está en el archivo process.py
-from src.transformations.process_bookings_data_v1 import process_bookings_data_v1
+from src.transformations.process_bookings_data_v1 import process_bookings_data_v1, iter_process_bookings_data_v1, compute_fill_values, get_reservation_status_date
+from src.utils.file import load_schema
+from object_storage.local_storage import LocalStorage
 
 # Datos de prueba para el archivo CSV
 csv_data = StringIO("""
@@ -16,7 +18,13 @@ Resort Hotel,0,737,2015,July,27,1,0,0,2,0,0,BB,PRT,Direct,Direct,0,0,0,C,C,4,No
 """)
 
 
-def test_process_bookings_data_v1():
+def make_raw_storage(tmp_path, raw_csv):
+    raw_path = tmp_path / "raw" / "hotel_bookings.csv"
+    raw_path.parent.mkdir()
+    raw_path.write_text(raw_csv)
+    return LocalStorage(str(tmp_path))
+
+def test_process_bookings_data_v1(tmp_path):
     # Mock de load_schema para cargar el esquema JSON
     with patch('src.transformations.process_bookings_data_v1.load_schema') as mock_load_schema:
         mock_load_schema.return_value = {
@@ -42,47 +50,147 @@ def test_process_bookings_data_v1():
             'required_car_parking_spaces': 'int64',
             'total_of_special_requests': 'int64'
         }
-        mock_df = pd.read_csv(csv_data)
-        
-        # Mock de pd.read_csv para cargar el CSV en memoria
-        with patch('src.transformations.process_bookings_data_v1.pd.read_csv', return_value=mock_df):
-            # Ejecutar la función de procesamiento
-            result = process_bookings_data_v1()
-            # TODO fix rest of tests
-            # Verificar que las columnas categóricas fueron codificadas
-            # assert 'hotel_Resort Hotel' in result.columns
-            # assert 'arrival_date_month_July' in result.columns
-
-            # # Verificar que las columnas numéricas fueron escaladas correctamente
-            # numerical_cols = ['arrival_date_week_number','arrival_date_day_of_month','stays_in_weekend_nights','stays_in_week_nights',
-            #                 'adults','children','babies','previous_cancellations','previous_bookings_not_canceled','booking_changes',
-            #                 'days_in_waiting_list','adr','required_car_parking_spaces','total_of_special_requests']
-            # scaler = StandardScaler()
-            # expected_values = scaler.fit_transform(pd.DataFrame({
-            #     'arrival_date_week_number': [27, 32],
-            #     'arrival_date_day_of_month': [1, 2],
-            #     'stays_in_weekend_nights': [1, 2],
-            #     'stays_in_week_nights': [1, 2],
-            #     'adults': [1, 2],
-            #     'children': [0, 1],
-            #     'babies': [0, 0],
-            #     'previous_cancellations': [0, 0],
-            #     'previous_bookings_not_canceled': [0, 0],
-            #     'booking_changes': [0, 0],
-            #     'days_in_waiting_list': [200, 300],
-            #     'adr': [100, 50],
-            #     'required_car_parking_spaces': [0, 1],
-            #     'total_of_special_requests': [0, 1]
-            # }))
-            # np.testing.assert_array_almost_equal(result[numerical_cols].values, expected_values)
-
-            # # Verificar que la columna 'reservation_status_date' fue eliminada
-            # assert 'reservation_status_date' not in result.columns
-
-            # # Verificar que se han añadido las nuevas columnas de fecha
-            # assert 'reservation_year' in result.columns
-            # assert 'reservation_month' in result.columns
-            # assert 'reservation_day' in result.columns
+        # Almacenamiento local con el CSV de prueba
+        storage = make_raw_storage(tmp_path, csv_data.getvalue())
+        # Ejecutar la función de procesamiento
+        result = process_bookings_data_v1(storage=storage)
+        # TODO fix rest of tests
+        # Verificar que las columnas categóricas fueron codificadas
+        # assert 'hotel_Resort Hotel' in result.columns
+        # assert 'arrival_date_month_July' in result.columns
+
+        # # Verificar que las columnas numéricas fueron escaladas correctamente
+        # numerical_cols = ['arrival_date_week_number','arrival_date_day_of_month','stays_in_weekend_nights','stays_in_week_nights',
+        #                 'adults','children','babies','previous_cancellations','previous_bookings_not_canceled','booking_changes',
+        #                 'days_in_waiting_list','adr','required_car_parking_spaces','total_of_special_requests']
+        # scaler = StandardScaler()
+        # expected_values = scaler.fit_transform(pd.DataFrame({
+        #     'arrival_date_week_number': [27, 32],
+        #     'arrival_date_day_of_month': [1, 2],
+        #     'stays_in_weekend_nights': [1, 2],
+        #     'stays_in_week_nights': [1, 2],
+        #     'adults': [1, 2],
+        #     'children': [0, 1],
+        #     'babies': [0, 0],
+        #     'previous_cancellations': [0, 0],
+        #     'previous_bookings_not_canceled': [0, 0],
+        #     'booking_changes': [0, 0],
+        #     'days_in_waiting_list': [200, 300],
+        #     'adr': [100, 50],
+        #     'required_car_parking_spaces': [0, 1],
+        #     'total_of_special_requests': [0, 1]
+        # }))
+        # np.testing.assert_array_almost_equal(result[numerical_cols].values, expected_values)
+
+        # # Verificar que la columna 'reservation_status_date' fue eliminada
+        # assert 'reservation_status_date' not in result.columns
+
+        # # Verificar que se han añadido las nuevas columnas de fecha
+        # assert 'reservation_year' in result.columns
+        # assert 'reservation_month' in result.columns
+        # assert 'reservation_day' in result.columns
+
+def test_process_bookings_data_v1_keeps_unencoded_columns(tmp_path):
+    raw_df = pd.DataFrame({
+        'hotel': ['Resort Hotel', 'City Hotel'],
+        'agent': [None, 9.0],
+        'company': [None, None],
+        'country': ['PRT', None],
+        'children': [0.0, None],
+        'adr': [0.0, 75.5],
+        'reservation_status_date': ['7/1/2015', '7/2/2015'],
+    })
+    schema = {'hotel': 'category', 'country': 'category', 'children': 'int64', 'adr': 'float64'}
+    storage = make_raw_storage(tmp_path, raw_df.to_csv(index=False))
+    with patch('src.transformations.process_bookings_data_v1.load_schema', return_value=schema):
+        result = process_bookings_data_v1(storage=storage)
+
+    # One-hot encoding and scaling are left to the fitted model preprocessor
+    assert result['hotel'].tolist() == ['Resort Hotel', 'City Hotel']
+    assert result['adr'].tolist() == [0.0, 75.5]
+    assert result['country'].tolist() == ['PRT', 'PRT']
+    assert result[['agent', 'company']].notnull().all().all()
+    assert result['reservation_day'].tolist() == [1, 2]
+    assert 'reservation_status_date' not in result.columns
+
+def test_process_bookings_data_v1_reads_the_data_storage(tmp_path, monkeypatch):
+    # Without a storage, the raw dataset is read from DATA_DIR (the repository's data/ by default)
+    make_raw_storage(tmp_path, csv_data.getvalue())
+    monkeypatch.setenv('DATA_DIR', str(tmp_path))
+    monkeypatch.delenv('DATA_S3_BUCKET', raising=False)
+    with patch('src.transformations.process_bookings_data_v1.load_schema', return_value={'hotel': 'category'}):
+        result = process_bookings_data_v1()
+    assert len(result) == 2
+
+RAW_HEADER = csv_data.getvalue().strip().splitlines()[0]
+RAW_ROWS = [
+    "Resort Hotel,0,342,2015,July,27,1,0,0,2,0,0,BB,PRT,Direct,Direct,0,0,0,C,C,3,No Deposit,NULL,NULL,0,Transient,0,0,0,Check-Out,2015-07-01",
+    "Resort Hotel,1,737,2015,July,27,1,0,0,2,NA,0,BB,,Direct,Direct,0,0,0,C,C,4,No Deposit,9,NULL,0,Transient,0,0,0,Canceled,2015-07-01",
+    "City Hotel,0,7,2016,August,32,2,1,2,1,1,0,HB,GBR,Online TA,TA/TO,0,0,0,A,A,0,No Deposit,240,NULL,0,Contract,75.5,0,1,Check-Out,2016-08-05",
+    "City Hotel,1,13,2016,August,32,3,0,1,2,2,0,SC,GBR,Groups,TA/TO,1,0,0,A,D,0,Non Refund,NULL,40,3,Transient,98.0,0,0,Canceled,2016-08-01",
+    "City Hotel,0,14,2017,January,1,4,2,3,2,,1,BB,ESP,Direct,Direct,0,0,1,D,D,1,No Deposit,9,NULL,0,Transient-Party,120.25,1,2,Check-Out,2017-01-10",
+]
+
+@pytest.fixture
+def raw_storage(tmp_path):
+    return make_raw_storage(tmp_path, "\n".join([RAW_HEADER] + RAW_ROWS) + "\n")
+
+@pytest.fixture
+def bookings_schema():
+    return load_schema('src/data/schemas/hotel_bookings/hotel_bookings_schema_v1.json')
+
+def test_compute_fill_values_matches_in_memory_mode(raw_storage):
+    df = raw_storage.read_csv('raw/hotel_bookings.csv')
+    fill_values = compute_fill_values(raw_storage, chunksize=2)
+    assert fill_values == {'country': df['country'].mode()[0], 'children': df['children'].mode()[0]}
+
+def test_iter_process_bookings_data_v1_matches_in_memory(raw_storage, bookings_schema):
+    with patch('src.transformations.process_bookings_data_v1.load_schema', return_value=bookings_schema):
+        expected = process_bookings_data_v1(storage=raw_storage)
+        chunks = list(iter_process_bookings_data_v1(chunksize=2, storage=raw_storage))
+
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    streamed = pd.concat(chunks, ignore_index=True)
+    for col in expected.columns:
+        assert streamed[col].astype(str).tolist() == expected[col].astype(str).tolist(), col
+
+def test_iter_process_bookings_data_v1_incremental(raw_storage, bookings_schema):
+    with patch('src.transformations.process_bookings_data_v1.load_schema', return_value=bookings_schema):
+        full = pd.concat(iter_process_bookings_data_v1(chunksize=2, with_keys=True, storage=raw_storage), ignore_index=True)
+        since = pd.Timestamp('2016-08-01')
+        changed = pd.concat(iter_process_bookings_data_v1(chunksize=3, since=since, with_keys=True, storage=raw_storage),
+                            ignore_index=True)
+        # Different mode fills do not make unchanged bookings look changed
+        refilled = pd.concat(iter_process_bookings_data_v1(chunksize=2, with_keys=True, storage=raw_storage,
+                                                           fill_values={'country': 'ESP', 'children': 3.0}),
+                             ignore_index=True)
+
+    # Only bookings at or after the watermark are processed again
+    assert (get_reservation_status_date(changed) >= since).all()
+    assert len(changed) == 3
+
+    # A booking gets the same key and hash regardless of the chunk it was read in
+    assert full['booking_id'].tolist() == list(range(len(RAW_ROWS)))
+    assert full['row_hash'].is_unique
+    keys = full.set_index('booking_id')['row_hash']
+    assert changed.set_index('booking_id')['row_hash'].equals(keys.loc[changed['booking_id']])
+    assert refilled['row_hash'].equals(full['row_hash'])
+
+def test_process_bookings_data_v1_compact(raw_storage, bookings_schema):
+    compact_schema = load_schema('src/data/schemas/hotel_bookings/hotel_bookings_schema_v1_compact.json')
+    assert set(compact_schema) - set(bookings_schema) == {'reservation_year', 'reservation_month', 'reservation_day'}
+
+    with patch('src.transformations.process_bookings_data_v1.load_schema', return_value=bookings_schema):
+        expected = process_bookings_data_v1(storage=raw_storage)
+    with patch('src.transformations.process_bookings_data_v1.load_schema', return_value=compact_schema):
+        compact = process_bookings_data_v1(compact=True, storage=raw_storage)
+
+    assert compact['adults'].dtype == 'int8'
+    assert compact['lead_time'].dtype == 'int16'
+    assert compact['adr'].dtype == 'float32'
+    assert compact['reservation_year'].dtype == 'int16'
+    assert compact.memory_usage(deep=True).sum() < expected.memory_usage(deep=True).sum()
+    pd.testing.assert_frame_equal(compact, expected, check_dtype=False)
 
 if __name__ == '__main__':
     pytest.main()
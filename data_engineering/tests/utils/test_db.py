@@ -0,0 +1,95 @@
+import datetime
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from unittest import mock
+from src.utils.db import dispose_engines, drop_table_without_key, get_engine, get_load_engine, get_watermark, save_to_db, set_watermark, upsert_to_db
+
+@pytest.fixture
+def engine(tmp_path):
+    return create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+
+# Tests for the incremental ETL watermark
+def test_get_watermark_without_previous_run(engine):
+    assert get_watermark(engine, 'hotel_bookings_v1') is None
+
+def test_set_watermark_overwrites_previous_value(engine):
+    set_watermark(engine, 'hotel_bookings_v1', datetime.datetime(2015, 7, 1))
+    set_watermark(engine, 'hotel_bookings_v1', datetime.datetime(2015, 7, 2))
+    set_watermark(engine, 'hotel_bookings_v2', datetime.datetime(2016, 1, 1))
+
+    assert get_watermark(engine, 'hotel_bookings_v1') == datetime.datetime(2015, 7, 2)
+    assert get_watermark(engine, 'hotel_bookings_v2') == datetime.datetime(2016, 1, 1)
+
+# Tests for upsert_to_db
+def test_upsert_to_db_inserts_and_updates_rows(engine):
+    first = pd.DataFrame({'booking_id': [1, 2], 'row_hash': [11, 12],
+                          'hotel': pd.Categorical(['Resort Hotel', 'City Hotel']), 'adr': [10.0, 20.0]})
+    # Booking 2 changed, so it comes with a new hash; booking 3 is new
+    second = pd.DataFrame({'booking_id': [2, 3], 'row_hash': [22, 13],
+                           'hotel': pd.Categorical(['City Hotel', 'City Hotel']), 'adr': [25.0, 30.0]})
+    # Same hash as already loaded: the row is left as it is
+    unchanged = pd.DataFrame({'booking_id': [1], 'row_hash': [11], 'hotel': pd.Categorical(['Resort Hotel']),
+                              'adr': [99.0]})
+
+    assert upsert_to_db(first, engine, 'hotel_bookings_v1') == 2
+    assert upsert_to_db(second, engine, 'hotel_bookings_v1') == 2
+    assert upsert_to_db(unchanged, engine, 'hotel_bookings_v1') == 0
+
+    saved = pd.read_sql('SELECT * FROM hotel_bookings_v1 ORDER BY booking_id', engine)
+    assert saved['booking_id'].tolist() == [1, 2, 3]
+    assert saved['row_hash'].tolist() == [11, 22, 13]
+    assert saved['adr'].tolist() == [10.0, 25.0, 30.0]
+    assert saved['hotel'].tolist() == ['Resort Hotel', 'City Hotel', 'City Hotel']
+
+def test_upsert_to_db_rejects_a_table_without_key(engine):
+    save_to_db(pd.DataFrame({'hotel': ['Resort Hotel'], 'adr': [10.0]}), engine=engine)
+    bookings = pd.DataFrame({'booking_id': [1], 'row_hash': [11], 'hotel': ['City Hotel'], 'adr': [20.0]})
+    with pytest.raises(ValueError, match="no unique 'booking_id'"):
+        upsert_to_db(bookings, engine, 'hotel_bookings_v1')
+
+    assert drop_table_without_key(engine, 'hotel_bookings_v1')
+    assert upsert_to_db(bookings, engine, 'hotel_bookings_v1') == 1
+    assert not drop_table_without_key(engine, 'hotel_bookings_v1')
+
+# Tests for save_to_db
+@pytest.mark.parametrize("load_method", ["rows", "multi"])
+def test_save_to_db_load_methods(engine, load_method, capsys):
+    df = pd.DataFrame({'hotel': ['Resort Hotel', 'City Hotel'] * 50, 'adr': [float(i) for i in range(100)]})
+    save_to_db(df, version='1', load_method=load_method, engine=engine)
+
+    saved = pd.read_sql('SELECT * FROM hotel_bookings_v1', engine)
+    pd.testing.assert_frame_equal(saved, df)
+    assert "rows/s" in capsys.readouterr().out
+
+def test_save_to_db_load_data_infile():
+    df = pd.DataFrame({'hotel': ['Resort Hotel', None], 'adr': [1.5, 2.0]})
+    engine = mock.MagicMock()
+    connection = engine.begin.return_value.__enter__.return_value
+
+    with mock.patch('src.utils.db.is_table_empty', return_value=True), mock.patch.object(pd.DataFrame, 'to_sql'):
+        save_to_db(df, version='1', load_method='load-data', engine=engine)
+
+    statements = [str(call.args[0]) for call in connection.execute.call_args_list]
+    assert statements[0] == "DROP TABLE IF EXISTS hotel_bookings_v1"
+    assert statements[1].startswith("LOAD DATA LOCAL INFILE")
+    assert statements[1].endswith("(`hotel`, `adr`)")
+
+def test_save_to_db_unknown_load_method(engine):
+    with pytest.raises(ValueError, match="Unknown load method"):
+        save_to_db(pd.DataFrame({'a': [1]}), load_method='copy', engine=engine)
+
+# Tests for get_engine
+def test_get_engine_reuses_pooled_engine(tmp_path):
+    db_url = f"sqlite:///{tmp_path / 'pooled.db'}"
+    try:
+        engine = get_engine(db_url)
+        assert get_engine(db_url) is engine
+        assert get_load_engine(db_url, 'multi') is engine
+        # LOAD DATA needs a connection that allows local files
+        assert get_load_engine(db_url, 'load-data') is not engine
+        assert engine.pool.size() == 5
+        assert engine.pool._pre_ping
+    finally:
+        dispose_engines()
+
@@ -6,7 +6,7 @@ from unittest import mock
 from io import StringIO
 import requests
 # Import the functions from the script you provided
-from src.utils.file import load_schema, is_csv_empty, save_to_csv, download_dataset
+from src.utils.file import load_schema, cast_to_schema, is_csv_empty, save_to_csv, save_to_parquet, save_chunks_to_csv, save_chunks_to_parquet, download_dataset
 from src.utils.config import DATASETS
 
 @pytest.fixture
@@ -36,6 +36,19 @@ def test_load_schema(mock_schema):
     schema = load_schema(mock_schema)
     assert schema == {"field1": "type1", "field2": "type2"}
 
+# Tests for cast_to_schema function
+def test_cast_to_schema_narrows_types():
+    df = pd.DataFrame({'adults': [1, 2], 'adr': [75.5, 98.25], 'hotel': ['Resort Hotel', 'City Hotel']})
+    result = cast_to_schema(df, {'adults': 'int8', 'adr': 'float32', 'hotel': 'category', 'missing': 'int8'})
+
+    assert result.dtypes.astype(str).to_dict() == {'adults': 'int8', 'adr': 'float32', 'hotel': 'category'}
+    assert result['adr'].tolist() == [75.5, 98.25]
+
+def test_cast_to_schema_rejects_overflow():
+    df = pd.DataFrame({'lead_time': [7, 737]})
+    with pytest.raises(ValueError, match="lead_time"):
+        cast_to_schema(df, {'lead_time': 'int8'})
+
 # Test for is_csv_empty function
 def test_is_csv_empty_when_file_does_not_exist():
     assert is_csv_empty("non_existing_file.csv") is True
@@ -59,6 +72,41 @@ def test_save_to_csv(tmp_path):
     saved_df = pd.read_csv(output_file)
     pd.testing.assert_frame_equal(saved_df, df)
 
+# Test for save_to_parquet function
+def test_save_to_parquet_keeps_categories(tmp_path):
+    df = pd.DataFrame({"col1": [1, 2], "col2": pd.Categorical(["a", "b"])})
+    output_file = tmp_path / "output.parquet"
+    save_to_parquet(df, file_path=output_file)
+
+    saved_df = pd.read_parquet(output_file)
+    pd.testing.assert_frame_equal(saved_df, df)
+    assert isinstance(saved_df["col2"].dtype, pd.CategoricalDtype)
+
+# Tests for the chunked writers
+@pytest.fixture
+def category_chunks():
+    # The second chunk has more categories than the first one
+    return [
+        pd.DataFrame({"col1": [1, 2], "col2": pd.Categorical(["a", "a"])}),
+        pd.DataFrame({"col1": [3, 4, 5], "col2": pd.Categorical(["b", "c", "a"])}),
+    ]
+
+def test_save_chunks_to_parquet(tmp_path, category_chunks):
+    output_file = tmp_path / "output.parquet"
+    assert save_chunks_to_parquet(iter(category_chunks), output_file) == 5
+
+    saved_df = pd.read_parquet(output_file)
+    assert saved_df["col1"].tolist() == [1, 2, 3, 4, 5]
+    assert saved_df["col2"].astype(str).tolist() == ["a", "a", "b", "c", "a"]
+    assert isinstance(saved_df["col2"].dtype, pd.CategoricalDtype)
+
+def test_save_chunks_to_csv(tmp_path, category_chunks):
+    output_file = tmp_path / "output.csv"
+    assert save_chunks_to_csv(iter(category_chunks), output_file) == 5
+
+    saved_df = pd.read_csv(output_file)
+    assert saved_df["col2"].tolist() == ["a", "a", "b", "c", "a"]
+
 # Test for download_dataset function
 @mock.patch("requests.get")
 def test_download_dataset_success(mock_get, tmp_path):
@@ -1,23 +1,43 @@
 import argparse
-import sys
+import json
+from modelling.experiments import EXPERIMENTS
 
 def main():
     parser = argparse.ArgumentParser(description='Run machine learning experiments.')
-    parser.add_argument('experiment', type=str, help='The experiment to run (e.g., random_forest)')
+    parser.add_argument('experiments', nargs='+', choices=list(EXPERIMENTS),
+                        help='The experiments to run side by side (e.g., random_forest xgboost)')
     parser.add_argument('--data', type=str, required=True, help='Version of the dataset')
-    parser.add_argument('--version', type=str, required=True, help='Version of the model')
+    parser.add_argument('--version', type=str, default=None,
+                        help='Version of the models. Defaults to the next version in the registry of each model, '
+                             'so earlier versions are never overwritten.')
+    parser.add_argument('--grid', type=str, default=None,
+                        help='JSON file mapping each experiment to a hyperparameter grid, '
+                             'e.g. {"random_forest": {"n_estimators": [100, 300]}}')
+    parser.add_argument('--search', type=int, default=None, metavar='N',
+                        help='Tune each experiment by successive halving over N configurations sampled from its grid '
+                             'instead of training every combination')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='Number of models trained concurrently. Defaults to the number of CPUs.')
     
     args = parser.parse_args()
 
-    if args.experiment == 'random_forest':
-        from modelling.hotel_booking.random_forest.v1 import run_random_forest_experiment
-        run_random_forest_experiment(args.data, args.version)
-    if args.experiment == 'xgboost':
-        from modelling.hotel_booking.xgboost.v1 import run_xgboost_experiment
-        run_xgboost_experiment(args.data, args.version)
+    grids = {}
+    if args.grid:
+        with open(args.grid) as file:
+            grids = json.load(file)
+    unknown = set(grids) - set(args.experiments)
+    if unknown:
+        parser.error(f"Grid given for experiments that are not run: {', '.join(sorted(unknown))}")
+
+    # mlflow and the model libraries are only imported once the arguments are valid
+    if args.search:
+        from modelling.tuning import tune_experiment
+        for name in args.experiments:
+            tune_experiment(name, grids.get(name, {}), args.data, args.version,
+                            n_candidates=args.search, max_workers=args.workers)
     else:
-        print(f"Unknown experiment: {args.experiment}")
-        sys.exit(1)
+        from modelling.runner import run_experiments
+        run_experiments({name: grids.get(name, {}) for name in args.experiments}, args.data, args.version, args.workers)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,7 @@
+# Experiment name -> module exposing MLFLOW_EXPERIMENT, LABEL, DEFAULT_PARAMS, SPARSE_FEATURES,
+# build_model(params) and register_and_save(model, preprocessor, run_id, model_version).
+# Kept apart from the runner so the CLI can list them without importing mlflow or sklearn.
+EXPERIMENTS = {
+    'random_forest': 'modelling.hotel_booking.random_forest.v1',
+    'xgboost': 'modelling.hotel_booking.xgboost.v1',
+}
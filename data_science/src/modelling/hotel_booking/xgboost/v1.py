@@ -1,140 +1,76 @@
-import os
-import pandas as pd
 import mlflow
-import mlflow.sklearn
-from sklearn.preprocessing import StandardScaler, OneHotEncoder
-from sklearn.model_selection import train_test_split
 from xgboost import XGBClassifier
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score, confusion_matrix
 import argparse
 from modelling.mlflow_config import setup_mlflow_experiment
-from utils.models import save_model
+from modelling.training import train_and_log
+from utils.datasets import load_training_split
+from utils.models import get_next_version, register_version, save_model, save_preprocessor
+
+MLFLOW_EXPERIMENT = "Hotel_Bookings_XGBoost_Experiment"
+MODEL_NAME = "XGBoostClassifier"
+REGISTERED_MODEL_NAME = "Hotel_Bookings_XGBoost"
+LABEL = "XGBoost"
+
+DEFAULT_PARAMS = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 5, 'random_state': 42}
+
+# XGBoost reads unstored CSR entries as missing values, which would turn every
+# zero (lead_time=0, a scaled value at the mean) into a missing one
+SPARSE_FEATURES = False
+
+def build_model(params=None):
+    return XGBClassifier(**{**DEFAULT_PARAMS, **(params or {})})
+
+# Upper bound on boosting rounds while tuning; early stopping picks the actual number
+MAX_ESTIMATORS = 1000
+EARLY_STOPPING_ROUNDS = 20
+
+def fit_with_validation(model, X_train, y_train, X_val, y_val):
+    """
+    Fit a tuning trial, stopping once the validation logloss has not improved
+    for EARLY_STOPPING_ROUNDS rounds. Returns the number of rounds to train the
+    final model with.
+    """
+    model.set_params(n_estimators=MAX_ESTIMATORS, early_stopping_rounds=EARLY_STOPPING_ROUNDS, eval_metric='logloss')
+    model.fit(X_train, y_train, eval_set=[(X_val, y_val)], verbose=False)
+    return {'n_estimators': model.best_iteration + 1}
+
+def register_and_save(model, preprocessor, run_id, model_version=None):
+    # Without a version, the model is saved as the next version of the registry rather than over an existing one
+    model_version = model_version or get_next_version(MODEL_NAME)
+
+    # Register the model
+    model_uri = f"runs:/{run_id}/model"
+    model_name = f"{REGISTERED_MODEL_NAME}_{model_version}"
+    registered = mlflow.register_model(model_uri, model_name)
+
+    print(f"Model URI: {model_uri}")
+
+    # Save the model to disk under the requested version and record it in the serving registry
+    model_path = save_model(model, MODEL_NAME, model_version)
+    preprocessor_path = save_preprocessor(preprocessor, MODEL_NAME, model_version)
+    register_version(MODEL_NAME, model_version, model_path, preprocessor_path, run_id=run_id,
+                     registered_model=model_name, registered_version=registered.version)
 
 def run_xgboost_experiment(data_version, model_version):
     # Set up MLflow experiment
-    setup_mlflow_experiment("Hotel_Bookings_XGBoost_Experiment")
+    setup_mlflow_experiment(MLFLOW_EXPERIMENT)
 
-    # Construct the path to the dataset
-    dataset_filename = f"clean_hotel_bookings_v{data_version}.csv"
-    base_dir = os.path.dirname(__file__)
-    
-    # Construye la ruta absoluta hacia el archivo de datos
-    data_path = os.path.abspath(os.path.join(base_dir, '../../../../../data/processed', dataset_filename))
-    
-    if not os.path.exists(data_path):
-        print(f"Dataset not found at {data_path}")
+    # Load, split and encode the processed dataset
+    data = load_training_split(data_version, sparse=SPARSE_FEATURES)
+    if data is None:
         return
+    X_train, X_test, y_train, y_test, preprocessor = data
 
-    # Load and prepare data
-    df = pd.read_csv(data_path)
-
-    df['reservation_status_date'] = pd.to_datetime(df['reservation_status_date'])
-
-    # Extraer características de fecha (año, mes, día)
-    df['reservation_year'] = df['reservation_status_date'].dt.year
-    df['reservation_month'] = df['reservation_status_date'].dt.month
-    df['reservation_day'] = df['reservation_status_date'].dt.day
-
-    # Ahora podemos eliminar la columna de fecha original si ya no es necesaria
-    df.drop('reservation_status_date', axis=1, inplace=True)
-
-    df.drop('arrival_date', axis=1, inplace=True)
-    df.drop('arrival_day_of_week', axis=1, inplace=True)
-    df.drop('arrival_month', axis=1, inplace=True)
-    df.drop('season', axis=1, inplace=True)
-    df.drop('is_weekend', axis=1, inplace=True)
-    df.drop('total_nights', axis=1, inplace=True)
-    df.drop('customer_type_cancellation_rate', axis=1, inplace=True)
-    df.drop('avg_adr_for_room_type', axis=1, inplace=True)
-    df.drop('total_guests', axis=1, inplace=True)
-    df.drop('room_season', axis=1, inplace=True)
-    df.drop('customer_season', axis=1, inplace=True)
-    df.drop('booking_date', axis=1, inplace=True)
-    df.drop('booking_to_arrival_weeks', axis=1, inplace=True)
-    df.drop('is_last_minute', axis=1, inplace=True)
-    df.drop('total_special_requests', axis=1, inplace=True)
-    df.drop('is_high_season', axis=1, inplace=True)
-
-    # Identificar las columnas categóricas que deben ser codificadas
-    categorical_cols = ['hotel', 'arrival_date_year', 'arrival_date_month', 'meal', 'country', 'market_segment', 'distribution_channel', 'is_repeated_guest', 'market_segment', 
-                        'customer_type', 'reserved_room_type', 'assigned_room_type','deposit_type','agent','company','reservation_status']
-
-    # Aplicar OneHotEncoding a las columnas categóricas usando get_dummies()
-    df_encoded = pd.get_dummies(df, columns=categorical_cols, drop_first=True)
-
-    # Verificar que no hay variables categóricas sin codificar
-    # print(df_encoded.dtypes)
-
-    # Identificar columnas numéricas
-    numerical_cols = ['arrival_date_week_number','arrival_date_day_of_month','stays_in_weekend_nights','stays_in_week_nights',
-                    'adults','children','babies','previous_cancellations','previous_bookings_not_canceled','booking_changes',
-                    'days_in_waiting_list','adr','required_car_parking_spaces','total_of_special_requests']
-
-    # Escalar las variables numéricas
-    scaler = StandardScaler()
-    df_encoded[numerical_cols] = scaler.fit_transform(df_encoded[numerical_cols])
-
-    X = df_encoded.drop('is_canceled', axis=1)
-    y = df_encoded['is_canceled']
-
-    # Split the data into training and test sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-
-    # Convertir los DataFrames a arrays de NumPy
-    X_train = X_train.values
-    X_test = X_test.values
-    
-    # Initialize and train the RandomForest model
-    xgb_model = XGBClassifier(n_estimators=100, learning_rate=0.1, max_depth=5, random_state=42)
-    
-    with mlflow.start_run() as run:
-        xgb_model.fit(X_train, y_train)
-        
-        # Make predictions
-        y_pred_rf = xgb_model.predict(X_test)
-
-        # Evaluate the model
-        accuracy = accuracy_score(y_test, y_pred_rf)
-        precision = precision_score(y_test, y_pred_rf)
-        recall = recall_score(y_test, y_pred_rf)
-        f1 = f1_score(y_test, y_pred_rf)
-        roc_auc = roc_auc_score(y_test, y_pred_rf)
-        
-        # Print evaluation metrics
-        print('Random Forest Model:')
-        print(f'Accuracy: {accuracy}')
-        print(f'Precision: {precision}')
-        print(f'Recall: {recall}')
-        print(f'F1 Score: {f1}')
-        print(f'ROC AUC Score: {roc_auc}')
-
-        # Log parameters and metrics to MLflow
-        mlflow.log_param("n_estimators", 100)
-        mlflow.log_metric("accuracy", accuracy)
-        mlflow.log_metric("precision", precision)
-        mlflow.log_metric("recall", recall)
-        mlflow.log_metric("f1_score", f1)
-        mlflow.log_metric("roc_auc", roc_auc)
-        
-        # Log the model to MLflow
-        model_path = "model"
-        mlflow.sklearn.log_model(xgb_model, model_path)
-        
-        # Register the model
-        model_uri = f"runs:/{run.info.run_id}/{model_path}"
-        model_name = f"Hotel_Bookings_XGBoost_{model_version}"
-        mlflow.register_model(model_uri, model_name)
-        
-        print(f"Model URI: {model_uri}")
-
-        # Save the model to disk
-        model_version = "v1"  # You can generate versions dynamically if needed
-        save_model(xgb_model, "XGBoostClassifier", model_version)
+    # Initialize and train the XGBoost model
+    xgb_model = build_model()
+    run_id, _ = train_and_log(xgb_model, X_train, X_test, y_train, y_test, DEFAULT_PARAMS, LABEL)
+    register_and_save(xgb_model, preprocessor, run_id, model_version)
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Run XGBoost Experiment.')
     parser.add_argument('--data', type=str, required=True, help='Version of the dataset to use')
-    parser.add_argument('--version', type=str, required=True, help='Version of the model')
+    parser.add_argument('--version', type=str, default=None,
+                        help='Version of the model. Defaults to the next version in the model registry.')
     
     args = parser.parse_args()
     run_xgboost_experiment(args.data, args.version)
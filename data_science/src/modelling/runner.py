@@ -0,0 +1,101 @@
+import importlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+import mlflow.sklearn
+from sklearn.model_selection import ParameterGrid
+from modelling.experiments import EXPERIMENTS
+from modelling.mlflow_config import setup_mlflow_experiment
+from modelling.training import train_and_log
+from utils.datasets import load_training_split
+from utils.shared_memory import SharedArrays, attach_arrays
+
+# Metric used to pick the run that is registered and saved for each experiment
+SELECTION_METRIC = 'roc_auc'
+
+# Training data mapped from shared memory in each worker process
+_shared_blocks = None
+_shared_data = None
+
+
+def get_experiment(name):
+    return importlib.import_module(EXPERIMENTS[name])
+
+
+def _init_worker(specs):
+    global _shared_blocks, _shared_data
+    _shared_blocks, _shared_data = attach_arrays(specs)
+
+
+def get_layout(experiment):
+    return 'sparse' if experiment.SPARSE_FEATURES else 'dense'
+
+
+def _train(name, params, n_jobs):
+    experiment = get_experiment(name)
+    setup_mlflow_experiment(experiment.MLFLOW_EXPERIMENT)
+
+    # Each worker gets its share of the cores unless the grid sets n_jobs itself
+    model = experiment.build_model({'n_jobs': n_jobs, **params})
+    layout = get_layout(experiment)
+    run_id, metrics = train_and_log(
+        model,
+        *(_shared_data[f'{layout}_{split}'] for split in ('X_train', 'X_test', 'y_train', 'y_test')),
+        {**experiment.DEFAULT_PARAMS, **params},
+        experiment.LABEL,
+    )
+    return name, params, run_id, metrics
+
+
+def run_experiments(grids, data_version, model_version, max_workers=None):
+    """
+    Train every experiment/hyperparameter combination side by side.
+
+    grids maps an experiment name to a parameter grid (see ParameterGrid);
+    an empty grid trains the experiment's default parameters. The dataset is
+    loaded and encoded once per layout the experiments need (sparse or
+    dense, see SPARSE_FEATURES) and shared with the worker processes through
+    shared memory. Every combination is logged as its own MLflow run, and the
+    best run of each experiment by SELECTION_METRIC is registered and saved.
+
+    Returns {experiment: (params, run_id, metrics)} for the selected runs.
+    """
+    arrays = {}
+    preprocessors = {}
+    for layout in sorted({get_layout(get_experiment(name)) for name in grids}):
+        data = load_training_split(data_version, sparse=layout == 'sparse')
+        if data is None:
+            return {}
+        *splits, preprocessors[layout] = data
+        arrays.update({f'{layout}_{split}': array
+                       for split, array in zip(('X_train', 'X_test', 'y_train', 'y_test'), splits)})
+
+    tasks = [(name, params) for name, grid in grids.items() for params in ParameterGrid(grid or {})]
+    max_workers = min(max_workers or os.cpu_count() or 1, len(tasks))
+    n_jobs = max(1, (os.cpu_count() or 1) // max_workers)
+
+    # Create the MLflow experiments up front so the workers do not race to create them
+    for name in grids:
+        setup_mlflow_experiment(get_experiment(name).MLFLOW_EXPERIMENT)
+
+    shared = SharedArrays(arrays)
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(shared.specs,)) as pool:
+            futures = [pool.submit(_train, name, params, n_jobs) for name, params in tasks]
+            results = [future.result() for future in futures]
+    finally:
+        shared.close()
+
+    best = {}
+    for name, params, run_id, metrics in results:
+        if name not in best or metrics[SELECTION_METRIC] > best[name][2][SELECTION_METRIC]:
+            best[name] = (params, run_id, metrics)
+
+    # Registration and model_output writes happen here, one experiment at a time
+    for name, (params, run_id, metrics) in best.items():
+        experiment = get_experiment(name)
+        setup_mlflow_experiment(experiment.MLFLOW_EXPERIMENT)
+        print(f"Best {experiment.LABEL} run {run_id}: {params} ({SELECTION_METRIC}={metrics[SELECTION_METRIC]})")
+        model = mlflow.sklearn.load_model(f"runs:/{run_id}/model")
+        experiment.register_and_save(model, preprocessors[get_layout(experiment)], run_id, model_version)
+
+    return best
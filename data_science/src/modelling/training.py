@@ -0,0 +1,53 @@
+import mlflow
+import mlflow.sklearn
+from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
+
+
+def evaluate_model(model, X_test, y_test):
+    """
+    Compute the classification metrics logged for every experiment.
+
+    ROC AUC ranks the predicted cancellation probabilities; computed on the
+    hard 0/1 predictions it would only be a balanced accuracy.
+    """
+    y_pred = model.predict(X_test)
+    y_proba = model.predict_proba(X_test)[:, 1]
+    return {
+        'accuracy': accuracy_score(y_test, y_pred),
+        'precision': precision_score(y_test, y_pred),
+        'recall': recall_score(y_test, y_pred),
+        'f1_score': f1_score(y_test, y_pred),
+        'roc_auc': roc_auc_score(y_test, y_proba),
+    }
+
+
+def train_and_log(model, X_train, X_test, y_train, y_test, params, label, nested=False):
+    """
+    Fit a model inside an MLflow run and log its parameters, metrics and artifact.
+
+    Returns the run id and the metrics. The caller decides whether the run is
+    registered and saved to model_output. nested starts the run under the
+    active one, e.g. the parent run of a tuning session.
+    """
+    with mlflow.start_run(nested=nested) as run:
+        model.fit(X_train, y_train)
+        metrics = evaluate_model(model, X_test, y_test)
+
+        # Print evaluation metrics
+        print(f'{label} Model:')
+        print(f'Accuracy: {metrics["accuracy"]}')
+        print(f'Precision: {metrics["precision"]}')
+        print(f'Recall: {metrics["recall"]}')
+        print(f'F1 Score: {metrics["f1_score"]}')
+        print(f'ROC AUC Score: {metrics["roc_auc"]}')
+
+        # Log parameters and metrics to MLflow
+        for name, value in params.items():
+            mlflow.log_param(name, value)
+        for name, value in metrics.items():
+            mlflow.log_metric(name, value)
+
+        # Log the model to MLflow
+        mlflow.sklearn.log_model(model, "model")
+
+    return run.info.run_id, metrics
@@ -0,0 +1,155 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import mlflow
+from mlflow.tracking import MlflowClient
+import numpy as np
+from mlflow.utils.mlflow_tags import MLFLOW_PARENT_RUN_ID
+from sklearn.metrics import roc_auc_score
+from sklearn.model_selection import ParameterSampler, train_test_split
+from modelling.mlflow_config import setup_mlflow_experiment
+from modelling.runner import get_experiment
+from modelling.training import train_and_log
+from utils.datasets import load_training_split
+from utils.shared_memory import SharedArrays, attach_arrays
+
+# Metric maximized on the validation split
+TUNING_METRIC = 'val_roc_auc'
+
+# Training data mapped from shared memory in each worker process
+_shared_blocks = None
+_shared_data = None
+
+
+def _init_worker(specs):
+    global _shared_blocks, _shared_data
+    _shared_blocks, _shared_data = attach_arrays(specs)
+
+
+def _run_trial(name, params, n_rows, rung, n_jobs, experiment_id, parent_run_id):
+    experiment = get_experiment(name)
+    setup_mlflow_experiment(experiment.MLFLOW_EXPERIMENT)
+
+    # The fit rows were shuffled once, so each prefix is a random subsample
+    X_fit = _shared_data['X_fit'][:n_rows]
+    y_fit = _shared_data['y_fit'][:n_rows]
+    X_val, y_val = _shared_data['X_val'], _shared_data['y_val']
+
+    # Workers log through the client: a forked worker inherits the parent's
+    # active run, so the fluent API cannot start a separate run here
+    client = MlflowClient()
+    run_id = client.create_run(experiment_id, tags={MLFLOW_PARENT_RUN_ID: parent_run_id}).info.run_id
+    try:
+        model = experiment.build_model({'n_jobs': n_jobs, **params})
+        learned_params = experiment.fit_with_validation(model, X_fit, y_fit, X_val, y_val)
+        score = roc_auc_score(y_val, model.predict_proba(X_val)[:, 1])
+
+        for key, value in {**params, 'rung': rung, 'n_rows': n_rows}.items():
+            client.log_param(run_id, key, value)
+        for key, value in learned_params.items():
+            client.log_param(run_id, f'learned_{key}', value)
+        client.log_metric(run_id, TUNING_METRIC, score)
+    except Exception:
+        client.set_terminated(run_id, status='FAILED')
+        raise
+    client.set_terminated(run_id)
+
+    return score, learned_params
+
+
+def get_rung_candidates(n_candidates, factor):
+    """
+    Candidates trained at each rung: the best 1/factor of a rung move on to
+    the next one, as long as at least two of them are left to compare.
+    """
+    counts = [n_candidates]
+    while counts[-1] // factor >= 2:
+        counts.append(counts[-1] // factor)
+    return counts
+
+
+def get_rung_sizes(n_candidates, max_rows, factor, min_rows):
+    """
+    Rows used at each rung of get_rung_candidates: factor times more rows per
+    rung (at least min_rows), so that the last rung trains on all max_rows rows.
+    """
+    n_rungs = len(get_rung_candidates(n_candidates, factor))
+    return [max(min(min_rows, max_rows), math.ceil(max_rows / factor ** (n_rungs - 1 - rung)))
+            for rung in range(n_rungs)]
+
+
+def tune_experiment(name, search_space, data_version, model_version, n_candidates=27, factor=3, min_rows=1000,
+                    validation_size=0.2, max_workers=None, random_state=42):
+    """
+    Tune an experiment with successive halving over the training rows.
+
+    n_candidates configurations are sampled from search_space (see
+    ParameterSampler) and trained on a small subsample in parallel; only the
+    best 1/factor of them move on to the next rung, which trains on factor
+    times more rows, until the last rung trains the remaining candidates on
+    the whole fit split (see get_rung_candidates). Trials are
+    scored on a validation split held out of the training split, which XGBoost
+    also uses for early stopping. Every trial is a nested MLflow run under one
+    parent run.
+
+    The winning configuration is then trained on the whole training split,
+    evaluated on the test split, registered and saved like a regular run.
+    Returns the winning parameters and their validation score.
+    """
+    experiment = get_experiment(name)
+    setup_mlflow_experiment(experiment.MLFLOW_EXPERIMENT)
+
+    data = load_training_split(data_version, sparse=experiment.SPARSE_FEATURES)
+    if data is None:
+        return None
+    X_train, X_test, y_train, y_test, preprocessor = data
+
+    X_fit, X_val, y_fit, y_val = train_test_split(
+        X_train, y_train, test_size=validation_size, random_state=random_state, stratify=y_train
+    )
+    order = np.random.default_rng(random_state).permutation(X_fit.shape[0])
+    X_fit, y_fit = X_fit[order], y_fit[order]
+
+    candidates = list(ParameterSampler(search_space, n_candidates, random_state=random_state))
+    rung_candidates = get_rung_candidates(len(candidates), factor)
+    rung_sizes = get_rung_sizes(len(candidates), X_fit.shape[0], factor, min_rows)
+    max_workers = min(max_workers or os.cpu_count() or 1, len(candidates))
+    n_jobs = max(1, (os.cpu_count() or 1) // max_workers)
+
+    shared = SharedArrays({'X_fit': X_fit, 'y_fit': y_fit, 'X_val': X_val, 'y_val': y_val})
+    try:
+        with mlflow.start_run(run_name=f"tune_{name}"), \
+                ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker, initargs=(shared.specs,)) as pool:
+            parent_run = mlflow.active_run()
+            mlflow.log_params({'n_candidates': len(candidates), 'factor': factor, 'rung_sizes': rung_sizes})
+
+            for rung, n_rows in enumerate(rung_sizes):
+                futures = [
+                    pool.submit(_run_trial, name, params, n_rows, rung, n_jobs,
+                                parent_run.info.experiment_id, parent_run.info.run_id)
+                    for params in candidates
+                ]
+                results = sorted(
+                    ((future.result(), i) for i, future in enumerate(futures)),
+                    key=lambda result: result[0][0], reverse=True,
+                )
+                print(f"Rung {rung}: {len(candidates)} candidates on {n_rows} rows, best {TUNING_METRIC}={results[0][0][0]}")
+
+                if rung == len(rung_sizes) - 1:
+                    (best_score, learned_params), best_index = results[0]
+                    break
+                candidates = [candidates[i] for _, i in results[:rung_candidates[rung + 1]]]
+
+            best_params = {**candidates[best_index], **learned_params}
+            mlflow.log_params({f'best_{key}': value for key, value in best_params.items()})
+            mlflow.log_metric(f'best_{TUNING_METRIC}', best_score)
+
+            # Retrain the winner on the whole training split
+            model = experiment.build_model(best_params)
+            run_id, _ = train_and_log(model, X_train, X_test, y_train, y_test,
+                                      {**experiment.DEFAULT_PARAMS, **best_params}, experiment.LABEL, nested=True)
+    finally:
+        shared.close()
+
+    experiment.register_and_save(model, preprocessor, run_id, model_version)
+    return best_params, best_score
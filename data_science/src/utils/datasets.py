@@ -0,0 +1,126 @@
+import pandas as pd
+import pyarrow.parquet as pq
+from sklearn.model_selection import train_test_split
+from model_artifacts import features
+from object_storage.data import get_data_storage
+from . import preprocessing
+from .feature_cache import FeatureCache
+from .preprocessing import CATEGORICAL_COLS, FEATURE_COLS, TARGET_COL, build_preprocessor, split_features_target
+
+# Prefix of the processed datasets in the data storage (see object_storage.data.get_data_storage)
+PROCESSED_DATA_PREFIX = 'processed/'
+
+# Columns the training loaders need; the raw reservation date is only kept
+# when the date parts have not been extracted by the ETL yet
+TRAINING_COLS = FEATURE_COLS + [TARGET_COL, 'reservation_status_date']
+
+
+def get_dataset_key(data_version, storage):
+    """
+    Return the storage key of the processed dataset for a version, preferring
+    Parquet over CSV, or None when the storage has neither.
+    """
+    name = f"{PROCESSED_DATA_PREFIX}clean_hotel_bookings_v{data_version}"
+    keys = set(storage.list(f"{name}."))
+    for extension in ("parquet", "csv"):
+        if f"{name}.{extension}" in keys:
+            return f"{name}.{extension}"
+    return None
+
+
+def downcast_numeric(df):
+    """
+    Store integer columns in the narrowest type that holds them and floats as
+    float32. The tree models split on float32 features, so no precision used
+    by training is lost.
+    """
+    for col in df.select_dtypes('integer').columns:
+        df[col] = pd.to_numeric(df[col], downcast='integer')
+    for col in df.select_dtypes('floating').columns:
+        df[col] = df[col].astype('float32')
+    return df
+
+
+def load_processed_dataset(data_path, columns=TRAINING_COLS):
+    """
+    Load only the requested columns of a processed dataset, with compact dtypes.
+
+    Parquet files keep their categorical schema, so no type coercion is
+    needed. CSV files are read with the same projection and the categorical
+    columns are typed while parsing.
+    """
+    if data_path.endswith(".parquet"):
+        available = set(pq.read_schema(data_path).names)
+        df = pd.read_parquet(data_path, columns=[col for col in columns if col in available])
+    else:
+        dtypes = {col: 'category' for col in CATEGORICAL_COLS}
+        df = pd.read_csv(data_path, usecols=lambda col: col in columns, dtype=dtypes)
+    return downcast_numeric(df)
+
+
+def stream_processed_dataset(storage, data_key, columns=TRAINING_COLS):
+    """
+    Load a processed dataset that storage has no local file for, streaming
+    the CSV object through pandas, which only holds the projected columns in
+    memory. Parquet needs a seekable file, so a remote Parquet dataset needs
+    a storage with a cache directory.
+    """
+    if data_key.endswith(".parquet"):
+        raise ValueError(f"{data_key} can only be read from a local copy; set DATA_CACHE_DIR to download it")
+    dtypes = {col: 'category' for col in CATEGORICAL_COLS}
+    return downcast_numeric(storage.read_csv(data_key, usecols=lambda col: col in columns, dtype=dtypes))
+
+
+def load_training_split(data_version, test_size=0.2, random_state=42, cache=None, sparse=True, storage=None):
+    """
+    Load a processed dataset version, split it and encode both splits.
+
+    The feature transformer is fitted on the training split only and reused
+    for the test split; sparse selects its output layout (see
+    build_preprocessor). Returns (X_train, X_test, y_train, y_test, preprocessor),
+    or None when the dataset version does not exist in storage (the data
+    storage by default, see object_storage.data.get_data_storage).
+
+    The encoded splits are cached on disk (see FeatureCache), keyed by the
+    dataset file, this module and the preprocessing code (including the
+    date step in model_artifacts.features), so repeated runs on
+    an unchanged dataset skip loading and encoding. Pass cache=False to bypass it.
+    A dataset streamed from remote storage has no file to key on and is not
+    cached.
+    """
+    # Locate the processed dataset (Parquet when available, CSV otherwise)
+    storage = storage or get_data_storage()
+    data_key = get_dataset_key(data_version, storage)
+    if data_key is None:
+        print(f"Dataset clean_hotel_bookings_v{data_version} not found")
+        return None
+
+    data_path = storage.get_local_path(data_key)
+    if cache is None:
+        cache = FeatureCache()
+    if cache and data_path is not None:
+        key = cache.key(data_path, [__file__, preprocessing.__file__, features.__file__], test_size=test_size, random_state=random_state,
+                        sparse=sparse)
+        cached = cache.get(key)
+        if cached is not None:
+            print(f"Loaded encoded features from cache {key[:12]}")
+            arrays, objects = cached
+            return arrays['X_train'], arrays['X_test'], arrays['y_train'], arrays['y_test'], objects['preprocessor']
+
+    # Load only the columns used by the model
+    if data_path is not None:
+        df = load_processed_dataset(data_path)
+    else:
+        df = stream_processed_dataset(storage, data_key)
+    X, y = split_features_target(df)
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+
+    preprocessor = build_preprocessor(sparse)
+    X_train = preprocessor.fit_transform(X_train)
+    X_test = preprocessor.transform(X_test)
+    y_train, y_test = y_train.to_numpy(), y_test.to_numpy()
+
+    if cache and data_path is not None:
+        cache.put(key, {'X_train': X_train, 'X_test': X_test, 'y_train': y_train, 'y_test': y_test},
+                  {'preprocessor': preprocessor})
+    return X_train, X_test, y_train, y_test, preprocessor
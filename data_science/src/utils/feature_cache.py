@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import joblib
+import numpy as np
+import scipy.sparse as sp
+
+base_dir = os.path.dirname(__file__)
+FEATURE_CACHE_DIR = os.getenv('FEATURE_CACHE_DIR', os.path.abspath(os.path.join(base_dir, '../../../data/cache/features')))
+
+# Total size the cache may take on disk before the least recently used entries are evicted
+FEATURE_CACHE_MAX_BYTES = int(os.getenv('FEATURE_CACHE_MAX_BYTES', str(2 * 1024 ** 3)))
+
+MANIFEST = 'manifest.json'
+
+
+def hash_file(path, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _dir_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+class FeatureCache:
+    """
+    On-disk cache of encoded training matrices, addressed by content.
+
+    Each entry is a directory named after a hash of the input file, the code
+    that encodes it and the encoding parameters, so any change to one of them
+    is a cache miss instead of a stale hit. Arrays are stored as .npy files
+    (CSR matrices as their data/indices/indptr arrays) and loaded memory-mapped;
+    other objects, such as the fitted preprocessor, are stored with joblib.
+    """
+
+    def __init__(self, cache_dir=FEATURE_CACHE_DIR, max_bytes=FEATURE_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def key(self, data_path, code_paths, **params):
+        digest = hashlib.sha256()
+        digest.update(hash_file(data_path).encode())
+        for code_path in sorted(code_paths):
+            digest.update(hash_file(code_path).encode())
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        return digest.hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    def get(self, key):
+        """
+        Return the cached (arrays, objects) for a key, or None on a miss.
+        """
+        entry_path = self._entry_path(key)
+        manifest_path = os.path.join(entry_path, MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+
+        def load(name):
+            return np.load(os.path.join(entry_path, f"{name}.npy"), mmap_mode='r')
+
+        arrays = {}
+        for name, spec in manifest['arrays'].items():
+            if spec['format'] == 'csr':
+                arrays[name] = sp.csr_matrix(
+                    (load(f"{name}.data"), load(f"{name}.indices"), load(f"{name}.indptr")),
+                    shape=tuple(spec['shape']),
+                    copy=False,
+                )
+            else:
+                arrays[name] = load(name)
+        objects = {name: joblib.load(os.path.join(entry_path, f"{name}.pkl")) for name in manifest['objects']}
+
+        # Mark the entry as recently used for eviction
+        os.utime(manifest_path)
+        return arrays, objects
+
+    def put(self, key, arrays, objects=None):
+        """
+        Store arrays and objects under a key, then evict old entries above max_bytes.
+        """
+        objects = objects or {}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write into a temporary directory and rename it, so readers never see a partial entry
+        tmp_path = tempfile.mkdtemp(prefix=f".{key}.", dir=self.cache_dir)
+        manifest = {'arrays': {}, 'objects': list(objects)}
+        try:
+            for name, array in arrays.items():
+                if sp.issparse(array):
+                    csr = array.tocsr()
+                    for part in ('data', 'indices', 'indptr'):
+                        np.save(os.path.join(tmp_path, f"{name}.{part}.npy"), getattr(csr, part))
+                    manifest['arrays'][name] = {'format': 'csr', 'shape': list(csr.shape)}
+                else:
+                    np.save(os.path.join(tmp_path, f"{name}.npy"), np.asarray(array))
+                    manifest['arrays'][name] = {'format': 'dense'}
+            for name, obj in objects.items():
+                joblib.dump(obj, os.path.join(tmp_path, f"{name}.pkl"))
+            with open(os.path.join(tmp_path, MANIFEST), 'w') as file:
+                json.dump(manifest, file)
+            try:
+                os.rename(tmp_path, self._entry_path(key))
+            except OSError:
+                # Another process stored the same key first; its entry is identical
+                if not os.path.exists(self._entry_path(key)):
+                    raise
+        finally:
+            # Nothing is left to remove once the rename succeeded
+            shutil.rmtree(tmp_path, ignore_errors=True)
+        self.evict(keep=key)
+
+    def evict(self, keep=None):
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            manifest_path = os.path.join(self.cache_dir, name, MANIFEST)
+            if os.path.exists(manifest_path):
+                entries.append((os.path.getmtime(manifest_path), name, _dir_size(os.path.join(self.cache_dir, name))))
+
+        total = sum(size for _, _, size in entries)
+        for _, name, size in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+            total -= size
+            print(f"Evicted cached features {name}")
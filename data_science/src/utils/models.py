@@ -1,21 +1,154 @@
+import argparse
+import json
 import joblib
 import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timezone
+from sklearn.ensemble import RandomForestClassifier
+from model_artifacts.loading import XGBOOST_EXTENSIONS, load_model_file
+from model_artifacts.packed_forest import export_forest
+from model_artifacts.registry import REGISTRY_FILE, load_registry as load_registry_file
 
-def save_model(model, model_name, version):
+def get_model_path(model_name, version, extension='pkl'):
+    return os.path.join("model_output", model_name, f"{model_name}_{version}.{extension}")
+
+def is_xgboost_model(model):
+    return type(model).__module__.startswith('xgboost')
+
+def get_forest_path(model_name, version):
+    return os.path.join("model_output", model_name, f"{model_name}_{version}_forest")
+
+def remove_model_files(model_name, version):
+    # A version lives in a single format, so a re-saved model never loads a stale file
+    for extension in XGBOOST_EXTENSIONS + ('pkl',):
+        model_path = get_model_path(model_name, version, extension)
+        if os.path.exists(model_path):
+            os.remove(model_path)
+    shutil.rmtree(get_forest_path(model_name, version), ignore_errors=True)
+
+def save_model(model, model_name, version, compress=0):
     """
-    Save the model to a .pkl file in the output folder.
+    Save the model to the output folder.
+
+    XGBoost models are saved in the booster's native UBJSON format, which
+    loads without unpickling. Other models are pickled with joblib: uncompressed
+    by default, so that load_model can memory-map their arrays, or compressed
+    (e.g. compress=3) to save storage at the cost of a full read on load.
+    Random forests are also exported as packed node arrays, which the API can
+    score without sklearn (MODEL_BACKEND=packed).
     """
-    model_path = os.path.join("model_output", model_name, f"{model_name}_{version}.pkl")
-    os.makedirs(os.path.dirname(model_path), exist_ok=True)
-    joblib.dump(model, model_path)
+    remove_model_files(model_name, version)
+    if is_xgboost_model(model):
+        model_path = get_model_path(model_name, version, 'ubj')
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        model.save_model(model_path)
+    else:
+        model_path = get_model_path(model_name, version)
+        os.makedirs(os.path.dirname(model_path), exist_ok=True)
+        joblib.dump(model, model_path, compress=compress)
     print(f"Model saved to {model_path}")
 
-def load_model(model_name, version):
+    if isinstance(model, RandomForestClassifier):
+        forest_path = get_forest_path(model_name, version)
+        export_forest(model, forest_path)
+        print(f"Packed forest exported to {forest_path}")
+    return model_path
+
+def load_model(model_name, version, mmap_mode='r'):
+    """
+    Load a model saved with save_model.
+    """
+    for extension in XGBOOST_EXTENSIONS + ('pkl',):
+        model_path = get_model_path(model_name, version, extension)
+        if os.path.exists(model_path):
+            return load_model_file(model_path, mmap_mode)
+    raise FileNotFoundError(f"Model file {get_model_path(model_name, version)} does not exist.")
+
+def save_preprocessor(preprocessor, model_name, version):
+    """
+    Save the fitted feature transformer next to the model it was trained with.
+    """
+    preprocessor_path = os.path.join("model_output", model_name, f"{model_name}_{version}_preprocessor.pkl")
+    os.makedirs(os.path.dirname(preprocessor_path), exist_ok=True)
+    joblib.dump(preprocessor, preprocessor_path)
+    print(f"Preprocessor saved to {preprocessor_path}")
+    return preprocessor_path
+
+def load_preprocessor(model_name, version):
+    """
+    Load the fitted feature transformer saved with a model.
+    """
+    preprocessor_path = os.path.join("model_output", model_name, f"{model_name}_{version}_preprocessor.pkl")
+    if not os.path.exists(preprocessor_path):
+        raise FileNotFoundError(f"Preprocessor file {preprocessor_path} does not exist.")
+
+    return joblib.load(preprocessor_path)
+
+# Alias moved to every newly registered version
+LATEST_ALIAS = "latest"
+
+def get_registry_path(model_name):
+    return os.path.join("model_output", model_name, REGISTRY_FILE)
+
+def load_registry(model_name):
+    return load_registry_file(get_registry_path(model_name))
+
+def get_next_version(model_name):
+    """
+    Return the version after the highest registered "v<n>" version of a
+    model, e.g. "v3" after "v2", or "v1" for a model without versions.
+    """
+    numbers = [int(version[1:]) for version in load_registry(model_name)["versions"]
+               if re.fullmatch(r"v\d+", version)]
+    return f"v{max(numbers, default=0) + 1}"
+
+def _write_registry(model_name, registry):
+    # Written to a temporary file and renamed, so readers never see a partial registry
+    registry_path = get_registry_path(model_name)
+    os.makedirs(os.path.dirname(registry_path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(registry_path), suffix=".tmp")
+    with os.fdopen(fd, "w") as file:
+        json.dump(registry, file, indent=2, sort_keys=True)
+    os.replace(tmp_path, registry_path)
+
+def register_version(model_name, version, model_path, preprocessor_path, run_id=None,
+                     registered_model=None, registered_version=None):
     """
-    Load a model from a .pkl file.
+    Record a saved model version in the registry next to its artifacts and
+    point the "latest" alias at it. run_id and the MLflow registered model
+    and version link the artifacts back to the run that produced them.
+    """
+    registry = load_registry(model_name)
+    registry["versions"][version] = {
+        "model": os.path.basename(model_path),
+        "preprocessor": os.path.basename(preprocessor_path),
+        "run_id": run_id,
+        "registered_model": registered_model,
+        "registered_version": registered_version,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    registry["aliases"][LATEST_ALIAS] = version
+    _write_registry(model_name, registry)
+    print(f"Registered {model_name} {version} as '{LATEST_ALIAS}'")
+
+def set_model_alias(model_name, alias, version):
     """
-    model_path = os.path.join("model_output", model_name, f"{model_name}_{version}.pkl")
-    if not os.path.exists(model_path):
-        raise FileNotFoundError(f"Model file {model_path} does not exist.")
-    
-    return joblib.load(model_path)
+    Point an alias (e.g. "champion" or "challenger") at a registered version.
+    """
+    registry = load_registry(model_name)
+    if version not in registry["versions"]:
+        raise ValueError(f"Version '{version}' of {model_name} is not registered.")
+    registry["aliases"][alias] = version
+    _write_registry(model_name, registry)
+    print(f"Alias '{alias}' of {model_name} now points to {version}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Point a model alias at a registered version.")
+    parser.add_argument("model_name", help="Saved model name, e.g. RandomForestClassifier")
+    parser.add_argument("alias", help="Alias to set, e.g. champion")
+    parser.add_argument("version", help="Registered version, e.g. v2")
+    args = parser.parse_args()
+    set_model_alias(args.model_name, args.alias, args.version)
+
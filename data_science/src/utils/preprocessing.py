@@ -0,0 +1,85 @@
+from operator import methodcaller
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import make_pipeline
+from sklearn.preprocessing import FunctionTransformer, OneHotEncoder, StandardScaler
+from model_artifacts.features import DATE_COL, DATE_PART_COLS, add_date_features, get_date_feature_names
+
+TARGET_COL = 'is_canceled'
+
+# Columns one-hot encoded with a fixed, fitted category list
+CATEGORICAL_COLS = ['hotel', 'arrival_date_year', 'arrival_date_month', 'meal', 'country', 'market_segment',
+                    'distribution_channel', 'is_repeated_guest', 'customer_type', 'reserved_room_type',
+                    'assigned_room_type', 'deposit_type', 'agent', 'company', 'reservation_status']
+
+# Columns standardized with the mean/std learned on the training split
+NUMERICAL_COLS = ['arrival_date_week_number', 'arrival_date_day_of_month', 'stays_in_weekend_nights',
+                  'stays_in_week_nights', 'adults', 'children', 'babies', 'previous_cancellations',
+                  'previous_bookings_not_canceled', 'booking_changes', 'days_in_waiting_list', 'adr',
+                  'required_car_parking_spaces', 'total_of_special_requests']
+
+# Columns passed to the model unchanged
+PASSTHROUGH_COLS = ['lead_time'] + DATE_PART_COLS
+
+# Columns encoded by the column transformer
+FEATURE_COLS = CATEGORICAL_COLS + NUMERICAL_COLS + PASSTHROUGH_COLS
+
+# Columns of a raw booking row taken by the fitted preprocessor, which extracts the date parts itself
+INPUT_COLS = CATEGORICAL_COLS + NUMERICAL_COLS + ['lead_time', DATE_COL]
+
+
+def to_float32():
+    """Cast a block of columns to float32, keeping their names."""
+    return FunctionTransformer(methodcaller('astype', np.float32), feature_names_out='one-to-one')
+
+
+def build_preprocessor(sparse=True):
+    """
+    Build the unfitted feature transformer shared by training and inference.
+
+    It takes raw booking rows (INPUT_COLS): reservation_status_date is split
+    into its date parts by the first step, so the saved transformer rebuilds
+    the training features on its own. Both steps are built from functions
+    the API and the inference executor can import (pandas methods and
+    model_artifacts.features), as they unpickle the transformer without
+    data_science on their path.
+
+    Once fitted, the category lists and scaler statistics are frozen, so every
+    batch is encoded into the same column layout regardless of which categories
+    it contains. Unseen categories are encoded as all zeros.
+
+    The output is a SciPy CSR matrix whose columns are named by
+    get_feature_names_out(). Most of it is one-hot zeros, so it is passed to the
+    models as is instead of being densified. With sparse=False the output is a
+    dense array instead, for models that read unstored CSR entries as missing
+    values rather than zeros (XGBoost). Every block is float32, the type
+    the tree models split on, so stacking them does not upcast the matrix to
+    float64.
+    """
+    columns = ColumnTransformer(
+        transformers=[
+            ('categorical', OneHotEncoder(handle_unknown='ignore', sparse_output=sparse, dtype=np.float32), CATEGORICAL_COLS),
+            ('numerical', make_pipeline(to_float32(), StandardScaler()), NUMERICAL_COLS),
+            ('passthrough', to_float32(), PASSTHROUGH_COLS),
+        ],
+        # Always stack into CSR (or never), however dense the scaled columns make the result
+        sparse_threshold=1.0 if sparse else 0.0,
+        verbose_feature_names_out=False,
+    )
+    dates = FunctionTransformer(add_date_features, feature_names_out=get_date_feature_names)
+    return make_pipeline(dates, columns)
+
+
+def split_features_target(df):
+    """
+    Return the raw model inputs (INPUT_COLS) and the target from a cleaned
+    bookings frame. Datasets whose date parts were already extracted by the
+    ETL get reservation_status_date back, so the preprocessor is always
+    fitted on the columns it receives at inference time.
+    """
+    if DATE_COL not in df.columns:
+        df = df.assign(**{DATE_COL: pd.to_datetime(pd.DataFrame({
+            'year': df['reservation_year'], 'month': df['reservation_month'], 'day': df['reservation_day'],
+        }))})
+    return df[INPUT_COLS], df[TARGET_COL]
@@ -0,0 +1,69 @@
+import numpy as np
+import scipy.sparse as sp
+from multiprocessing import shared_memory
+
+
+def _share_array(array, blocks):
+    # Copy the array once into a shared block; every worker maps the same pages
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    blocks.append(block)
+    return {'name': block.name, 'shape': array.shape, 'dtype': array.dtype.str}
+
+
+def _attach_array(spec, blocks):
+    block = shared_memory.SharedMemory(name=spec['name'])
+    blocks.append(block)
+    return np.ndarray(spec['shape'], dtype=np.dtype(spec['dtype']), buffer=block.buf)
+
+
+class SharedArrays:
+    """
+    Dense arrays and CSR matrices copied into shared memory by the parent process.
+
+    specs is a small picklable description passed to worker processes, which
+    rebuild the same objects over the shared blocks with attach_arrays instead
+    of receiving a copy of the data.
+    """
+
+    def __init__(self, arrays):
+        self.blocks = []
+        self.specs = {}
+        for key, array in arrays.items():
+            if sp.issparse(array):
+                csr = array.tocsr()
+                self.specs[key] = {
+                    'format': 'csr',
+                    'shape': csr.shape,
+                    'data': _share_array(csr.data, self.blocks),
+                    'indices': _share_array(csr.indices, self.blocks),
+                    'indptr': _share_array(csr.indptr, self.blocks),
+                }
+            else:
+                self.specs[key] = {'format': 'dense', 'array': _share_array(np.asarray(array), self.blocks)}
+
+    def close(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+
+def attach_arrays(specs):
+    """
+    Map the arrays described by SharedArrays.specs. Returns the opened blocks,
+    which must stay referenced while the arrays are in use, and the arrays.
+    """
+    blocks = []
+    arrays = {}
+    for key, spec in specs.items():
+        if spec['format'] == 'csr':
+            arrays[key] = sp.csr_matrix(
+                (_attach_array(spec['data'], blocks), _attach_array(spec['indices'], blocks),
+                 _attach_array(spec['indptr'], blocks)),
+                shape=spec['shape'],
+                copy=False,
+            )
+        else:
+            arrays[key] = _attach_array(spec['array'], blocks)
+    return blocks, arrays
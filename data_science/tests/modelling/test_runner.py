@@ -0,0 +1,53 @@
+import mlflow
+import numpy as np
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+from modelling import runner
+from modelling.training import evaluate_model
+
+def make_split(n_rows=400, seed=0):
+    rng = np.random.default_rng(seed)
+    X = rng.random((n_rows, 4)).astype(np.float32)
+    y = (X[:, 0] + 0.5 * rng.random(n_rows) > 0.75).astype(int)
+    n_train = n_rows * 3 // 4
+    return X[:n_train], X[n_train:], y[:n_train], y[n_train:]
+
+@pytest.fixture
+def tracking(tmp_path, monkeypatch):
+    """Log the runs to a temporary MLflow store instead of data_science/mlruns."""
+    def setup_mlflow_experiment(experiment_name):
+        mlflow.set_tracking_uri(f"file://{tmp_path / 'mlruns'}")
+        mlflow.set_experiment(experiment_name)
+
+    monkeypatch.setattr(runner, 'setup_mlflow_experiment', setup_mlflow_experiment)
+    yield
+    mlflow.set_tracking_uri(None)
+
+def test_evaluate_model_computes_roc_auc_from_probabilities():
+    X_train, X_test, y_train, y_test = make_split()
+    model = LogisticRegression().fit(X_train, y_train)
+    metrics = evaluate_model(model, X_test, y_test)
+    assert metrics['roc_auc'] == roc_auc_score(y_test, model.predict_proba(X_test)[:, 1])
+    assert metrics['roc_auc'] != roc_auc_score(y_test, model.predict(X_test))
+
+def test_run_experiments_registers_the_best_run(tracking, monkeypatch):
+    X_train, X_test, y_train, y_test = make_split()
+    monkeypatch.setattr(runner, 'load_training_split',
+                        lambda data_version, sparse: (X_train, X_test, y_train, y_test, 'preprocessor'))
+    experiment = runner.get_experiment('random_forest')
+    saved = []
+    monkeypatch.setattr(experiment, 'register_and_save', lambda *args: saved.append(args))
+
+    grid = {'n_estimators': [10], 'max_depth': [1, 2, 8]}
+    best = runner.run_experiments({'random_forest': grid}, '1', 'v2', max_workers=2)
+
+    params, run_id, metrics = best['random_forest']
+    runs = mlflow.search_runs(experiment_names=[experiment.MLFLOW_EXPERIMENT])
+    assert len(runs) == 3
+    assert metrics['roc_auc'] == runs['metrics.roc_auc'].max()
+
+    # Only the selected run is saved, with the preprocessor its layout was encoded with
+    (model, preprocessor, saved_run_id, model_version), = saved
+    assert (saved_run_id, model_version, preprocessor) == (run_id, 'v2', 'preprocessor')
+    assert metrics['roc_auc'] == pytest.approx(roc_auc_score(y_test, model.predict_proba(X_test)[:, 1]))
@@ -0,0 +1,59 @@
+import mlflow
+import pytest
+from modelling import tuning
+from modelling.tuning import get_rung_candidates, get_rung_sizes
+from .test_runner import make_split
+
+@pytest.mark.parametrize('n_candidates, factor, candidates, sizes', [
+    (1, 3, [1], [76000]),
+    (5, 3, [5], [76000]),
+    (10, 3, [10, 3], [25334, 76000]),
+    (27, 3, [27, 9, 3], [8445, 25334, 76000]),
+    (8, 2, [8, 4, 2], [19000, 38000, 76000]),
+])
+def test_rung_schedule_ends_with_several_candidates_on_all_rows(n_candidates, factor, candidates, sizes):
+    assert get_rung_candidates(n_candidates, factor) == candidates
+    assert get_rung_sizes(n_candidates, 76000, factor, min_rows=1000) == sizes
+
+def test_rung_sizes_respect_min_rows():
+    assert get_rung_sizes(27, 3000, 3, min_rows=1000) == [1000, 1000, 3000]
+    assert get_rung_sizes(27, 500, 3, min_rows=1000) == [500, 500, 500]
+
+@pytest.fixture
+def tracking(tmp_path, monkeypatch):
+    """Log the runs to a temporary MLflow store instead of data_science/mlruns."""
+    def setup_mlflow_experiment(experiment_name):
+        mlflow.set_tracking_uri(f"file://{tmp_path / 'mlruns'}")
+        mlflow.set_experiment(experiment_name)
+
+    monkeypatch.setattr(tuning, 'setup_mlflow_experiment', setup_mlflow_experiment)
+    yield
+    mlflow.set_tracking_uri(None)
+
+def test_tune_experiment_picks_the_winner_on_the_whole_fit_split(tracking, monkeypatch):
+    X_train, X_test, y_train, y_test = make_split(n_rows=800)
+    monkeypatch.setattr(tuning, 'load_training_split',
+                        lambda data_version, sparse: (X_train, X_test, y_train, y_test, 'preprocessor'))
+    experiment = tuning.get_experiment('xgboost')
+    saved = []
+    monkeypatch.setattr(experiment, 'register_and_save', lambda *args: saved.append(args))
+
+    search_space = {'max_depth': [1, 2, 3, 4], 'learning_rate': [0.05, 0.1, 0.3]}
+    best_params, best_score = tuning.tune_experiment('xgboost', search_space, '1', 'v3', n_candidates=9,
+                                                     min_rows=100, max_workers=2)
+
+    trials = mlflow.search_runs(experiment_names=[experiment.MLFLOW_EXPERIMENT],
+                                filter_string="params.rung != ''")
+    n_fit_rows = len(X_train) - int(len(X_train) * 0.2)
+    assert trials.groupby('params.rung').size().to_dict() == {'0': 9, '1': 3}
+    assert set(trials.loc[trials['params.rung'] == '1', 'params.n_rows']) == {str(n_fit_rows)}
+
+    # The boosting rounds of the winner were found by early stopping on the whole fit split
+    winner = trials.loc[trials['metrics.val_roc_auc'].idxmax()]
+    assert winner['params.rung'] == '1'
+    assert best_score == winner['metrics.val_roc_auc']
+    assert best_params['n_estimators'] == int(winner['params.learned_n_estimators'])
+
+    (model, preprocessor, run_id, model_version), = saved
+    assert model.get_params()['n_estimators'] == best_params['n_estimators']
+    assert (preprocessor, model_version) == ('preprocessor', 'v3')
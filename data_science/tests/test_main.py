@@ -0,0 +1,23 @@
+import os
+import subprocess
+import sys
+from testing.import_times import get_import_times
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+def test_main_defers_heavy_dependencies():
+    # mlflow and the model libraries are imported on first use
+    times = get_import_times('import main', SRC_DIR)
+    assert not {'mlflow', 'sklearn', 'xgboost'} & set(times)
+
+def test_experiments_do_not_import_plotting_libraries():
+    times = get_import_times('import modelling.hotel_booking.random_forest.v1', SRC_DIR)
+    assert not {'matplotlib', 'seaborn'} & set(times)
+
+def test_main_rejects_grids_of_experiments_that_are_not_run(tmp_path):
+    grid_path = tmp_path / 'grid.json'
+    grid_path.write_text('{"xgboost": {"max_depth": [3]}}')
+    result = subprocess.run([sys.executable, 'main.py', 'random_forest', '--data', '1', '--version', 'v1',
+                             '--grid', str(grid_path)], cwd=SRC_DIR, capture_output=True, text=True)
+    assert result.returncode == 2
+    assert 'Grid given for experiments that are not run: xgboost' in result.stderr
@@ -0,0 +1,60 @@
+import pandas as pd
+import pytest
+from object_storage.local_storage import LocalStorage
+from src.utils.datasets import get_dataset_key, load_processed_dataset, stream_processed_dataset
+
+def write_dataset(tmp_path, extension):
+    df = pd.DataFrame({
+        'hotel': pd.Categorical(['Resort Hotel', 'City Hotel']),
+        'is_canceled': [0, 1],
+        'lead_time': [342, 737],
+        'season': ['Verano', 'Verano'],
+        'reservation_status_date': ['2015-07-01', '2015-07-02'],
+    })
+    data_path = tmp_path / f"clean_hotel_bookings_v1.{extension}"
+    if extension == "parquet":
+        df.to_parquet(data_path, index=False)
+    else:
+        df.to_csv(data_path, index=False)
+    return str(data_path)
+
+class StreamingStorage(LocalStorage):
+    """Local storage without local files, as a remote storage without a cache directory."""
+
+    def get_local_path(self, key, info=None):
+        return None
+
+def test_get_dataset_key_prefers_parquet(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    (tmp_path / "processed").mkdir()
+    write_dataset(tmp_path / "processed", "csv")
+    assert get_dataset_key("1", storage) == "processed/clean_hotel_bookings_v1.csv"
+
+    write_dataset(tmp_path / "processed", "parquet")
+    assert get_dataset_key("1", storage) == "processed/clean_hotel_bookings_v1.parquet"
+    assert get_dataset_key("2", storage) is None
+
+def test_stream_processed_dataset_matches_local_csv(tmp_path):
+    data_path = write_dataset(tmp_path, "csv")
+    df = stream_processed_dataset(StreamingStorage(str(tmp_path)), "clean_hotel_bookings_v1.csv")
+    pd.testing.assert_frame_equal(df, load_processed_dataset(data_path))
+
+    write_dataset(tmp_path, "parquet")
+    with pytest.raises(ValueError, match="DATA_CACHE_DIR"):
+        stream_processed_dataset(StreamingStorage(str(tmp_path)), "clean_hotel_bookings_v1.parquet")
+
+def test_load_processed_dataset_projects_parquet_columns(tmp_path):
+    df = load_processed_dataset(write_dataset(tmp_path, "parquet"))
+    assert list(df.columns) == ['hotel', 'lead_time', 'is_canceled', 'reservation_status_date']
+    assert isinstance(df['hotel'].dtype, pd.CategoricalDtype)
+
+def test_load_processed_dataset_projects_csv_columns(tmp_path):
+    df = load_processed_dataset(write_dataset(tmp_path, "csv"))
+    assert 'season' not in df.columns
+    assert isinstance(df['hotel'].dtype, pd.CategoricalDtype)
+
+def test_load_processed_dataset_downcasts_numeric_columns(tmp_path):
+    df = load_processed_dataset(write_dataset(tmp_path, "csv"))
+    assert df['is_canceled'].dtype == 'int8'
+    assert df['lead_time'].dtype == 'int16'
+    assert df['lead_time'].tolist() == [342, 737]
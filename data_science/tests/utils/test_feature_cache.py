@@ -0,0 +1,49 @@
+import os
+import numpy as np
+import scipy.sparse as sp
+from src.utils.feature_cache import FeatureCache
+
+def write(path, content):
+    path.write_text(content)
+    return str(path)
+
+def test_key_changes_with_data_code_and_params(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache"))
+    data_path = write(tmp_path / "data.csv", "a,b\n1,2\n")
+    code_path = write(tmp_path / "code.py", "x = 1\n")
+
+    key = cache.key(data_path, [code_path], test_size=0.2)
+    assert cache.key(data_path, [code_path], test_size=0.2) == key
+    assert cache.key(data_path, [code_path], test_size=0.3) != key
+
+    write(tmp_path / "code.py", "x = 2\n")
+    assert cache.key(data_path, [code_path], test_size=0.2) != key
+
+def test_put_and_get_memory_maps_arrays(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache"))
+    X = sp.random(20, 5, density=0.3, format='csr', random_state=0)
+    y = np.arange(20, dtype=np.int8)
+
+    assert cache.get("entry") is None
+    cache.put("entry", {'X': X, 'y': y}, {'meta': {'columns': ['a', 'b']}})
+    arrays, objects = cache.get("entry")
+
+    assert sp.isspmatrix_csr(arrays['X'])
+    assert isinstance(arrays['y'], np.memmap)
+    assert not arrays['X'].data.flags.writeable
+    assert (arrays['X'] != X).nnz == 0
+    assert arrays['y'].tolist() == y.tolist()
+    assert objects['meta'] == {'columns': ['a', 'b']}
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    array = np.zeros(1000)
+    cache = FeatureCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    cache.put("old", {'x': array})
+    cache.put("new", {'x': array})
+    os.utime(os.path.join(cache.cache_dir, "old", "manifest.json"), (0, 0))
+
+    # Only one entry fits; the least recently used one goes
+    cache.max_bytes = array.nbytes + 1000
+    cache.evict()
+    assert cache.get("old") is None
+    assert cache.get("new") is not None
@@ -0,0 +1,83 @@
+import os
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+from model_artifacts.packed_forest import PackedForest
+from src.utils.models import get_next_version, load_model, load_registry, register_version, save_model, save_preprocessor, set_model_alias
+
+@pytest.fixture
+def training_data():
+    rng = np.random.default_rng(0)
+    X = rng.random((50, 4))
+    y = (X[:, 0] > 0.5).astype(int)
+    return X, y
+
+def test_xgboost_model_saved_in_native_format(tmp_path, monkeypatch, training_data):
+    monkeypatch.chdir(tmp_path)
+    X, y = training_data
+    model = XGBClassifier(n_estimators=5, max_depth=2).fit(X, y)
+
+    save_model(model, "XGBoostClassifier", "v1")
+    assert os.path.exists("model_output/XGBoostClassifier/XGBoostClassifier_v1.ubj")
+
+    loaded = load_model("XGBoostClassifier", "v1")
+    np.testing.assert_allclose(loaded.predict_proba(X), model.predict_proba(X))
+
+@pytest.mark.parametrize("compress", [0, 3])
+def test_sklearn_model_round_trip(tmp_path, monkeypatch, training_data, compress):
+    monkeypatch.chdir(tmp_path)
+    X, y = training_data
+    model = RandomForestClassifier(n_estimators=5, random_state=0).fit(X, y)
+
+    save_model(model, "RandomForestClassifier", "v1", compress=compress)
+    loaded = load_model("RandomForestClassifier", "v1")
+    np.testing.assert_array_equal(loaded.predict_proba(X), model.predict_proba(X))
+
+def test_save_model_replaces_other_formats(tmp_path, monkeypatch, training_data):
+    monkeypatch.chdir(tmp_path)
+    X, y = training_data
+    save_model(XGBClassifier(n_estimators=2).fit(X, y), "Model", "v1")
+    save_model(RandomForestClassifier(n_estimators=2).fit(X, y), "Model", "v1")
+
+    assert sorted(os.listdir("model_output/Model")) == ["Model_v1.pkl", "Model_v1_forest"]
+    assert isinstance(load_model("Model", "v1"), RandomForestClassifier)
+
+def test_random_forest_exports_packed_forest(tmp_path, monkeypatch, training_data):
+    monkeypatch.chdir(tmp_path)
+    X, y = training_data
+    model = RandomForestClassifier(n_estimators=3, random_state=0).fit(X, y)
+
+    save_model(model, "RandomForestClassifier", "v1")
+    forest_path = "model_output/RandomForestClassifier/RandomForestClassifier_v1_forest"
+    roots = np.load(os.path.join(forest_path, "roots.npy"))
+    left = np.load(os.path.join(forest_path, "left.npy"))
+    assert len(roots) == 3
+    assert len(left) == sum(estimator.tree_.node_count for estimator in model.estimators_)
+    np.testing.assert_array_equal(PackedForest.load(forest_path).predict_proba(X), model.predict_proba(X))
+
+def test_register_version_and_aliases(tmp_path, monkeypatch, training_data):
+    monkeypatch.chdir(tmp_path)
+    X, y = training_data
+    for version in ("v1", "v2"):
+        model = XGBClassifier(n_estimators=2, max_depth=2).fit(X, y)
+        model_path = save_model(model, "XGBoostClassifier", version)
+        preprocessor_path = save_preprocessor(None, "XGBoostClassifier", version)
+        register_version("XGBoostClassifier", version, model_path, preprocessor_path, run_id=f"run-{version}")
+
+    registry = load_registry("XGBoostClassifier")
+    assert registry["aliases"] == {"latest": "v2"}
+    assert registry["versions"]["v1"]["model"] == "XGBoostClassifier_v1.ubj"
+    assert registry["versions"]["v2"]["preprocessor"] == "XGBoostClassifier_v2_preprocessor.pkl"
+
+    set_model_alias("XGBoostClassifier", "champion", "v1")
+    assert load_registry("XGBoostClassifier")["aliases"] == {"latest": "v2", "champion": "v1"}
+    with pytest.raises(ValueError):
+        set_model_alias("XGBoostClassifier", "champion", "v3")
+
+def test_next_version_follows_the_registered_versions(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    assert get_next_version("RandomForestClassifier") == "v1"
+    for version in ("v1", "v9", "v10", "candidate"):
+        register_version("RandomForestClassifier", version, f"model_{version}.pkl", f"preprocessor_{version}.pkl")
+    assert get_next_version("RandomForestClassifier") == "v11"
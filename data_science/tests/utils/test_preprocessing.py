@@ -0,0 +1,111 @@
+import pickle
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+from sklearn.ensemble import RandomForestClassifier
+from xgboost import XGBClassifier
+from src.utils.preprocessing import INPUT_COLS, NUMERICAL_COLS, PASSTHROUGH_COLS, build_preprocessor, split_features_target
+
+@pytest.fixture
+def bookings_df():
+    rows = 6
+    df = pd.DataFrame({
+        'hotel': ['Resort Hotel', 'City Hotel'] * 3,
+        'is_canceled': [0, 1, 0, 1, 0, 1],
+        'lead_time': [342, 737, 7, 13, 14, 0],
+        'arrival_date_year': [2015, 2016, 2017] * 2,
+        'arrival_date_month': ['July', 'August'] * 3,
+        'meal': ['BB'] * rows,
+        'country': ['PRT', 'GBR', 'ESP'] * 2,
+        'market_segment': ['Direct', 'Online TA'] * 3,
+        'distribution_channel': ['Direct', 'TA/TO'] * 3,
+        'is_repeated_guest': [0, 1] * 3,
+        'customer_type': ['Transient'] * rows,
+        'reserved_room_type': ['A', 'C'] * 3,
+        'assigned_room_type': ['A', 'C'] * 3,
+        'deposit_type': ['No Deposit'] * rows,
+        'agent': [0.0, 9.0, 240.0] * 2,
+        'company': [0.0] * rows,
+        'reservation_status': ['Check-Out', 'Canceled'] * 3,
+        'reservation_status_date': ['2015-07-01', '2015-07-02', '2015-07-03'] * 2,
+    })
+    for col in NUMERICAL_COLS:
+        df[col] = np.arange(rows, dtype=float)
+    return df
+
+def test_preprocessor_extracts_date_parts_from_raw_rows(bookings_df):
+    X, y = split_features_target(bookings_df)
+    assert list(X.columns) == INPUT_COLS
+    assert y.tolist() == [0, 1, 0, 1, 0, 1]
+
+    preprocessor = build_preprocessor().fit(X)
+    assert list(preprocessor.feature_names_in_) == INPUT_COLS
+    names = list(preprocessor.get_feature_names_out())
+    assert set(PASSTHROUGH_COLS) <= set(names)
+    assert preprocessor.transform(X)[:, names.index('reservation_day')].toarray().ravel().tolist() == [1, 2, 3] * 2
+    # The saved transformer only refers to code the API and the inference executor can import
+    assert b'utils.preprocessing' not in pickle.dumps(preprocessor)
+
+def test_split_features_target_rebuilds_the_date_of_processed_datasets(bookings_df):
+    dates = pd.to_datetime(bookings_df.pop('reservation_status_date'))
+    processed = bookings_df.assign(reservation_year=dates.dt.year, reservation_month=dates.dt.month,
+                                   reservation_day=dates.dt.day)
+    X, _ = split_features_target(processed)
+    assert list(X.columns) == INPUT_COLS
+    assert (X['reservation_status_date'] == dates).all()
+
+def test_preprocessor_keeps_fitted_layout_for_any_batch(bookings_df):
+    X, _ = split_features_target(bookings_df)
+    preprocessor = build_preprocessor().fit(X)
+    n_features = len(preprocessor.get_feature_names_out())
+
+    # A single booking with an unseen country is encoded into the same layout
+    single = X.iloc[[0]].copy()
+    single['country'] = 'FRA'
+    encoded = preprocessor.transform(single)
+    assert sp.isspmatrix_csr(encoded)
+    assert encoded.shape == (1, n_features)
+    # Stacking the blocks keeps the compact dtype instead of upcasting to float64
+    assert encoded.dtype == np.float32
+
+    names = list(preprocessor.get_feature_names_out())
+    assert encoded[0, names.index('hotel_Resort Hotel')] == 1
+    assert not any(encoded[0, i] for i, name in enumerate(names) if name.startswith('country_'))
+
+def test_preprocessor_reuses_training_statistics(bookings_df):
+    X, _ = split_features_target(bookings_df)
+    preprocessor = build_preprocessor().fit(X)
+    names = list(preprocessor.get_feature_names_out())
+
+    # Scaling a one-row batch uses the training mean/std instead of refitting
+    encoded = preprocessor.transform(X.iloc[[0]])
+    assert encoded[0, names.index('adults')] == pytest.approx((0 - 2.5) / np.std(np.arange(6)))
+
+def test_dense_and_sparse_layouts_give_the_same_predictions(bookings_df):
+    X, y = split_features_target(bookings_df)
+    sparse = build_preprocessor().fit(X)
+    dense = build_preprocessor(sparse=False).fit(X)
+    X_sparse, X_dense = sparse.transform(X), dense.transform(X)
+    assert sp.isspmatrix_csr(X_sparse) and isinstance(X_dense, np.ndarray)
+    np.testing.assert_array_equal(X_sparse.toarray(), X_dense)
+
+    forest = RandomForestClassifier(n_estimators=10, random_state=42)
+    np.testing.assert_array_equal(forest.fit(X_sparse, y).predict_proba(X_sparse),
+                                  forest.fit(X_dense, y).predict_proba(X_dense))
+
+def test_dense_layout_keeps_zeros_apart_from_missing_values(bookings_df):
+    # Same booking over and over, cancelled exactly when lead_time is 0 but not without a lead time
+    df = pd.concat([bookings_df.iloc[[0]]] * 60, ignore_index=True)
+    df['lead_time'] = [0.0, np.nan, 5.0] * 20
+    df['is_canceled'] = [1, 0, 0] * 20
+    X, y = split_features_target(df)
+    X_dense = build_preprocessor(sparse=False).fit_transform(X)
+
+    proba = XGBClassifier(n_estimators=20, max_depth=2).fit(X_dense, y).predict_proba(X_dense[:2])[:, 1]
+    assert proba[0] > 0.5 > proba[1]
+
+    # In CSR, lead_time=0 is not stored and XGBoost reads it like the missing lead time
+    X_sparse = sp.csr_matrix(X_dense)
+    proba = XGBClassifier(n_estimators=20, max_depth=2).fit(X_sparse, y).predict_proba(X_sparse[:2])[:, 1]
+    assert proba[0] == pytest.approx(proba[1])
@@ -0,0 +1,28 @@
+import numpy as np
+import scipy.sparse as sp
+from concurrent.futures import ProcessPoolExecutor
+from src.utils.shared_memory import SharedArrays, attach_arrays
+
+def sum_shared(specs):
+    blocks, arrays = attach_arrays(specs)
+    return float(arrays['X'].sum()), arrays['y'].tolist()
+
+def test_shared_arrays_round_trip_in_worker_process():
+    X = sp.random(50, 20, density=0.1, format='csr', random_state=0)
+    y = np.arange(50, dtype=np.int8)
+    shared = SharedArrays({'X': X, 'y': y})
+    try:
+        blocks, arrays = attach_arrays(shared.specs)
+        assert sp.isspmatrix_csr(arrays['X'])
+        assert (arrays['X'] != X).nnz == 0
+        assert arrays['y'].dtype == np.int8
+
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            total, labels = pool.submit(sum_shared, shared.specs).result()
+        assert total == X.sum()
+        assert labels == y.tolist()
+        del arrays
+        for block in blocks:
+            block.close()
+    finally:
+        shared.close()
@@ -0,0 +1,4 @@
+"""
+Database helpers shared by data_engineering and the inference executor. The
+repository root must be on PYTHONPATH to import this package.
+"""
@@ -0,0 +1,45 @@
+import os
+import threading
+from sqlalchemy import create_engine
+
+def get_pool_options():
+    """
+    Connection pool of each engine, from the DB_POOL_* environment variables.
+    Read when an engine is created, after the components loaded their .env file.
+    """
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', '5')),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', '10')),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', '3600')),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+
+
+# Process-wide engines, one per database URL and connection options
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(db_url, connect_args=None):
+    """
+    Return the pooled engine for a database, creating it on first use.
+
+    Reusing one engine per process keeps connections (and the MySQL auth
+    handshake) alive between calls. Pool size, pre-ping and recycle come from
+    the DB_POOL_* environment variables. connect_args are passed to the DBAPI
+    driver, and engines with different ones are kept apart.
+    """
+    connect_args = connect_args or {}
+    key = (db_url, tuple(sorted(connect_args.items())))
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = create_engine(db_url, connect_args=connect_args, **get_pool_options())
+        return _engines[key]
+
+
+def dispose_engines():
+    """Close the connections of every engine, e.g. before forking or in tests."""
+    with _engines_lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
@@ -12,6 +12,46 @@ class Config:
     AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY')
     AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
     S3_BUCKET = os.getenv('S3_BUCKET')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL') or None
+    # Objects above this size are downloaded as concurrent ranged GETs
+    S3_MULTIPART_CHUNKSIZE_MB = int(os.getenv('S3_MULTIPART_CHUNKSIZE_MB', '8'))
+    S3_MAX_CONCURRENCY = int(os.getenv('S3_MAX_CONCURRENCY', '10'))
+
+    # Downloaded models, named after their ETag; mount it as a volume to reuse them across container starts.
+    # Empty to stream models from S3 straight into the loader
+    MODEL_CACHE_DIR = os.getenv('MODEL_CACHE_DIR', 'model_cache')
+
+    # Directory used as storage when ENV is local
+    LOCAL_STORAGE_DIR = os.getenv('LOCAL_STORAGE_DIR', 'storage')
+
+    # Model resolved from the registry saved next to it (data_science/src/utils/models.register_version):
+    # MODEL_REF is a version or an alias such as "latest" or "champion"
+    MODEL_NAME = os.getenv('MODEL_NAME', '')
+    MODEL_REF = os.getenv('MODEL_REF', 'latest')
+
+    # Candidate version or alias of MODEL_NAME scored alongside the model in the same pass (empty to disable):
+    # only the model's predictions are written back; the candidate's go to SHADOW_PREDICTIONS_TABLE
+    SHADOW_MODEL_REF = os.getenv('SHADOW_MODEL_REF', '')
+    SHADOW_PREDICTIONS_TABLE = os.getenv('SHADOW_PREDICTIONS_TABLE', 'shadow_predictions')
+
+    # Storage keys of the model and of the feature transformer fitted with it, used without MODEL_NAME
+    MODEL_KEY = os.getenv('MODEL_KEY', 'model/model_file.pkl')
+    PREPROCESSOR_KEY = os.getenv('PREPROCESSOR_KEY', 'model/model_file_preprocessor.pkl')
 
     # SQLAlchemy Database URL
     SQLALCHEMY_DATABASE_URI = os.getenv('SQLALCHEMY_DATABASE_URI')
+
+    # Batch inference: rows fetched and scored per chunk, scoring processes and results file (empty to skip the CSV)
+    INFERENCE_CHUNKSIZE = int(os.getenv('INFERENCE_CHUNKSIZE', '10000'))
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', str(os.cpu_count() or 1)))
+    INFERENCE_OUTPUT_FILE = os.getenv('INFERENCE_OUTPUT_FILE', 'inference_results.csv')
+
+    # Write-back of the predictions: key of the reservations table and, once that column has been
+    # added to it, column for the cancellation probability (empty to only write possible_cancellation)
+    RESERVATIONS_ID_COLUMN = os.getenv('RESERVATIONS_ID_COLUMN', 'id')
+    PROBABILITY_COLUMN = os.getenv('PROBABILITY_COLUMN', '')
+
+    # Resident worker (worker.py): job endpoint and seconds between checks for a new model version
+    WORKER_HOST = os.getenv('WORKER_HOST', '127.0.0.1')
+    WORKER_PORT = int(os.getenv('WORKER_PORT', '8080'))
+    MODEL_POLL_INTERVAL = int(os.getenv('MODEL_POLL_INTERVAL', '60'))
@@ -3,5 +3,8 @@
 # Print the current Python version for verification
 python --version
 
-# Run the inference script
+# Run the inference script once, or the resident worker (INFERENCE_MODE=worker)
+if [ "$INFERENCE_MODE" = "worker" ]; then
+    exec python /app/worker.py
+fi
 python /app/inference.py
@@ -1,61 +1,342 @@
 import os
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
 import pandas as pd
 import joblib
-from sqlalchemy import create_engine
-from integrations.s3_client import S3Client
+from sqlalchemy import text
+from model_artifacts.loading import load_model_file
+from model_artifacts.registry import REGISTRY_FILE, read_registry, resolve_version
+from database.engines import get_engine
+from object_storage.local_storage import LocalStorage
 from config import Config
 
 # Load environment variables
 config = Config()
 
-def load_model():
-    """Load model from either local filesystem or AWS S3."""
+def get_storage():
+    """Return the storage holding the models: a local directory, or AWS S3 outside local environments."""
     if config.ENV == 'local':
-        print("Loading model from local storage...")
-        model_path = '/path/to/local/model/file.pkl'  # Update this path
+        return LocalStorage(config.LOCAL_STORAGE_DIR)
+    # boto3 is only imported outside local environments
+    from object_storage.s3_client import S3Client
+    return S3Client(
+        aws_access_key_id=config.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
+        region=config.AWS_REGION,
+        bucket=config.S3_BUCKET,
+        # Without a cache directory, models are streamed straight into the loader
+        cache_dir=config.MODEL_CACHE_DIR or None,
+        multipart_chunksize=config.S3_MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+        max_concurrency=config.S3_MAX_CONCURRENCY,
+        endpoint_url=config.S3_ENDPOINT_URL,
+    )
+
+def resolve_model_keys(storage, ref=None):
+    """
+    Return the storage keys of the model and of its feature transformer.
+
+    With MODEL_NAME, ref (a version or an alias such as "champion",
+    MODEL_REF by default) is resolved through the registry saved next to
+    the model versions; otherwise MODEL_KEY and PREPROCESSOR_KEY are used
+    as they are.
+    """
+    ref = ref or config.MODEL_REF
+    if not config.MODEL_NAME:
+        return config.MODEL_KEY, config.PREPROCESSOR_KEY
+    with storage.open(f"{config.MODEL_NAME}/{REGISTRY_FILE}") as stream:
+        registry = read_registry(stream)
+    version = resolve_version(registry, config.MODEL_NAME, ref, registered_only=True)
+    files = registry['versions'][version]
+    print(f"Resolved {config.MODEL_NAME} '{ref}' to version {version}")
+    return f"{config.MODEL_NAME}/{files['model']}", f"{config.MODEL_NAME}/{files['preprocessor']}"
+
+def resolve_shadow_keys(storage):
+    """Return the storage keys of the SHADOW_MODEL_REF version, or None when shadow scoring is off."""
+    if not config.SHADOW_MODEL_REF:
+        return None
+    if not config.MODEL_NAME:
+        raise ValueError("SHADOW_MODEL_REF needs MODEL_NAME to resolve the candidate version")
+    return resolve_model_keys(storage, config.SHADOW_MODEL_REF)
+
+def load_from_storage(storage, key):
+    """
+    Load a model artifact from a local file when the storage has one (local
+    directory or model cache) so it can be memory-mapped, or stream it
+    straight into the loader otherwise.
+    """
+    local_path = storage.get_local_path(key)
+    if local_path is not None:
+        print(f"Loading {key} from {local_path}...")
+        return load_model_file(local_path)
+    print(f"Streaming {key} from storage...")
+    with storage.open(key) as stream:
+        return load_model_file(key, stream=stream)
+
+# Model and feature transformer of the current scoring process (see init_scorer)
+_scorer = {}
+
+def init_scorer(model_key, preprocessor_key, shadow_keys=None):
+    """Load the model (and the shadow model) once per scoring process instead of once per chunk."""
+    storage = get_storage()
+    _scorer['model'] = load_from_storage(storage, model_key)
+    _scorer['preprocessor'] = load_from_storage(storage, preprocessor_key)
+    _scorer['shadow'] = None
+    if shadow_keys is not None:
+        _scorer['shadow'] = tuple(load_from_storage(storage, key) for key in shadow_keys)
+
+def init_scorer_from_files(model_path, preprocessor_path, shadow_paths=None):
+    """Load a model version already resolved to local files (see worker.ResidentModel)."""
+    _scorer['model'] = load_model_file(model_path)
+    _scorer['preprocessor'] = joblib.load(preprocessor_path)
+    _scorer['shadow'] = None
+    if shadow_paths is not None:
+        _scorer['shadow'] = (load_model_file(shadow_paths[0]), joblib.load(shadow_paths[1]))
+
+def predict_cancellation(model, preprocessor, df):
+    """Return the predicted class and the cancellation probability of each reservation."""
+    # Encode the reservations with the categories and scaling learned at training time
+    X = preprocessor.transform(df[preprocessor.feature_names_in_])
+    proba = model.predict_proba(X)
+    return model.classes_.take(np.argmax(proba, axis=1)), proba[:, 1]
+
+# Columns added to a scored chunk by the shadow model
+SHADOW_COLUMNS = ['shadow_predicted_cancellation', 'shadow_cancellation_probability']
+
+def score_with(model, preprocessor, df, shadow=None):
+    """
+    Predict the cancellation of a chunk of reservations.
+
+    With a shadow (model, preprocessor) pair, the same chunk is also scored
+    by the candidate model into the SHADOW_COLUMNS, and the scoring time of
+    both models is kept in df.attrs. A failing shadow model only loses its
+    own predictions.
+    """
+    started = time.perf_counter()
+    df['predicted_cancellation'], df['cancellation_probability'] = predict_cancellation(model, preprocessor, df)
+    if shadow is None:
+        return df
+
+    scored = time.perf_counter()
+    try:
+        df[SHADOW_COLUMNS[0]], df[SHADOW_COLUMNS[1]] = predict_cancellation(*shadow, df)
+    except Exception as e:
+        print(f"Error scoring with the shadow model: {e}")
+        return df
+    df.attrs['scoring_ms'] = (scored - started) * 1000
+    df.attrs['shadow_scoring_ms'] = (time.perf_counter() - scored) * 1000
+    return df
+
+def score_chunk(df):
+    """Predict a chunk with the model (and shadow model) of the current scoring process."""
+    return score_with(_scorer['model'], _scorer['preprocessor'], df, _scorer.get('shadow'))
+
+def iter_pending_reservations(engine, chunksize):
+    """
+    Yield the reservations without a prediction in chunks of chunksize rows.
+
+    The query runs on a server-side cursor, so only one chunk is held in
+    memory however large the backlog is.
+    """
+    query = "SELECT * FROM reservations WHERE possible_cancellation IS NULL"
+    with engine.connect() as connection:
+        connection = connection.execution_options(stream_results=True, max_row_buffer=chunksize)
+        for chunk in pd.read_sql(query, connection, chunksize=chunksize):
+            # An empty result still comes as one empty chunk
+            if not chunk.empty:
+                yield chunk
+
+def get_local_paths(storage, keys, download_dir):
+    """
+    Return a local file for each key: the storage's own (local directory or
+    model cache) or, for objects that can only be streamed, a copy
+    downloaded into download_dir.
+    """
+    paths = []
+    for index, key in enumerate(keys):
+        local_path = storage.get_local_path(key)
+        if local_path is None:
+            # Prefixed with the position of the key, since two versions may share a file name
+            local_path = storage.download_model(key, os.path.join(download_dir, f"{index}_{os.path.basename(key)}"))
+        paths.append(local_path)
+    return paths
+
+def iter_scored_chunks(chunks, model_key, preprocessor_key, workers, shadow_keys=None):
+    """
+    Score chunks across a pool of processes, yielding them in input order.
+
+    At most two chunks per worker are in flight, so memory stays bounded
+    while the database keeps feeding the pool. A single scoring process
+    loads the models straight from storage; a pool loads them from local
+    files fetched once for all its processes.
+    """
+    if workers <= 1:
+        init_scorer(model_key, preprocessor_key, shadow_keys)
+        for chunk in chunks:
+            yield score_chunk(chunk)
+        return
+
+    with tempfile.TemporaryDirectory() as download_dir:
+        paths = get_local_paths(get_storage(), (model_key, preprocessor_key) + (shadow_keys or ()), download_dir)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_scorer_from_files,
+                                 initargs=(paths[0], paths[1], paths[2:] or None)) as executor:
+            yield from iter_submitted_in_order(executor, score_chunk, chunks, 2 * workers)
+
+def iter_submitted_in_order(executor, fn, items, max_pending):
+    """Yield fn(item) for each item, computed on executor with at most max_pending items in flight."""
+    pending = deque()
+    for item in items:
+        pending.append(executor.submit(fn, item))
+        if len(pending) >= max_pending:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# Per-connection table holding the predictions of one chunk until they are joined into reservations
+PREDICTIONS_TABLE = 'tmp_reservation_predictions'
+
+def get_prediction_columns():
+    """Map the reservations columns written back to the scored columns they come from."""
+    columns = {'possible_cancellation': 'predicted_cancellation'}
+    if config.PROBABILITY_COLUMN:
+        columns[config.PROBABILITY_COLUMN] = 'cancellation_probability'
+    return columns
+
+def create_predictions_table(connection):
+    id_column = config.RESERVATIONS_ID_COLUMN
+    columns = ", ".join(f"{column} FLOAT" for column in get_prediction_columns())
+    with connection.begin():
+        connection.execute(text(f"CREATE TEMPORARY TABLE IF NOT EXISTS {PREDICTIONS_TABLE} ({id_column} BIGINT PRIMARY KEY, {columns})"))
+
+def create_shadow_predictions_table(connection):
+    id_column = config.RESERVATIONS_ID_COLUMN
+    with connection.begin():
+        connection.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {config.SHADOW_PREDICTIONS_TABLE} ({id_column} BIGINT, "
+            "model VARCHAR(255), shadow_model VARCHAR(255), predicted_cancellation FLOAT, "
+            "cancellation_probability FLOAT, shadow_predicted_cancellation FLOAT, "
+            "shadow_cancellation_probability FLOAT, scoring_ms FLOAT, shadow_scoring_ms FLOAT, scored_at TIMESTAMP)"
+        ))
+
+def insert_shadow_predictions(connection, df, models):
+    """
+    Record the predictions of the model and of the shadow model for a
+    scored chunk, with the time each took to score it. models holds the
+    keys of both models.
+    """
+    records = pd.DataFrame({
+        config.RESERVATIONS_ID_COLUMN: df[config.RESERVATIONS_ID_COLUMN],
+        'model': models[0],
+        'shadow_model': models[1],
+    })
+    for column in ['predicted_cancellation', 'cancellation_probability'] + SHADOW_COLUMNS:
+        records[column] = df[column].astype(float)
+    records['scoring_ms'] = df.attrs['scoring_ms']
+    records['shadow_scoring_ms'] = df.attrs['shadow_scoring_ms']
+    placeholders = ", ".join(f":{column}" for column in records.columns)
+    connection.execute(
+        text(f"INSERT INTO {config.SHADOW_PREDICTIONS_TABLE} ({', '.join(records.columns)}, scored_at) "
+             f"VALUES ({placeholders}, CURRENT_TIMESTAMP)"),
+        records.to_dict('records'),
+    )
+
+    agreement = (records['predicted_cancellation'] == records['shadow_predicted_cancellation']).mean()
+    print(f"Shadow model {models[1]} scored {len(records)} rows in {df.attrs['shadow_scoring_ms']:.1f} ms "
+          f"({df.attrs['scoring_ms']:.1f} ms for {models[0]}), agreeing on {agreement:.1%}")
+
+def write_predictions(connection, df, shadow_models=None):
+    """
+    Write the predictions of a scored chunk back to the reservations table.
+
+    The chunk is bulk inserted into the temporary predictions table and
+    joined into reservations with a single UPDATE, in one transaction, so a
+    chunk is either fully written or picked up again by the next run. The
+    shadow predictions of the chunk, if any, are recorded in the same
+    transaction. Returns the number of reservations updated.
+    """
+    id_column = config.RESERVATIONS_ID_COLUMN
+    columns = get_prediction_columns()
+    records = pd.DataFrame({id_column: df[id_column]})
+    for column, source in columns.items():
+        records[column] = df[source].astype(float)
+
+    if connection.dialect.name == 'mysql':
+        assignments = ", ".join(f"r.{column} = p.{column}" for column in columns)
+        update = (f"UPDATE reservations r JOIN {PREDICTIONS_TABLE} p ON r.{id_column} = p.{id_column} "
+                  f"SET {assignments}")
     else:
-        print("Loading model from S3...")
-        s3_client = S3Client(
-            aws_access_key_id=config.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=config.AWS_SECRET_ACCESS_KEY,
-            region=config.AWS_REGION,
-            bucket=config.S3_BUCKET
+        assignments = ", ".join(f"{column} = p.{column}" for column in columns)
+        update = (f"UPDATE reservations SET {assignments} FROM {PREDICTIONS_TABLE} p "
+                  f"WHERE reservations.{id_column} = p.{id_column}")
+    placeholders = ", ".join(f":{column}" for column in records.columns)
+
+    with connection.begin():
+        connection.execute(text(f"DELETE FROM {PREDICTIONS_TABLE}"))
+        connection.execute(
+            text(f"INSERT INTO {PREDICTIONS_TABLE} ({', '.join(records.columns)}) VALUES ({placeholders})"),
+            records.to_dict('records'),
         )
-        s3_client.download_model('model/model_file.pkl', 'local_model_file.pkl')
-        model_path = 'local_model_file.pkl'
+        updated = connection.execute(text(update)).rowcount
+        if shadow_models is not None and SHADOW_COLUMNS[0] in df:
+            insert_shadow_predictions(connection, df, shadow_models)
+        return updated
 
-    # Load the model from model_path
-    print(f"Loading model from {model_path}...")
-    model = joblib.load(model_path)
-    return model
+def run_inference(chunksize=None, workers=None, output_file=None):
+    chunksize = chunksize or config.INFERENCE_CHUNKSIZE
+    workers = workers or config.INFERENCE_WORKERS
+    output_file = output_file or config.INFERENCE_OUTPUT_FILE
 
-def run_inference():
-    # Load the model
-    model = load_model()
+    storage = get_storage()
+    model_key, preprocessor_key = resolve_model_keys(storage)
+    shadow_keys = resolve_shadow_keys(storage)
 
-    # Connect to the database
+    # Connect to the database; the connection goes back to the pool afterwards
     print("Connecting to database...")
-    engine = create_engine(config.SQLALCHEMY_DATABASE_URI)
-    connection = engine.connect()
+    engine = get_engine(config.SQLALCHEMY_DATABASE_URI)
 
-    # Query records where possible_cancellation is NULL
-    query = "SELECT * FROM reservations WHERE possible_cancellation IS NULL"
-    df = pd.read_sql(query, connection)
-    connection.close()
+    print(f"Running inference in chunks of {chunksize} rows with {workers} worker(s)...")
+    chunks = iter_pending_reservations(engine, chunksize)
+    scored_chunks = iter_scored_chunks(chunks, model_key, preprocessor_key, workers, shadow_keys)
+    shadow_models = (model_key, shadow_keys[0]) if shadow_keys is not None else None
+    save_scored_chunks(engine, scored_chunks, output_file, shadow_models)
 
-    # Prepare data for inference (assuming you need to preprocess it)
-    # Replace 'features' with actual feature columns used in the model
-    features = ['feature1', 'feature2']  # Update with actual feature columns
-    X = df[features]
+def save_scored_chunks(engine, scored_chunks, output_file, shadow_models=None):
+    """
+    Write each scored chunk back and append it to the results as soon as it
+    is ready; a run without pending reservations removes the results of the
+    previous one. Returns the number of rows scored and of reservations updated.
+    With shadow_models (the keys of the model and of the shadow model), the
+    shadow predictions are recorded in SHADOW_PREDICTIONS_TABLE; the results
+    only hold the model's.
 
-    # Run inference
-    print("Running inference...")
-    df['predicted_cancellation'] = model.predict(X)
+    The pending reservations are read on their own connection, whose
+    snapshot is not affected by the updates.
+    """
+    rows = 0
+    updated = 0
+    with engine.connect() as connection:
+        create_predictions_table(connection)
+        if shadow_models is not None:
+            create_shadow_predictions_table(connection)
+        for df in scored_chunks:
+            updated += write_predictions(connection, df, shadow_models)
+            if output_file:
+                results = df.drop(columns=SHADOW_COLUMNS, errors='ignore')
+                results.to_csv(output_file, mode='w' if rows == 0 else 'a', header=rows == 0, index=False)
+            rows += len(df)
 
-    # Export results to CSV
-    output_file = 'inference_results.csv'
-    df.to_csv(output_file, index=False)
-    print(f"Results exported to {output_file}")
+    if rows == 0:
+        print("No reservations pending inference")
+        # The results file only ever holds the last run's predictions
+        if output_file and os.path.exists(output_file):
+            os.remove(output_file)
+    else:
+        print(f"{updated} reservations updated with their predictions")
+        if output_file:
+            print(f"{rows} results exported to {output_file}")
+    return rows, updated
 
 if __name__ == "__main__":
-    run_inference()
\ No newline at end of file
+    run_inference()
@@ -0,0 +1,112 @@
+import os
+import joblib
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import create_engine, text
+
+from object_storage.local_storage import LocalStorage
+from testing.import_times import get_import_times
+from inference import (SHADOW_COLUMNS, create_predictions_table, create_shadow_predictions_table, iter_scored_chunks,
+                       save_scored_chunks, write_predictions)
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_inference_defers_heavy_dependencies():
+    # boto3 and the model libraries are imported on first use
+    times = get_import_times('import inference', ROOT_DIR, env={'ENV': 'local'})
+    assert not {'boto3', 'xgboost', 'sklearn'} & set(times)
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'reservations.db'}")
+    pd.DataFrame({'id': [1, 2, 3], 'possible_cancellation': [float('nan')] * 3}).to_sql('reservations', engine, index=False)
+    return engine
+
+def make_scored_chunk(ids, predictions, probabilities):
+    return pd.DataFrame({'id': ids, 'predicted_cancellation': predictions, 'cancellation_probability': probabilities})
+
+def read_reservations(engine):
+    return pd.read_sql('SELECT * FROM reservations ORDER BY id', engine)
+
+def test_write_predictions_only_updates_the_scored_reservations(engine):
+    with engine.connect() as connection:
+        create_predictions_table(connection)
+        assert write_predictions(connection, make_scored_chunk([1, 3], [1, 0], [0.9, 0.2])) == 2
+        # The predictions table is emptied before every chunk
+        assert write_predictions(connection, make_scored_chunk([2], [1], [0.6])) == 1
+
+    assert read_reservations(engine)['possible_cancellation'].tolist() == [1.0, 1.0, 0.0]
+
+def test_write_predictions_writes_the_probability_when_configured(engine, monkeypatch):
+    monkeypatch.setattr('inference.config.PROBABILITY_COLUMN', 'cancellation_probability')
+    with engine.begin() as connection:
+        connection.execute(text('ALTER TABLE reservations ADD COLUMN cancellation_probability FLOAT'))
+    with engine.connect() as connection:
+        create_predictions_table(connection)
+        write_predictions(connection, make_scored_chunk([1, 3], [1, 0], [0.9, 0.2]))
+
+    scored = read_reservations(engine)
+    assert scored['cancellation_probability'].tolist()[::2] == [0.9, 0.2]
+    assert scored['cancellation_probability'].isna().tolist() == [False, True, False]
+
+def test_write_predictions_records_shadow_predictions_in_the_same_transaction(engine):
+    df = make_scored_chunk([1, 2], [1, 0], [0.9, 0.2])
+    df[SHADOW_COLUMNS[0]], df[SHADOW_COLUMNS[1]] = [1, 1], [0.8, 0.7]
+    df.attrs.update(scoring_ms=1.5, shadow_scoring_ms=2.5)
+    with engine.connect() as connection:
+        create_predictions_table(connection)
+        # Without the shadow table the chunk fails as a whole and is picked up by the next run
+        with pytest.raises(Exception):
+            write_predictions(connection, df, ('model_v1', 'model_v2'))
+        assert read_reservations(engine)['possible_cancellation'].isna().all()
+
+        create_shadow_predictions_table(connection)
+        assert write_predictions(connection, df, ('model_v1', 'model_v2')) == 2
+
+    shadow = pd.read_sql('SELECT * FROM shadow_predictions ORDER BY id', engine)
+    assert shadow['shadow_model'].tolist() == ['model_v2', 'model_v2']
+    assert shadow['shadow_cancellation_probability'].tolist() == [0.8, 0.7]
+    assert shadow['shadow_scoring_ms'].tolist() == [2.5, 2.5]
+
+def test_empty_run_removes_the_previous_results(engine, tmp_path):
+    output_file = tmp_path / 'inference_results.csv'
+    chunks = [make_scored_chunk([1], [1], [0.9]), make_scored_chunk([2, 3], [0, 0], [0.1, 0.2])]
+    assert save_scored_chunks(engine, iter(chunks), str(output_file)) == (3, 3)
+    assert pd.read_csv(output_file)['id'].tolist() == [1, 2, 3]
+
+    assert save_scored_chunks(engine, iter([]), str(output_file)) == (0, 0)
+    assert not output_file.exists()
+
+class StreamOnlyStorage(LocalStorage):
+    """A directory served like a remote storage without a model cache, logging every object read."""
+
+    def __init__(self, root_dir, log_file):
+        super().__init__(root_dir)
+        self.log_file = log_file
+
+    def get_local_path(self, key):
+        return None
+
+    def open(self, key):
+        with open(self.log_file, 'a') as file:
+            file.write(f"{key}\n")
+        return super().open(key)
+
+def test_scoring_pool_fetches_the_model_once(tmp_path, monkeypatch):
+    X = pd.DataFrame({'lead_time': [0, 100, 200, 300], 'adr': [50.0, 80.0, 110.0, 140.0]})
+    preprocessor = StandardScaler().fit(X)
+    (tmp_path / 'storage' / 'model').mkdir(parents=True)
+    joblib.dump(LogisticRegression().fit(preprocessor.transform(X), [0, 0, 1, 1]),
+                tmp_path / 'storage' / 'model' / 'model_file.pkl')
+    joblib.dump(preprocessor, tmp_path / 'storage' / 'model' / 'model_file_preprocessor.pkl')
+    log_file = tmp_path / 'reads.log'
+    monkeypatch.setattr('inference.get_storage', lambda: StreamOnlyStorage(str(tmp_path / 'storage'), str(log_file)))
+
+    chunks = (X.iloc[[i]].copy() for i in range(4))
+    scored = list(iter_scored_chunks(chunks, 'model/model_file.pkl', 'model/model_file_preprocessor.pkl', workers=2))
+
+    assert [df['predicted_cancellation'].item() for df in scored] == [0, 0, 1, 1]
+    # Downloaded once by the parent rather than streamed by each scoring process
+    assert log_file.read_text().splitlines() == ['model/model_file.pkl', 'model/model_file_preprocessor.pkl']
@@ -0,0 +1,29 @@
+import io
+import pandas as pd
+import pytest
+
+from object_storage.local_storage import LocalStorage
+
+def test_local_storage_round_trip(tmp_path):
+    storage = LocalStorage(str(tmp_path))
+    storage.put('data/processed/bookings.csv', io.BytesIO(b'hotel,adr\nCity Hotel,75.5\nResort Hotel,98.0\n'))
+    storage.put('model/model_file.pkl', io.BytesIO(b'model'))
+
+    assert list(storage.list()) == ['data/processed/bookings.csv', 'model/model_file.pkl']
+    assert list(storage.list('model/')) == ['model/model_file.pkl']
+    assert list(storage.list('data/processed/book')) == ['data/processed/bookings.csv']
+    assert list(storage.list('missing/')) == []
+    assert storage.stat('model/model_file.pkl')['size'] == 5
+    # Local files are loaded in place, without a copy
+    assert storage.get_local_path('model/model_file.pkl') == str(tmp_path / 'model' / 'model_file.pkl')
+    with storage.open('model/model_file.pkl') as stream:
+        assert stream.read() == b'model'
+
+    chunks = list(storage.read_csv('data/processed/bookings.csv', chunksize=1))
+    assert [len(chunk) for chunk in chunks] == [1, 1]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), storage.read_csv('data/processed/bookings.csv'))
+
+def test_local_storage_rejects_keys_outside_root(tmp_path):
+    storage = LocalStorage(str(tmp_path / 'storage'))
+    with pytest.raises(ValueError):
+        storage.open('../secrets.txt')
@@ -0,0 +1,127 @@
+import io
+import os
+import boto3
+import joblib
+import numpy as np
+import pytest
+from boto3.s3.transfer import TransferConfig
+from moto import mock_aws
+
+from object_storage.s3_client import MB, S3Client
+from inference import load_from_storage
+
+BUCKET = 'models'
+KEY = 'model/model_file.pkl'
+
+@pytest.fixture
+def s3():
+    with mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+def make_client(cache_dir, **kwargs):
+    return S3Client('testing', 'testing', 'us-east-1', BUCKET, cache_dir=str(cache_dir), **kwargs)
+
+def test_download_model_uses_cache_until_etag_changes(s3, tmp_path, mocker):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v1')
+    client = make_client(tmp_path / 'cache')
+    download_file = mocker.spy(client.s3, 'download_file')
+
+    first_path = client.download_model(KEY)
+    second_path = client.download_model(KEY)
+    assert first_path == second_path
+    assert first_path.endswith('.pkl')
+    assert download_file.call_count == 1
+
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v2')
+    local_path = str(tmp_path / 'local_model_file.pkl')
+    assert client.download_model(KEY, local_path) == local_path
+    assert download_file.call_count == 2
+    with open(local_path, 'rb') as file:
+        assert file.read() == b'model v2'
+    # Only complete, verified files end up in the cache
+    cached = {os.path.basename(first_path), os.path.basename(client.get_cache_path(KEY, client.stat(KEY)))}
+    assert set(os.listdir(tmp_path / 'cache')) == cached
+
+def test_download_model_multipart(s3, tmp_path):
+    body = os.urandom(12 * MB)
+    transfer = TransferConfig(multipart_threshold=5 * MB, multipart_chunksize=5 * MB)
+    s3.upload_fileobj(io.BytesIO(body), BUCKET, KEY, Config=transfer)
+    client = make_client(tmp_path / 'cache', multipart_chunksize=5 * MB, max_concurrency=4)
+
+    assert '-' in client.stat(KEY)['etag']
+    with open(client.download_model(KEY), 'rb') as file:
+        assert file.read() == body
+
+def test_download_model_rejects_corrupt_download(s3, tmp_path, mocker):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v1')
+    client = make_client(tmp_path / 'cache')
+
+    def corrupt_download(bucket, key, path, **kwargs):
+        with open(path, 'wb') as file:
+            file.write(b'model v0')
+    mocker.patch.object(client.s3, 'download_file', side_effect=corrupt_download)
+
+    with pytest.raises(IOError, match='Checksum mismatch'):
+        client.download_model(KEY)
+    assert os.listdir(tmp_path / 'cache') == []
+
+def test_kms_encrypted_objects_are_not_checked_against_their_etag(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v1', ServerSideEncryption='aws:kms')
+    client = make_client(tmp_path / 'cache')
+    info = client.stat(KEY)
+    assert not info['etag_is_md5']
+
+    # S3 does not give SSE-KMS objects the MD5 of their content as ETag
+    path = client.download_model(KEY)
+    client.verify_file(path, {**info, 'etag': '"0123456789abcdef0123456789abcdef"'})
+
+@pytest.mark.parametrize('algorithm', ['SHA256', 'CRC32'])
+def test_download_model_verifies_additional_checksums(s3, tmp_path, mocker, algorithm):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v1', ServerSideEncryption='aws:kms',
+                  ChecksumAlgorithm=algorithm)
+    client = S3Client('testing', 'testing', 'us-east-1', BUCKET)
+    assert client.stat(KEY)['checksum'][0] == algorithm
+    with open(client.download_model(KEY, str(tmp_path / 'model.pkl')), 'rb') as file:
+        assert file.read() == b'model v1'
+
+    def corrupt_download(bucket, key, path, **kwargs):
+        with open(path, 'wb') as file:
+            file.write(b'model v0')
+    mocker.patch.object(client.s3, 'download_file', side_effect=corrupt_download)
+    with pytest.raises(IOError, match='Checksum mismatch'):
+        client.download_model(KEY, str(tmp_path / 'model.pkl'))
+
+def test_download_model_is_pinned_to_the_version_read(s3, tmp_path):
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v1')
+    client = make_client(tmp_path / 'cache')
+    info = client.stat(KEY)
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v2')
+
+    # Without versioning, the overwritten object can no longer be downloaded as the version that was read
+    with pytest.raises(IOError):
+        client.download_model(KEY, info=info)
+    assert os.listdir(tmp_path / 'cache') == []
+
+    s3.put_bucket_versioning(Bucket=BUCKET, VersioningConfiguration={'Status': 'Enabled'})
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v3')
+    info = client.stat(KEY)
+    s3.put_object(Bucket=BUCKET, Key=KEY, Body=b'model v4')
+    with open(client.get_local_path(KEY, info), 'rb') as file:
+        assert file.read() == b'model v3'
+
+def test_stream_put_list_and_load_without_cache(s3):
+    buffer = io.BytesIO()
+    joblib.dump({'weights': np.arange(5)}, buffer)
+    buffer.seek(0)
+    client = S3Client('testing', 'testing', 'us-east-1', BUCKET)
+    client.put(KEY, buffer)
+    client.put('data/raw/hotel_bookings.csv', io.BytesIO(b'hotel,adr\nCity Hotel,75.5\nResort Hotel,98.0\n'))
+
+    assert list(client.list('model/')) == [KEY]
+    assert client.get_local_path(KEY) is None
+    # Without a cache directory the model is streamed straight into the loader
+    model = load_from_storage(client, KEY)
+    np.testing.assert_array_equal(model['weights'], np.arange(5))
+    assert [len(chunk) for chunk in client.read_csv('data/raw/hotel_bookings.csv', chunksize=1)] == [1, 1]
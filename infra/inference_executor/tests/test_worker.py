@@ -0,0 +1,169 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LogisticRegression
+from sklearn.preprocessing import StandardScaler
+from sqlalchemy import create_engine
+
+from object_storage.local_storage import LocalStorage
+from worker import InferenceWorker, make_handler
+
+FEATURES = ['lead_time', 'adr']
+
+def save_model_version(storage_dir, coef):
+    X = pd.DataFrame({'lead_time': [0, 100, 200, 300], 'adr': [50.0, 80.0, 110.0, 140.0]})
+    preprocessor = StandardScaler().fit(X)
+    model = LogisticRegression().fit(preprocessor.transform(X), [0, 0, 1, 1])
+    model.coef_ = np.array([[coef, 0.0]])
+    (storage_dir / 'model').mkdir(parents=True, exist_ok=True)
+    joblib.dump(model, storage_dir / 'model' / 'model_file.pkl')
+    joblib.dump(preprocessor, storage_dir / 'model' / 'model_file_preprocessor.pkl')
+
+def add_pending_reservations(engine, ids):
+    df = pd.DataFrame({'id': ids, 'lead_time': [10, 250][:len(ids)], 'adr': [60.0, 130.0][:len(ids)]})
+    df['possible_cancellation'] = np.nan
+    df['cancellation_probability'] = np.nan
+    df.to_sql('reservations', engine, index=False, if_exists='append')
+
+@pytest.fixture
+def worker(tmp_path, monkeypatch):
+    db_url = f"sqlite:///{tmp_path / 'reservations.db'}"
+    monkeypatch.setattr('worker.config.SQLALCHEMY_DATABASE_URI', db_url)
+    save_model_version(tmp_path / 'storage', coef=5.0)
+    engine = create_engine(db_url)
+    # Lets sqlite write predictions while the pending reservations are being read, as MySQL does
+    with engine.connect() as connection:
+        connection.exec_driver_sql('PRAGMA journal_mode=WAL')
+    worker = InferenceWorker(LocalStorage(str(tmp_path / 'storage')), workers=1, chunksize=1, output_file='')
+    yield worker, engine
+    worker.close()
+
+def run_next_job(worker):
+    job_id, chunksize = worker.jobs.get_nowait()
+    worker.run_job(job_id, chunksize)
+    return worker.get_status(job_id)
+
+def test_worker_reloads_new_model_versions_between_jobs(worker, tmp_path):
+    worker, engine = worker
+    add_pending_reservations(engine, [1, 2])
+    assert worker.check_for_new_version()
+    assert not worker.check_for_new_version()
+
+    worker.submit()
+    status = run_next_job(worker)
+    assert status['status'] == 'done'
+    assert status['rows'] == status['updated'] == 2
+    first_version = status['model_version']
+
+    # A new version is picked up by the next job; scored reservations are not scored again
+    save_model_version(tmp_path / 'storage', coef=-5.0)
+    assert worker.check_for_new_version()
+    add_pending_reservations(engine, [3])
+    worker.submit()
+    status = run_next_job(worker)
+    assert status['rows'] == 1
+    assert status['model_version'] != first_version
+
+    scored = pd.read_sql('SELECT * FROM reservations ORDER BY id', engine)
+    assert scored['possible_cancellation'].notnull().all()
+    # Same features, opposite coefficients: the two versions disagree on the first booking
+    assert scored['possible_cancellation'].tolist()[::2] == [0.0, 1.0]
+
+def test_worker_only_loads_the_files_of_the_version_it_read(worker, tmp_path):
+    worker, engine = worker
+    version, infos = worker.get_snapshot()
+    # A new model uploaded between reading the version and loading it is not taken for that version
+    save_model_version(tmp_path / 'storage', coef=-5.0)
+    with pytest.raises(IOError, match='changed since it was read'):
+        worker.load_version(version, infos)
+
+    assert worker.check_for_new_version()
+    assert worker.current_model().version != version
+
+def test_worker_http_endpoint(worker):
+    worker, engine = worker
+    add_pending_reservations(engine, [1])
+    worker.check_for_new_version()
+    worker.current_model()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), make_handler(worker))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        request = urllib.request.Request(f"{base_url}/jobs", data=b'{"chunksize": 10}', method='POST')
+        with urllib.request.urlopen(request) as response:
+            assert response.status == 202
+            job_id = json.loads(response.read())['job_id']
+        run_next_job(worker)
+        with urllib.request.urlopen(f"{base_url}/jobs/{job_id}") as response:
+            assert json.loads(response.read())['status'] == 'done'
+        with urllib.request.urlopen(f"{base_url}/health") as response:
+            assert json.loads(response.read())['queued'] == 0
+        for body in (b'{"chunksize": true}', b'{"chunksize": 0}', b'{"chunksize": "10"}'):
+            with pytest.raises(urllib.error.HTTPError) as error:
+                urllib.request.urlopen(urllib.request.Request(f"{base_url}/jobs", data=body, method='POST'))
+            assert error.value.code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
+
+def save_registered_versions(storage_dir, aliases):
+    """Save v1 and v2 (with opposite coefficients) under model/ and return the registry path and versions."""
+    for version, coef in (('v1', 5.0), ('v2', -5.0)):
+        save_model_version(storage_dir, coef)
+        for suffix in ('', '_preprocessor'):
+            (storage_dir / 'model' / f'model_file{suffix}.pkl').rename(storage_dir / 'model' / f'{version}{suffix}.pkl')
+    versions = {version: {'model': f'{version}.pkl', 'preprocessor': f'{version}_preprocessor.pkl'}
+                for version in ('v1', 'v2')}
+    registry_path = storage_dir / 'model' / 'registry.json'
+    registry_path.write_text(json.dumps({'versions': versions, 'aliases': aliases}))
+    return registry_path, versions
+
+def test_worker_follows_registry_alias(worker, tmp_path, monkeypatch):
+    worker, engine = worker
+    monkeypatch.setattr('inference.config.MODEL_NAME', 'model')
+    monkeypatch.setattr('inference.config.MODEL_REF', 'champion')
+    registry_path, versions = save_registered_versions(tmp_path / 'storage', {'champion': 'v1'})
+    assert worker.check_for_new_version()
+    assert worker.current_model().version[0][0] == 'model/v1.pkl'
+
+    # Moving the alias is a new version, even though no file changed
+    registry_path.write_text(json.dumps({'versions': versions, 'aliases': {'champion': 'v2'}}))
+    assert worker.check_for_new_version()
+    assert worker.current_model().version[0][0] == 'model/v2.pkl'
+
+    registry_path.write_text(json.dumps({'versions': versions, 'aliases': {}}))
+    with pytest.raises(LookupError, match='champion'):
+        worker.check_for_new_version()
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_worker_scores_shadow_model(worker, tmp_path, monkeypatch, workers):
+    worker, engine = worker
+    worker.workers = workers
+    monkeypatch.setattr('inference.config.MODEL_NAME', 'model')
+    monkeypatch.setattr('inference.config.MODEL_REF', 'champion')
+    monkeypatch.setattr('inference.config.SHADOW_MODEL_REF', 'challenger')
+    save_registered_versions(tmp_path / 'storage', {'champion': 'v1', 'challenger': 'v2'})
+    add_pending_reservations(engine, [1, 2])
+    worker.check_for_new_version()
+
+    worker.submit()
+    status = run_next_job(worker)
+    assert status['status'] == 'done'
+    assert status['updated'] == 2
+
+    # The reservations only get the champion's predictions; both are recorded in the shadow table
+    scored = pd.read_sql('SELECT * FROM reservations ORDER BY id', engine)
+    assert scored['possible_cancellation'].tolist() == [0.0, 1.0]
+    shadow = pd.read_sql('SELECT * FROM shadow_predictions ORDER BY id', engine)
+    assert shadow['id'].tolist() == [1, 2]
+    assert set(shadow['model']) == {'model/v1.pkl'}
+    assert set(shadow['shadow_model']) == {'model/v2.pkl'}
+    assert shadow['predicted_cancellation'].tolist() == [0.0, 1.0]
+    assert shadow['shadow_predicted_cancellation'].tolist() == [1.0, 0.0]
+    assert (shadow[['scoring_ms', 'shadow_scoring_ms']] > 0).all().all()
@@ -0,0 +1,253 @@
+import json
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import joblib
+from model_artifacts.loading import load_model_file
+from database.engines import get_engine
+from inference import (config, get_storage, init_scorer_from_files, iter_pending_reservations, iter_submitted_in_order,
+                       resolve_model_keys, resolve_shadow_keys, save_scored_chunks, score_chunk, score_with)
+
+# Finished jobs whose status is kept for GET /jobs/<id>
+MAX_FINISHED_JOBS = 100
+
+class ResidentModel:
+    """
+    A model version loaded once and kept in memory for every job.
+
+    With several workers, the scoring processes are started with the model
+    files of this version and stay alive between jobs. shadow_paths holds
+    the files of a candidate version scored alongside it.
+    """
+
+    def __init__(self, version, model_path, preprocessor_path, workers, shadow_paths=None):
+        self.version = version
+        self.workers = workers
+        self.executor = None
+        if workers <= 1:
+            self.model = load_model_file(model_path)
+            self.preprocessor = joblib.load(preprocessor_path)
+            self.shadow = None
+            if shadow_paths is not None:
+                self.shadow = (load_model_file(shadow_paths[0]), joblib.load(shadow_paths[1]))
+        else:
+            # Spawned rather than forked: the worker's threads are running when a new version is loaded
+            self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                                initializer=init_scorer_from_files,
+                                                initargs=(model_path, preprocessor_path, shadow_paths))
+            # Start the processes and load the model now rather than on the first job
+            self.executor.submit(time.sleep, 0).result()
+
+    def score(self, chunks):
+        if self.executor is None:
+            for chunk in chunks:
+                yield score_with(self.model, self.preprocessor, chunk, self.shadow)
+        else:
+            yield from iter_submitted_in_order(self.executor, score_chunk, chunks, 2 * self.workers)
+
+    @property
+    def shadow_models(self):
+        """Keys of the model and of the shadow model, or None without a shadow model."""
+        if len(self.version) < 4:
+            return None
+        return self.version[0][0], self.version[2][0]
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+
+class InferenceWorker:
+    """
+    Resident inference worker: keeps the model in memory, reloads it when a
+    new version appears in storage and runs the jobs of a local queue one at
+    a time.
+    """
+
+    def __init__(self, storage, workers, chunksize, output_file):
+        self.storage = storage
+        self.workers = workers
+        self.chunksize = chunksize
+        self.output_file = output_file
+        self.jobs = queue.Queue()
+        self.job_status = {}
+        self.lock = threading.Lock()
+        self.model = None
+        self.next_model = None
+
+    def get_snapshot(self):
+        """
+        Resolve the files of the stored model version, followed by those of
+        the shadow model if any, and stat each of them once. Returns the
+        version, identified by the keys and ETags of the files so both a new
+        upload and a moved registry alias are picked up, and the metadata the
+        files are downloaded with, so the loaded content is the one the
+        version names.
+        """
+        keys = resolve_model_keys(self.storage) + (resolve_shadow_keys(self.storage) or ())
+        infos = [self.storage.stat(key) for key in keys]
+        return tuple((key, info['etag']) for key, info in zip(keys, infos)), infos
+
+    def load_version(self, version, infos):
+        paths = [self.storage.get_local_path(key, info) for (key, _), info in zip(version, infos)]
+        if None in paths:
+            raise ValueError("The inference worker needs local model files; set MODEL_CACHE_DIR")
+        print(f"Loading model version {version}...")
+        return ResidentModel(version, paths[0], paths[1], self.workers, paths[2:] or None)
+
+    def check_for_new_version(self):
+        """
+        Load the stored model when its version changed. The new model is
+        loaded next to the current one and swapped in before the next job,
+        so a running job always finishes on the version it started with.
+        """
+        version, infos = self.get_snapshot()
+        with self.lock:
+            known = self.next_model or self.model
+            if known is not None and known.version == version:
+                return False
+        new_model = self.load_version(version, infos)
+        with self.lock:
+            replaced, self.next_model = self.next_model, new_model
+        if replaced is not None:
+            replaced.close()
+        return True
+
+    def current_model(self):
+        with self.lock:
+            if self.next_model is not None:
+                previous, self.model, self.next_model = self.model, self.next_model, None
+                if previous is not None:
+                    previous.close()
+                print(f"Serving model version {self.model.version}")
+            return self.model
+
+    def watch(self, interval, stop):
+        while not stop.wait(interval):
+            try:
+                self.check_for_new_version()
+            except Exception as e:
+                print(f"Error checking for a new model version: {e}")
+
+    def submit(self, chunksize=None):
+        job_id = uuid.uuid4().hex
+        with self.lock:
+            self.job_status[job_id] = {'status': 'queued'}
+        self.jobs.put((job_id, chunksize or self.chunksize))
+        return job_id
+
+    def get_status(self, job_id):
+        with self.lock:
+            status = self.job_status.get(job_id)
+            return dict(status) if status is not None else None
+
+    def run_job(self, job_id, chunksize):
+        model = self.current_model()
+        with self.lock:
+            self.job_status[job_id] = {'status': 'running', 'model_version': list(model.version)}
+        try:
+            engine = get_engine(config.SQLALCHEMY_DATABASE_URI)
+            chunks = iter_pending_reservations(engine, chunksize)
+            rows, updated = save_scored_chunks(engine, model.score(chunks), self.output_file, model.shadow_models)
+            result = {'status': 'done', 'rows': rows, 'updated': updated}
+        except Exception as e:
+            print(f"Error running inference job {job_id}: {e}")
+            result = {'status': 'failed', 'error': str(e)}
+        with self.lock:
+            self.job_status[job_id].update(result)
+            finished = [key for key, status in self.job_status.items() if status['status'] in ('done', 'failed')]
+            for key in finished[:-MAX_FINISHED_JOBS]:
+                del self.job_status[key]
+
+    def serve_jobs(self, stop):
+        while not stop.is_set():
+            try:
+                job_id, chunksize = self.jobs.get(timeout=1)
+            except queue.Empty:
+                continue
+            self.run_job(job_id, chunksize)
+
+    def close(self):
+        with self.lock:
+            for model in (self.model, self.next_model):
+                if model is not None:
+                    model.close()
+
+def make_handler(worker):
+    class JobHandler(BaseHTTPRequestHandler):
+        """POST /jobs queues an inference run, GET /jobs/<id> reports it and GET /health the model in use."""
+
+        def send_json(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            if self.path != '/jobs':
+                return self.send_json(404, {'error': 'not found'})
+            length = int(self.headers.get('Content-Length') or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b'{}')
+                chunksize = body.get('chunksize')
+                # bool is an int subclass, but true is not a chunk size
+                if chunksize is not None and (isinstance(chunksize, bool) or not isinstance(chunksize, int)
+                                              or chunksize <= 0):
+                    raise ValueError("chunksize must be a positive integer")
+            except (ValueError, AttributeError) as e:
+                return self.send_json(400, {'error': str(e)})
+            self.send_json(202, {'job_id': worker.submit(chunksize)})
+
+        def do_GET(self):
+            if self.path == '/health':
+                model = worker.model
+                return self.send_json(200, {
+                    'model_version': list(model.version) if model is not None else None,
+                    'queued': worker.jobs.qsize(),
+                })
+            if self.path.startswith('/jobs/'):
+                status = worker.get_status(self.path[len('/jobs/'):])
+                if status is not None:
+                    return self.send_json(200, status)
+            self.send_json(404, {'error': 'not found'})
+
+        def log_message(self, format, *args):
+            pass
+
+    return JobHandler
+
+def run_worker():
+    """Run the resident worker until interrupted."""
+    worker = InferenceWorker(get_storage(), config.INFERENCE_WORKERS, config.INFERENCE_CHUNKSIZE,
+                             config.INFERENCE_OUTPUT_FILE)
+    worker.check_for_new_version()
+    worker.current_model()
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=worker.watch, args=(config.MODEL_POLL_INTERVAL, stop), daemon=True),
+        threading.Thread(target=worker.serve_jobs, args=(stop,), daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    server = ThreadingHTTPServer((config.WORKER_HOST, config.WORKER_PORT), make_handler(worker))
+    print(f"Inference worker listening on {config.WORKER_HOST}:{config.WORKER_PORT}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        server.server_close()
+        for thread in threads:
+            thread.join()
+        worker.close()
+
+if __name__ == "__main__":
+    run_worker()
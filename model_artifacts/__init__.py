@@ -0,0 +1,5 @@
+"""
+Model artifact formats shared by data_science, which writes them, and by the
+API and the inference executor, which load them. The repository root must be
+on PYTHONPATH to import this package.
+"""
@@ -0,0 +1,27 @@
+import pandas as pd
+
+# Raw booking column split into the date parts the models are trained on
+DATE_COL = 'reservation_status_date'
+DATE_PART_COLS = ['reservation_year', 'reservation_month', 'reservation_day']
+
+
+def add_date_features(df):
+    """
+    Replace reservation_status_date by its year, month and day columns.
+
+    Used as the first step of the feature transformer saved with each model
+    (see data_science/src/utils/preprocessing.build_preprocessor), so it lives
+    here: the API and the inference executor import it when they unpickle the
+    transformer, and they can feed it raw booking rows.
+    """
+    reservation_date = pd.to_datetime(df[DATE_COL])
+    df = df.drop(columns=DATE_COL)
+    df['reservation_year'] = reservation_date.dt.year
+    df['reservation_month'] = reservation_date.dt.month
+    df['reservation_day'] = reservation_date.dt.day
+    return df
+
+
+def get_date_feature_names(transformer, input_features):
+    """Output columns of add_date_features, for get_feature_names_out."""
+    return [name for name in input_features if name != DATE_COL] + DATE_PART_COLS
@@ -0,0 +1,24 @@
+import joblib
+
+# Native XGBoost formats, tried before the joblib pickle
+XGBOOST_EXTENSIONS = ('ubj', 'json')
+
+
+def load_model_file(model_path, mmap_mode='r', stream=None):
+    """
+    Load a model artifact written by data_science/src/utils/models.save_model.
+
+    XGBoost boosters are read in their native format. Other models are joblib
+    pickles: uncompressed ones are memory-mapped, so their arrays are paged in
+    on demand and shared between the processes that load the same file. With
+    a stream, the artifact is read from it instead of from disk and
+    model_path only tells its format.
+    """
+    if model_path.endswith(tuple(f".{extension}" for extension in XGBOOST_EXTENSIONS)):
+        from xgboost import XGBClassifier
+        model = XGBClassifier()
+        model.load_model(model_path if stream is None else bytearray(stream.read()))
+        return model
+    if stream is not None:
+        return joblib.load(stream)
+    return joblib.load(model_path, mmap_mode=mmap_mode)
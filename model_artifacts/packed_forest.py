@@ -0,0 +1,194 @@
+import functools
+import json
+import os
+import numpy as np
+import scipy.sparse as sp
+
+# Files of an exported forest: one .npy file per array plus a JSON manifest
+ARRAYS = ('feature', 'threshold', 'left', 'right', 'missing_go_to_left', 'value', 'roots', 'classes')
+MANIFEST = 'forest.json'
+
+# Rows of sparse input densified at a time when scoring
+CSR_BLOCK_ROWS = 2048
+
+
+def normalizes_leaf_values():
+    """Before 1.4, sklearn stored class counts in the leaves and normalized them in predict_proba."""
+    import sklearn
+    from sklearn.utils.fixes import parse_version
+    return parse_version(sklearn.__version__) < parse_version('1.4')
+
+
+def pack_forest(model):
+    """
+    Flatten a fitted RandomForestClassifier into node arrays shared by all trees.
+
+    Leaves point to themselves and store the class probabilities the tree
+    predicts, so the forest can be scored without sklearn's per-tree loop.
+    """
+    if model.n_outputs_ != 1:
+        raise ValueError("Only single-output forests can be packed")
+
+    parts = {name: [] for name in ARRAYS if name not in ('roots', 'classes')}
+    roots = []
+    offset = 0
+    normalize = normalizes_leaf_values()
+    for estimator in model.estimators_:
+        tree = estimator.tree_
+        nodes = np.arange(tree.node_count)
+        is_leaf = tree.children_left == -1
+        roots.append(offset)
+        parts['left'].append(np.where(is_leaf, nodes, tree.children_left) + offset)
+        parts['right'].append(np.where(is_leaf, nodes, tree.children_right) + offset)
+        parts['feature'].append(np.where(is_leaf, 0, tree.feature))
+        parts['threshold'].append(tree.threshold)
+        parts['missing_go_to_left'].append(getattr(tree, 'missing_go_to_left', np.zeros(tree.node_count)))
+
+        value = tree.value[:, 0, :model.n_classes_].copy()
+        if normalize:
+            normalizer = value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value /= normalizer
+        parts['value'].append(value)
+        offset += tree.node_count
+
+    return {
+        'feature': np.concatenate(parts['feature']).astype(np.int32),
+        'threshold': np.concatenate(parts['threshold']).astype(np.float64),
+        'left': np.concatenate(parts['left']).astype(np.int32),
+        'right': np.concatenate(parts['right']).astype(np.int32),
+        'missing_go_to_left': np.concatenate(parts['missing_go_to_left']).astype(bool),
+        'value': np.concatenate(parts['value']).astype(np.float64),
+        'roots': np.asarray(roots, dtype=np.int32),
+        'classes': model.classes_,
+    }
+
+
+def export_forest(model, path):
+    """
+    Save a fitted RandomForestClassifier as a packed forest (see PackedForest.load).
+    """
+    PackedForest.from_sklearn(model).save(path)
+
+
+def _accumulate_proba(X, feature, threshold, left, right, missing_go_to_left, value, roots, out):
+    # Trees in the outer loop keep one tree's nodes hot in cache and add the
+    # tree probabilities in estimator order, as sklearn does
+    for root in roots:
+        for i in range(X.shape[0]):
+            node = root
+            while left[node] != node:
+                x = X[i, feature[node]]
+                if np.isnan(x):
+                    go_left = missing_go_to_left[node]
+                else:
+                    go_left = x <= threshold[node]
+                node = left[node] if go_left else right[node]
+            for c in range(out.shape[1]):
+                out[i, c] += value[node, c]
+
+
+def _accumulate_proba_csr(data, indices, indptr, n_features, feature, threshold, left, right, missing_go_to_left,
+                          value, roots, out, block_rows):
+    # Sparse input is scattered block by block into a dense buffer of
+    # block_rows rows, scored like dense input and cleared again, so it is
+    # never densified as a whole
+    n_rows = len(indptr) - 1
+    block = np.zeros((min(block_rows, n_rows), n_features), dtype=np.float32)
+    for start in range(0, n_rows, block_rows):
+        stop = min(start + block_rows, n_rows)
+        for i in range(start, stop):
+            for k in range(indptr[i], indptr[i + 1]):
+                block[i - start, indices[k]] = data[k]
+        for root in roots:
+            for i in range(start, stop):
+                node = root
+                while left[node] != node:
+                    x = block[i - start, feature[node]]
+                    if np.isnan(x):
+                        go_left = missing_go_to_left[node]
+                    else:
+                        go_left = x <= threshold[node]
+                    node = left[node] if go_left else right[node]
+                for c in range(out.shape[1]):
+                    out[i, c] += value[node, c]
+        for i in range(start, stop):
+            for k in range(indptr[i], indptr[i + 1]):
+                block[i - start, indices[k]] = 0.0
+
+
+@functools.lru_cache(maxsize=None)
+def get_compiled_kernels():
+    """
+    Compile the dense and CSR scoring loops with numba. numba is imported on
+    first use so it does not slow down startup, and the compiled code is
+    cached on disk.
+    """
+    import numba
+    compile_kernel = numba.njit(nogil=True, cache=True)
+    return compile_kernel(_accumulate_proba), compile_kernel(_accumulate_proba_csr)
+
+
+class PackedForest:
+    """
+    A RandomForestClassifier flattened into NumPy node arrays and scored by
+    a loop compiled with numba.
+
+    All trees are stored in the same arrays and each leaf points to itself.
+    The compiled loop walks each row down each tree without sklearn's
+    per-tree Python and thread-pool overhead, which dominates the small
+    batches of online scoring; large batches score about as fast as sklearn.
+    predict_proba matches the sklearn forest bit for bit: inputs are compared
+    as float32 like sklearn does, and tree probabilities are summed in
+    estimator order.
+    """
+
+    def __init__(self, arrays, max_depth, n_features_in, feature_names_in=None):
+        for name in ARRAYS:
+            setattr(self, name, arrays[name])
+        self.classes_ = self.classes
+        self.max_depth = max_depth
+        self.n_features_in_ = n_features_in
+        if feature_names_in is not None:
+            self.feature_names_in_ = np.asarray(feature_names_in, dtype=object)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        max_depth = max(estimator.tree_.max_depth for estimator in model.estimators_)
+        return cls(pack_forest(model), max_depth, model.n_features_in_, getattr(model, 'feature_names_in_', None))
+
+    def save(self, path):
+        os.makedirs(path, exist_ok=True)
+        for name in ARRAYS:
+            np.save(os.path.join(path, f"{name}.npy"), getattr(self, name), allow_pickle=False)
+        manifest = {'max_depth': int(self.max_depth), 'n_features_in': int(self.n_features_in_)}
+        if hasattr(self, 'feature_names_in_'):
+            manifest['feature_names_in'] = [str(name) for name in self.feature_names_in_]
+        with open(os.path.join(path, MANIFEST), 'w') as file:
+            json.dump(manifest, file)
+
+    @classmethod
+    def load(cls, path, mmap_mode='r'):
+        """
+        Load an exported forest. The node arrays are memory-mapped, so worker
+        processes serving the same model share their pages.
+        """
+        with open(os.path.join(path, MANIFEST)) as file:
+            manifest = json.load(file)
+        arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode=mmap_mode) for name in ARRAYS}
+        return cls(arrays, manifest['max_depth'], manifest['n_features_in'], manifest.get('feature_names_in'))
+
+    def predict_proba(self, X):
+        dense_kernel, csr_kernel = get_compiled_kernels()
+        nodes = (self.feature, self.threshold, self.left, self.right, self.missing_go_to_left, self.value, self.roots)
+        proba = np.zeros((X.shape[0], len(self.classes_)), dtype=np.float64)
+        if sp.issparse(X):
+            X = sp.csr_matrix(X, dtype=np.float32)
+            csr_kernel(X.data, X.indices, X.indptr, X.shape[1], *nodes, proba, CSR_BLOCK_ROWS)
+        else:
+            dense_kernel(np.ascontiguousarray(X, dtype=np.float32), *nodes, proba)
+        proba /= len(self.roots)
+        return proba
+
+    def predict(self, X):
+        return self.classes_.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
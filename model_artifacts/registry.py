@@ -0,0 +1,39 @@
+import json
+import os
+
+# Versions saved for a model and the aliases pointing at them, written next to
+# its artifacts by data_science/src/utils/models.register_version
+REGISTRY_FILE = 'registry.json'
+
+
+def empty_registry():
+    return {'versions': {}, 'aliases': {}}
+
+
+def read_registry(stream):
+    """Parse a registry from a file object, e.g. one opened from remote storage."""
+    registry = json.load(stream)
+    registry.setdefault('versions', {})
+    registry.setdefault('aliases', {})
+    return registry
+
+
+def load_registry(registry_path):
+    """Read a registry file; a model without one has no registered versions."""
+    if not os.path.exists(registry_path):
+        return empty_registry()
+    with open(registry_path) as file:
+        return read_registry(file)
+
+
+def resolve_version(registry, model_name, ref, registered_only=False):
+    """
+    Resolve a version or an alias (e.g. "latest" or "champion") to a
+    registered version. Without any registered version, ref is taken as the
+    version itself unless registered_only is set. Raises LookupError for a
+    ref the registry does not know.
+    """
+    version = registry['aliases'].get(ref, ref)
+    if (registry['versions'] or registered_only) and version not in registry['versions']:
+        raise LookupError(f"Model {model_name} has no version or alias '{ref}'")
+    return version
@@ -0,0 +1,5 @@
+"""
+Storage backends (local directory, AWS S3) shared by data_engineering,
+data_science and the inference executor. The repository root must be on
+PYTHONPATH to import this package.
+"""
@@ -0,0 +1,150 @@
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+import pandas as pd
+
+# Buffer size of streamed copies
+COPY_BUFFER_SIZE = 1024 * 1024
+
+class BaseStorage(ABC):
+    """
+    Base class for storage clients like S3, GCP, Azure, or the local filesystem.
+
+    Objects are addressed by '/'-separated keys and read and written as
+    binary streams, so the executor's models and the datasets of the data
+    engineering and data science pipelines (see read_csv and
+    object_storage.data) can be consumed with bounded memory and without a
+    copy on disk. Downloads go
+    through a local content-addressed cache: a cached file is named after
+    the version identifier (e.g. the ETag) of the object it was downloaded
+    from, so an unchanged model is never downloaded twice.
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+
+    @abstractmethod
+    def stat(self, cloud_key):
+        """
+        Return the metadata of an object as a dict with at least 'etag'
+        (identifies its content) and 'size', without downloading it.
+        """
+        pass
+
+    @abstractmethod
+    def open(self, cloud_key):
+        """Open an object for streaming reads as a binary file object."""
+        pass
+
+    @abstractmethod
+    def put(self, cloud_key, fileobj):
+        """Upload the content of a binary file object, streaming it."""
+        pass
+
+    @abstractmethod
+    def list(self, prefix=''):
+        """Yield the keys of the objects starting with prefix, in order."""
+        pass
+
+    def download_file(self, cloud_key, local_file_path, info):
+        """Download the object version described by info (see stat) to a local file."""
+        with self.open(cloud_key) as source, open(local_file_path, 'wb') as target:
+            shutil.copyfileobj(source, target, COPY_BUFFER_SIZE)
+
+    def get_local_path(self, cloud_key, info=None):
+        """
+        Return a local file holding the object, or None when it can only be
+        streamed. Remote objects are available locally through the cache.
+        info pins the object version (see stat), by default the current one.
+        """
+        if self.cache_dir is None:
+            return None
+        return self.download_model(cloud_key, info=info)
+
+    def read_csv(self, cloud_key, chunksize=None, **kwargs):
+        """
+        Read a CSV object with pandas straight from its stream. With
+        chunksize, yields DataFrames of that many rows so memory stays bounded.
+        """
+        if chunksize is None:
+            with self.open(cloud_key) as stream:
+                return pd.read_csv(stream, **kwargs)
+        return self._iter_csv(cloud_key, chunksize, **kwargs)
+
+    def _iter_csv(self, cloud_key, chunksize, **kwargs):
+        with self.open(cloud_key) as stream:
+            yield from pd.read_csv(stream, chunksize=chunksize, **kwargs)
+
+    def verify_file(self, local_file_path, info):
+        """Check a downloaded file against the object metadata."""
+        size = os.path.getsize(local_file_path)
+        if size != info['size']:
+            raise IOError(f"Downloaded {size} bytes, expected {info['size']}")
+
+    def get_cache_path(self, cloud_key, info):
+        # ETags are quoted hex digests, optionally followed by -<number of parts>; the
+        # extension is kept because loaders tell the model format by it
+        return os.path.join(self.cache_dir, info['etag'].strip('"') + os.path.splitext(cloud_key)[1])
+
+    def download_verified(self, cloud_key, target_path, info):
+        """
+        Download to a temporary file next to target_path, verify it and
+        atomically rename it, so an interrupted download never leaves a
+        partial file behind.
+        """
+        directory = os.path.dirname(os.path.abspath(target_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        os.close(fd)
+        try:
+            self.download_file(cloud_key, tmp_path, info)
+            self.verify_file(tmp_path, info)
+            os.replace(tmp_path, target_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def download_model(self, cloud_key, local_file_path=None, info=None):
+        """
+        Download a model from cloud storage and return its local path.
+
+        With a cache directory, the object metadata is checked first and the
+        cached copy is used when the content has not changed. local_file_path,
+        when given, receives a link (or a copy) of the cached file. With info
+        (see stat), the download is pinned to that version of the object and
+        fails if it can no longer be read.
+        """
+        info = info or self.stat(cloud_key)
+        if self.cache_dir is None:
+            if local_file_path is None:
+                raise ValueError("local_file_path is required without a cache directory")
+            self.download_verified(cloud_key, local_file_path, info)
+            return local_file_path
+
+        cache_path = self.get_cache_path(cloud_key, info)
+        if os.path.exists(cache_path):
+            print(f"Model {cloud_key} unchanged, using cached {cache_path}")
+        else:
+            self.download_verified(cloud_key, cache_path, info)
+
+        if local_file_path is None:
+            return cache_path
+        place_file(cache_path, local_file_path)
+        return local_file_path
+
+def place_file(source_path, target_path):
+    """Atomically make target_path a hard link to source_path, or a copy across filesystems."""
+    directory = os.path.dirname(os.path.abspath(target_path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    os.close(fd)
+    os.remove(tmp_path)
+    try:
+        try:
+            os.link(source_path, tmp_path)
+        except OSError:
+            shutil.copyfile(source_path, tmp_path)
+        os.replace(tmp_path, target_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,30 @@
+import os
+from object_storage.local_storage import LocalStorage
+
+# Default storage of the datasets: the repository's data/ directory, with the raw/ and processed/ keys
+DATA_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'data'))
+
+
+def get_data_storage():
+    """
+    Return the storage the data engineering and data science pipelines read
+    their datasets from.
+
+    With DATA_S3_BUCKET set, datasets are read from that bucket (with the
+    same AWS_* variables as the inference executor), streamed unless
+    DATA_CACHE_DIR names a directory to download them to. Otherwise they
+    are read from DATA_DIR, the repository's data/ directory by default.
+    """
+    bucket = os.getenv('DATA_S3_BUCKET')
+    if not bucket:
+        return LocalStorage(os.getenv('DATA_DIR', DATA_DIR))
+    # boto3 is only imported when the datasets live in S3
+    from object_storage.s3_client import S3Client
+    return S3Client(
+        aws_access_key_id=os.getenv('AWS_ACCESS_KEY_ID'),
+        aws_secret_access_key=os.getenv('AWS_SECRET_ACCESS_KEY'),
+        region=os.getenv('AWS_REGION', 'us-east-1'),
+        bucket=bucket,
+        cache_dir=os.getenv('DATA_CACHE_DIR') or None,
+        endpoint_url=os.getenv('S3_ENDPOINT_URL') or None,
+    )
@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+from object_storage.base_storage import COPY_BUFFER_SIZE, BaseStorage
+
+class LocalStorage(BaseStorage):
+    """Storage on a local (or mounted) directory, with keys relative to root_dir."""
+
+    def __init__(self, root_dir):
+        # Files are already local, so they are never cached
+        super().__init__(cache_dir=None)
+        self.root_dir = root_dir
+
+    def get_path(self, key):
+        path = os.path.abspath(os.path.join(self.root_dir, *key.split('/')))
+        if os.path.commonpath([path, os.path.abspath(self.root_dir)]) != os.path.abspath(self.root_dir):
+            raise ValueError(f"Key {key} is outside of {self.root_dir}")
+        return path
+
+    def stat(self, key):
+        """Return the size and an ETag-like identifier built from the modification time and size."""
+        stat = os.stat(self.get_path(key))
+        return {'etag': f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"', 'size': stat.st_size, 'version_id': None}
+
+    def open(self, key):
+        return open(self.get_path(key), 'rb')
+
+    def put(self, key, fileobj):
+        """Write a stream to a temporary file and atomically rename it into place."""
+        path = self.get_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as target:
+                shutil.copyfileobj(fileobj, target, COPY_BUFFER_SIZE)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def list(self, prefix=''):
+        # Only the directory the prefix points into is walked
+        start_dir = self.get_path(prefix.rsplit('/', 1)[0]) if '/' in prefix else self.root_dir
+        keys = []
+        for directory, _, filenames in os.walk(start_dir):
+            for filename in filenames:
+                key = os.path.relpath(os.path.join(directory, filename), self.root_dir).replace(os.sep, '/')
+                if key.startswith(prefix):
+                    keys.append(key)
+        yield from sorted(keys)
+
+    def get_local_path(self, key, info=None):
+        """Return the file itself, after checking it is still the version described by info (see stat)."""
+        if info is not None and self.stat(key)['etag'] != info['etag']:
+            raise IOError(f"{key} changed since it was read")
+        return self.get_path(key)
+
+    def download_model(self, key, local_file_path=None, info=None):
+        """Return the model file itself, or copy it to local_file_path when given."""
+        if local_file_path is None:
+            return self.get_local_path(key, info)
+        return super().download_model(key, local_file_path, info)
@@ -0,0 +1,132 @@
+import base64
+import hashlib
+import io
+import zlib
+import boto3
+from boto3.s3.transfer import TransferConfig
+from object_storage.base_storage import BaseStorage
+
+MB = 1024 * 1024
+
+# Additional checksums of S3 objects that can be verified with the standard library, by preference
+CHECKSUMS = ('SHA256', 'SHA1', 'CRC32')
+
+def compute_checksum(local_file_path, algorithm):
+    """
+    Checksum of a file as S3 reports it: base64 of the digest for the
+    additional checksums, hex for the MD5 of an ETag.
+    """
+    digest = hashlib.new(algorithm.lower()) if algorithm != 'CRC32' else None
+    crc = 0
+    with open(local_file_path, 'rb') as file:
+        for block in iter(lambda: file.read(MB), b''):
+            if digest is None:
+                crc = zlib.crc32(block, crc)
+            else:
+                digest.update(block)
+    if algorithm == 'MD5':
+        return digest.hexdigest()
+    raw = crc.to_bytes(4, 'big') if digest is None else digest.digest()
+    return base64.b64encode(raw).decode()
+
+class S3Client(BaseStorage):
+    def __init__(self, aws_access_key_id, aws_secret_access_key, region, bucket, cache_dir=None,
+                 multipart_chunksize=8 * MB, max_concurrency=10, endpoint_url=None):
+        """
+        Initialize the S3 client using environment variables.
+
+        Objects larger than multipart_chunksize are downloaded as concurrent
+        ranged GETs of that size, on max_concurrency threads.
+        """
+        super().__init__(cache_dir)
+        self.s3 = boto3.client(
+            's3',
+            aws_access_key_id=aws_access_key_id,
+            aws_secret_access_key=aws_secret_access_key,
+            region_name=region,
+            endpoint_url=endpoint_url,
+        )
+        self.bucket = bucket
+        self.transfer_config = TransferConfig(
+            multipart_threshold=multipart_chunksize,
+            multipart_chunksize=multipart_chunksize,
+            max_concurrency=max_concurrency,
+        )
+
+    def stat(self, s3_key):
+        """
+        Return the ETag, size and version (on versioned buckets) of an object,
+        with its encryption and the additional checksum S3 stores when the
+        object was uploaded with one.
+        """
+        response = self.s3.head_object(Bucket=self.bucket, Key=s3_key, ChecksumMode='ENABLED')
+        checksum = next(((algorithm, response[f'Checksum{algorithm}']) for algorithm in CHECKSUMS
+                         if response.get(f'Checksum{algorithm}')), None)
+        # Multipart uploads get a checksum of the part checksums unless it covers the full object
+        if '-' in response['ETag'] and response.get('ChecksumType') != 'FULL_OBJECT':
+            checksum = None
+        return {
+            'etag': response['ETag'],
+            'size': response['ContentLength'],
+            'version_id': response.get('VersionId'),
+            'checksum': checksum,
+            # The ETag of an SSE-KMS or SSE-C object is not the MD5 of its content
+            'etag_is_md5': (response.get('ServerSideEncryption') not in ('aws:kms', 'aws:kms:dsse')
+                            and not response.get('SSECustomerAlgorithm')),
+        }
+
+    def open(self, s3_key):
+        """Stream an object; the buffered reader gives loaders the peek they need."""
+        response = self.s3.get_object(Bucket=self.bucket, Key=s3_key)
+        return io.BufferedReader(response['Body'])
+
+    def put(self, s3_key, fileobj):
+        """Upload a stream, in concurrent parts when it is larger than the multipart chunk size."""
+        self.s3.upload_fileobj(fileobj, self.bucket, s3_key, Config=self.transfer_config)
+
+    def list(self, prefix=''):
+        paginator = self.s3.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=prefix):
+            for item in page.get('Contents', []):
+                yield item['Key']
+
+    def download_file(self, s3_key, local_file_path, info):
+        """
+        Download the object version returned by stat. Versioned buckets pin
+        the download to its VersionId; otherwise the object must still have
+        the same ETag once downloaded, so content uploaded in between is
+        never taken for that version.
+        """
+        print(f"Downloading {s3_key} from S3 bucket {self.bucket}...")
+        extra_args = {'VersionId': info['version_id']} if info.get('version_id') else None
+        self.s3.download_file(self.bucket, s3_key, local_file_path, ExtraArgs=extra_args, Config=self.transfer_config)
+        if extra_args is None and self.stat(s3_key)['etag'] != info['etag']:
+            raise IOError(f"{s3_key} changed while it was downloaded")
+        print(f"Model saved locally at {local_file_path}")
+
+    def verify_file(self, local_file_path, info):
+        """
+        Check the size of a downloaded file and its content: against the
+        full-object additional checksum of the object when it has one, or
+        else against the ETag when it is the MD5 of the content (objects
+        uploaded in a single part and not encrypted with SSE-KMS or SSE-C).
+        """
+        super().verify_file(local_file_path, info)
+        checksum = info.get('checksum')
+        if checksum is not None:
+            algorithm, expected = checksum
+            actual = compute_checksum(local_file_path, algorithm)
+        elif info.get('etag_is_md5', True) and '-' not in info['etag']:
+            expected, actual = info['etag'].strip('"'), compute_checksum(local_file_path, 'MD5')
+        else:
+            return
+        if actual != expected:
+            raise IOError(f"Checksum mismatch for {local_file_path}: expected {expected}, got {actual}")
+
+    def download_model(self, s3_key, local_file_path=None, info=None):
+        """Download a model from S3 (see BaseStorage.download_model)."""
+        try:
+            return super().download_model(s3_key, local_file_path, info)
+        except Exception as e:
+            print(f"Error downloading model from S3: {e}")
+            raise
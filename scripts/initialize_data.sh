@@ -10,6 +10,7 @@ show_help() {
     echo "  v1    Use the initial transformation script"
     echo
     echo "DESTINATION options:"
+    echo "  parquet   Save the processed data to a Parquet file (default)"
     echo "  csv   Save the processed data to a CSV file"
     echo "  db    Save the processed data to a MySQL database"
     echo
@@ -45,14 +46,15 @@ process_data() {
         exit 1
     fi
 
-    # Execute the transformation script
+    # Execute the transformation script, with the repository root on the path for the shared packages
+    export PYTHONPATH="$(pwd)${PYTHONPATH:+:$PYTHONPATH}"
     echo "Running transformation script '$script' with destination '$destination'..."
     python "$script" --destination "$destination"
 }
 
 # Default version and destination
 DEFAULT_VERSION="1"
-DEFAULT_DESTINATION="csv"
+DEFAULT_DESTINATION="parquet"
 
 # Check if the required command is provided
 if [ "$#" -gt 2 ]; then
@@ -0,0 +1 @@
+"""Helpers shared by the test suites of the components, imported with the repository root on sys.path."""
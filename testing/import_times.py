@@ -0,0 +1,38 @@
+import os
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Entry point of each component: import statement, working directory and extra PYTHONPATH entries
+ENTRY_POINTS = {
+    'api': ('import app.main', 'api', ()),
+    'data_engineering': ('import main', 'data_engineering/src', ('data_engineering',)),
+    'data_science': ('import main', 'data_science/src', ()),
+    'inference_executor': ('import inference', 'infra/inference_executor', ()),
+}
+
+
+def get_import_times(statement, cwd, pythonpath=(), env=None):
+    """
+    Run statement in a fresh interpreter with -X importtime and return the
+    cumulative seconds spent importing each module it imported. pythonpath
+    entries are searched before the repository root.
+    """
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join([*pythonpath, REPO_DIR]), **(env or {})}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        fields = line.split('|')
+        if line.startswith('import time:') and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1]) / 1e6
+    return times
+
+
+if __name__ == "__main__":
+    # Benchmark: python -m testing.import_times, from the repository root
+    for name, (statement, cwd, pythonpath) in ENTRY_POINTS.items():
+        times = get_import_times(statement, os.path.join(REPO_DIR, cwd),
+                                 [os.path.join(REPO_DIR, path) for path in pythonpath], {'ENV': 'local'})
+        print(f"{name}: {statement} took {times[statement.split()[1]]:.3f} s")